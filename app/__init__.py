@@ -26,13 +26,19 @@ to ensure its accuracy and functionality, users should:
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy.engine import make_url
 from config import Config
+from app.utils.db_engine import RoutingSession, configure_engine_options, configure_engines, database_uri
 import os
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 
+def _masked(uri):
+    """Database URI without its password, for log output."""
+    return make_url(uri).render_as_string(hide_password=True)
+
 def create_app(config_class=Config):
     """Create and configure the Flask application."""
     app = Flask(__name__)
@@ -47,8 +53,8 @@ def create_app(config_class=Config):
     except OSError:
         pass
         
-    # Force database name before loading config
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    # DATABASE_URL (e.g. PostgreSQL) takes precedence over the bundled SQLite file
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(f'sqlite:///{db_path}')
     
     # Set secret key with priority:
     # 1. GitHub Actions secret (FLASK_SECRET_KEY)
@@ -60,7 +66,7 @@ def create_app(config_class=Config):
         os.environ.get('SECRET_KEY') or        # Regular environment variable
         'dev-temporary-key-replace-in-production'  # Fallback for development only
     )
-    print(f"Setting database path to: {app.config['SQLALCHEMY_DATABASE_URI']}")
+    print(f"Setting database path to: {_masked(app.config['SQLALCHEMY_DATABASE_URI'])}")
     
     # Load rest of config but preserve database URI and secret key
     db_uri = app.config['SQLALCHEMY_DATABASE_URI']
@@ -69,14 +75,25 @@ def create_app(config_class=Config):
     app.config['SQLALCHEMY_DATABASE_URI'] = db_uri
     app.config['SECRET_KEY'] = secret_key
 
-    # Initialize extensions with app
+    # Route application logs through the non-blocking queue handler
+    from app.utils.logging_setup import configure_logging
+    configure_logging(app)
+
+    # Initialize extensions with app: pool sizing for server databases, SQLite
+    # connection tuning and the read-only engine
+    configure_engine_options(app)
     db.init_app(app)
+    configure_engines(app, db)
     migrate.init_app(app, db)
 
     # Register blueprints
     from app.routes import init_routes
     init_routes(app)
 
+    # Resume polling of explanation batches recorded before a restart
+    from app.utils.explanation_batches import init_app as init_explanation_batches
+    init_explanation_batches(app)
+
     # Initialize CLI commands
     from app.cli import init_app as init_cli
     init_cli(app)
@@ -85,8 +102,18 @@ def create_app(config_class=Config):
     with app.app_context():
         try:
             db.create_all()
+            from app.utils.db_indexes import ensure_indexes
+            ensure_indexes()
+            from app.utils.title_search import ensure_title_index
+            ensure_title_index()
+            from app.utils.update_tags import ensure_update_tags
+            ensure_update_tags()
+            from app.utils.facets import ensure_facet_counts
+            ensure_facet_counts()
+            from app.utils.insights import ensure_insight_rollups
+            ensure_insight_rollups()
             print("Database tables created successfully!")
-            print(f"Final database URI: {app.config['SQLALCHEMY_DATABASE_URI']}")
+            print(f"Final database URI: {_masked(app.config['SQLALCHEMY_DATABASE_URI'])}")
         except Exception as e:
             print(f"Error creating database tables: {e}")
     
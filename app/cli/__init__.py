@@ -3,10 +3,15 @@ CLI commands for the cloud_updates application.
 """
 from .clean import clean
 from .themes import themes
-from .explanations import generate_explanations
+from .explanations import generate_explanations, render_explanations
+from .jobs import jobs
+from .scrape import scrape
 
 def init_app(app):
     """Register CLI commands with the app."""
     app.cli.add_command(clean)
     app.cli.add_command(themes)
     app.cli.add_command(generate_explanations)
+    app.cli.add_command(render_explanations)
+    app.cli.add_command(jobs)
+    app.cli.add_command(scrape)
@@ -3,9 +3,10 @@ Command-line utility to clean AWS and Azure updates.
 """
 import click
 from flask.cli import with_appcontext
-from app import db
-from app.models import Update
 from app.utils.clean_updates import clean_aws_updates, clean_azure_updates
+from app.utils.update_archive import archive_expired_updates
+
+DELETE_OLD_HELP = 'Delete updates older than UPDATE_RETENTION_DAYS (default 90 days)'
 
 @click.group()
 def clean():
@@ -13,40 +14,42 @@ def clean():
     pass
 
 @clean.command()
-@click.option('--delete-old', is_flag=True, help='Delete updates older than 90 days')
+@click.option('--delete-old', is_flag=True, help=DELETE_OLD_HELP)
 @with_appcontext
 def azure(delete_old):
     """Clean Azure updates by removing duplicates and optionally old entries."""
-    updates = Update.query.filter_by(provider='azure').all()
-    removed = clean_azure_updates(updates, delete_old=delete_old)
+    removed = clean_azure_updates(delete_old=delete_old)
     click.echo(f'Cleaned {removed} Azure updates.')
 
 @clean.command()
-@click.option('--delete-old', is_flag=True, help='Delete updates older than 90 days')
+@click.option('--delete-old', is_flag=True, help=DELETE_OLD_HELP)
 @with_appcontext
 def aws(delete_old):
     """Clean AWS updates by removing duplicates and optionally old entries."""
-    updates = Update.query.filter_by(provider='aws').all()
-    removed = clean_aws_updates(updates, delete_old=delete_old)
+    removed = clean_aws_updates(delete_old=delete_old)
     click.echo(f'Cleaned {removed} AWS updates.')
 
 @clean.command()
-@click.option('--delete-old', is_flag=True, help='Delete updates older than 90 days')
+@click.option('--delete-old', is_flag=True, help=DELETE_OLD_HELP)
 @with_appcontext
 def all(delete_old):
     """Clean both AWS and Azure updates."""
-    # Clean Azure updates
-    azure_updates = Update.query.filter_by(provider='azure').all()
-    azure_removed = clean_azure_updates(azure_updates, delete_old=delete_old)
+    azure_removed = clean_azure_updates(delete_old=delete_old)
     click.echo(f'Cleaned {azure_removed} Azure updates.')
-    
-    # Clean AWS updates
-    aws_updates = Update.query.filter_by(provider='aws').all()
-    aws_removed = clean_aws_updates(aws_updates, delete_old=delete_old)
+
+    aws_removed = clean_aws_updates(delete_old=delete_old)
     click.echo(f'Cleaned {aws_removed} AWS updates.')
-    
+
     total_removed = azure_removed + aws_removed
     click.echo(f'Total updates cleaned: {total_removed}')
 
+@clean.command()
+@click.option('--days', type=int, default=None, help='Archive updates older than this (default UPDATE_RETENTION_DAYS)')
+@with_appcontext
+def archive(days):
+    """Move updates past the retention window to the archive database."""
+    archived = archive_expired_updates(retention_days=days)
+    click.echo(f'Archived {archived} updates.')
+
 if __name__ == '__main__':
     clean()
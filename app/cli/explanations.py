@@ -2,127 +2,145 @@
 Command line utility for generating explanations for updates.
 """
 import click
+import os
+from flask import current_app
 from flask.cli import with_appcontext
+from sqlalchemy import or_, select, update as update_statement
+from sqlalchemy.orm import undefer, undefer_group
 from app import db
-from app.models import Update
-from app.utils.update_analyzer import format_explanation_text
-from anthropic import Anthropic
-import os
-import time
-from random import uniform
+from app.models import ExplanationBatch, Update
+from app.utils.explanation_backfill import ExplanationBackfill, anthropic_client, store_explanation, updates_to_explain
+from app.utils.explanation_batches import active_batches, submit_batches, wait_for_batches
+from app.utils.update_analyzer import FORMATTER_VERSION, SEGMENTERS, configured_segmenter, render_explanations_html
 
 @click.command('generate_explanations')
 @with_appcontext
 @click.option('--force-generation', is_flag=True, help='Force regeneration of explanations for all updates')
 @click.option('--show-formatted', is_flag=True, help='Show a sample of formatted explanations with paragraph detection')
-def generate_explanations(force_generation, show_formatted):
+@click.option('--concurrency', type=int, help='Requests in flight at once (default: EXPLANATION_CONCURRENCY)')
+@click.option('--batch', 'use_batches', is_flag=True,
+              help='Submit the requests through the Message Batches API and store the results when they are ready')
+@click.option('--no-wait', is_flag=True, help='With --batch, exit after submitting; run again to resume polling')
+def generate_explanations(force_generation, show_formatted, concurrency, use_batches, no_wait):
     """Generate explanations for updates using Claude."""
-    try:        # Build query for updates without explanations or all updates if force_generation is true
-        query = Update.query
-        if not force_generation:
-            query = query.filter(
-                db.or_(
-                    Update.explanation.is_(None),
-                    Update.explanation == ''
-                )
-            )
-        
-        updates = query.order_by(Update.published_date.desc()).all()
-        total_updates = len(updates)
-        
-        if not updates:
+    if use_batches:
+        generate_explanations_in_batches(force_generation, no_wait)
+        return
+    try:
+        # Updates without explanations, or all updates if force_generation is true
+        items = updates_to_explain(force_generation)
+        if not items:
             click.echo('No updates found that need explanations.')
             return
-        
-        click.echo(f'Found {total_updates} updates to process')
-        
-        # Initialize Claude client
-        client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+
+        click.echo(f'Found {len(items)} updates to process')
         if not os.getenv('ANTHROPIC_API_KEY'):
             click.echo('Error: ANTHROPIC_API_KEY environment variable not set', err=True)
             return
+        backfill = ExplanationBackfill.from_config(current_app.config, anthropic_client())
+        if concurrency:
+            backfill.concurrency = concurrency
+
+        # Each explanation is committed as it arrives; failures are reported and skipped
+        generated = []
+        with click.progressbar(length=len(items), label='Generating explanations') as bar:
+            def progress(update_id, error):
+                if error is None:
+                    generated.append(update_id)
+                else:
+                    click.echo(f'\nError generating explanation for update {update_id}: {error}', err=True)
+                bar.update(1)
+
+            result = backfill.run(items, store_explanation, progress)
+        click.echo(f"\nSuccessfully generated {result['generated']} explanations "
+                   f"({result['failed']} failed, {result['retries']} retries).")
+
+        # Show sample formatted explanations if requested
+        if show_formatted and generated:
+            click.echo("\nSample formatted explanations with paragraph detection:")
+
+            # Show up to 3 samples
+            sample_updates = Update.query.options(undefer(Update.explanation), undefer_group('explanation_html')) \
+                .filter(Update.id.in_(generated[:3])).all()
+            for i, update in enumerate(sample_updates):
+                if update.explanation:
+                    click.echo(f"\n--- Example {i+1}: {update.title} ---")
+                    click.echo("\nRaw text stored in database:")
+                    click.echo(update.explanation[:200] + "..." if len(update.explanation) > 200 else update.explanation)
+
+                    click.echo("\nFormatted with spaCy paragraph detection (what users will see):")
+                    formatted = update.explanation_html or ''
+                    # Remove HTML tags for CLI display
+                    formatted_text = formatted.replace('<p>', '\n\n').replace('</p>', '').strip()
+                    click.echo(formatted_text[:300] + "..." if len(formatted_text) > 300 else formatted_text)
+                    click.echo("\n" + "-" * 60)
+
+    except Exception as e:
+        click.echo(f'Error: {str(e)}', err=True)
+
+def generate_explanations_in_batches(force_generation, no_wait):
+    """Resume the recorded batches, submit new ones for the remaining updates and poll until all are stored."""
+    try:
+        client = anthropic_client(max_retries=2)
+        resumed = active_batches()
+        if resumed:
+            click.echo(f'Resuming {len(resumed)} submitted batches')
+        submitted = submit_batches(client, force_generation)
+        for batch in submitted:
+            click.echo(f'Submitted batch {batch.batch_id} with {batch.request_count} requests')
+        if not resumed and not submitted:
+            click.echo('No updates found that need explanations.')
+            return
+        if no_wait:
+            return
+        batch_ids = [batch.id for batch in resumed + submitted]
 
-        processed = 0
-        with click.progressbar(updates, label='Generating explanations') as bar:
-            for update in bar:                
-                prompt = f"provide brief explanation for '{update.title}' ignore keywords like \"in preview\" or \"launched\" or \"retired\" or \"in development\" from title for generating description. Don't mention status like \"Public Preview\" or \"Private Preview\" or \"Generally Available\"."
-                
-                # Implement retry logic with exponential backoff
-                max_retries = 5
-                base_delay = 1  # Start with 1 second delay
-                
-                for attempt in range(max_retries):
-                    try:
-                        message = client.messages.create(
-                            model="claude-3-5-sonnet-20240620",
-                            max_tokens=1000,
-                            messages=[{"role": "user", "content": prompt}]
-                        )
-                        explanation = ""
-                        for content in message.content:
-                            if hasattr(content, 'text'):
-                                explanation += content.text
-                            elif isinstance(content, str):
-                                explanation += content
-                        
-                        # Store the raw explanation - we'll format it during retrieval
-                        # This approach ensures compatibility with both old and new code
-                        raw_explanation = explanation.strip()
-                        
-                        # Note: We're not applying formatting here because:
-                        # 1. We want to store the raw text in the database
-                        # 2. The get_update_explanation route will handle formatting on retrieval
-                        # 3. This preserves compatibility with both old and new approaches
-                        
-                        update.explanation = raw_explanation
-                        processed += 1
-                        break  # Success! Break the retry loop
-                        
-                    except Exception as e:
-                        if 'overloaded_error' in str(e):
-                            if attempt < max_retries - 1:  # Don't wait after the last attempt
-                                delay = base_delay * (2 ** attempt) + uniform(0, 0.1)  # Add small random jitter
-                                click.echo(f'\nAPI overloaded, retrying in {delay:.1f} seconds... (Attempt {attempt + 1}/{max_retries})', err=True)
-                                time.sleep(delay)
-                                continue
-                        
-                        click.echo(f'\nError generating explanation for update {update.id}: {str(e)}', err=True)
-                        break  # Break on non-overload errors or final attempt
-                
-                # Commit in batches of 10
-                if processed % 10 == 0:
-                    try:
-                        db.session.commit()
-                    except Exception as commit_error:
-                        click.echo(f'\nError committing batch: {str(commit_error)}', err=True)
-                        db.session.rollback()
-          # Final commit for remaining changes
-        try:
-            db.session.commit()
-            click.echo(f'\nSuccessfully generated {processed} explanations.')
-            
-            # Show sample formatted explanations if requested
-            if show_formatted and processed > 0:
-                click.echo("\nSample formatted explanations with paragraph detection:")
-                
-                # Show up to 3 samples
-                sample_updates = updates[:min(3, processed)]
-                for i, update in enumerate(sample_updates):
-                    if update.explanation:
-                        click.echo(f"\n--- Example {i+1}: {update.title} ---")
-                        click.echo("\nRaw text stored in database:")
-                        click.echo(update.explanation[:200] + "..." if len(update.explanation) > 200 else update.explanation)
-                        
-                        click.echo("\nFormatted with spaCy paragraph detection (what users will see):")
-                        formatted = format_explanation_text(update.explanation)
-                        # Remove HTML tags for CLI display
-                        formatted_text = formatted.replace('<p>', '\n\n').replace('</p>', '').strip()
-                        click.echo(formatted_text[:300] + "..." if len(formatted_text) > 300 else formatted_text)
-                        click.echo("\n" + "-" * 60)
-                
-        except Exception as commit_error:
-            db.session.rollback()
-            click.echo(f'\nError saving explanations: {str(commit_error)}', err=True)
-            
+        def progress(active):
+            if active:
+                waiting = sum(batch.request_count for batch in active)
+                click.echo(f'{len(active)} batches ({waiting} requests) still processing...')
+
+        wait_for_batches(client, progress=progress)
+        stored = ExplanationBatch.query.filter(ExplanationBatch.id.in_(batch_ids)).all()
+        click.echo(f'Successfully generated {sum(batch.succeeded or 0 for batch in stored)} explanations '
+                   f'({sum(batch.failed or 0 for batch in stored)} failed requests).')
     except Exception as e:
         click.echo(f'Error: {str(e)}', err=True)
+
+@click.command('render_explanations')
+@with_appcontext
+@click.option('--all', 'render_all', is_flag=True, help='Re-render every explanation, not only outdated ones')
+@click.option('--batch-size', default=200, show_default=True, help='Explanations per spaCy batch and commit')
+@click.option('--segmenter', type=click.Choice(SEGMENTERS),
+              help="Sentence segmentation backend (default: SENTENCE_SEGMENTER; 'parser' only from here)")
+def render_explanations(render_all, batch_size, segmenter):
+    """Store the HTML of explanations not yet rendered by the current formatter and segmenter."""
+    segmenter = segmenter or configured_segmenter()
+    has_text = (Update.explanation.is_not(None)) & (Update.explanation != '')
+    if not render_all:
+        has_text &= or_(Update.explanation_format_version.is_(None),
+                        Update.explanation_format_version < FORMATTER_VERSION,
+                        Update.explanation_segmenter.is_(None),
+                        Update.explanation_segmenter != segmenter)
+
+    rendered, last_id = 0, 0
+    while True:
+        rows = db.session.execute(
+            select(Update.id, Update.explanation).where(has_text, Update.id > last_id)
+            .order_by(Update.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        # One pipe pass per batch; texts already holding HTML keep the basic formatting
+        html = render_explanations_html([text for _, text in rows], batch_size=batch_size, segmenter=segmenter)
+        db.session.execute(update_statement(Update), [
+            {'id': update_id, 'explanation_html': rendered, 'explanation_format_version': FORMATTER_VERSION,
+             'explanation_segmenter': segmenter}
+            for (update_id, _), rendered in zip(rows, html)
+        ])
+        db.session.commit()
+        rendered += len(rows)
+        last_id = rows[-1][0]
+        click.echo(f'Rendered {rendered} explanations...')
+
+    click.echo(f'Rendered {rendered} explanations with formatter version {FORMATTER_VERSION} ({segmenter}).')
@@ -0,0 +1,49 @@
+"""
+CLI commands for background reprocessing jobs.
+"""
+import click
+from flask.cli import with_appcontext
+from app.models import ReprocessJob
+from app.utils.reprocess_jobs import create_job, run_job, resumable_jobs
+
+@click.group()
+def jobs():
+    """Manage update reprocessing jobs."""
+    pass
+
+@jobs.command('list')
+@with_appcontext
+def list_jobs():
+    """Show recent reprocessing jobs and their progress."""
+    for job in ReprocessJob.query.order_by(ReprocessJob.id.desc()).limit(20):
+        scope = f'catalog v{job.catalog_version}' if job.catalog_version is not None else 'all rows'
+        click.echo(f'#{job.id} {job.provider} ({scope}): {job.status} '
+                   f'{job.processed}/{job.total} processed, {job.changed} changed, last id {job.last_id}'
+                   + (f' - {job.error}' if job.error else ''))
+
+@jobs.command()
+@click.argument('provider', type=click.Choice(['aws', 'azure']))
+@click.option('--catalog-version', type=int, default=None, help='Only reprocess AWS updates affected by this catalog version')
+@click.option('--chunk-size', type=int, default=None, help='Rows per committed chunk')
+@with_appcontext
+def reprocess(provider, catalog_version, chunk_size):
+    """Create a reprocessing job and run it in the foreground."""
+    job = create_job(provider, catalog_version=catalog_version, chunk_size=chunk_size)
+    job = run_job(job.id)
+    click.echo(f'Job #{job.id} {job.status}: {job.processed}/{job.total} processed, {job.changed} changed.')
+
+@jobs.command()
+@with_appcontext
+def resume():
+    """Resume pending, failed or stalled jobs from their last checkpoint."""
+    pending = resumable_jobs()
+    if not pending:
+        click.echo('No jobs to resume.')
+        return
+    for job in pending:
+        job_id = job.id
+        job = run_job(job_id)
+        if job is None:
+            click.echo(f'Job #{job_id} is owned by another worker, skipped.')
+        else:
+            click.echo(f'Job #{job.id} {job.status}: {job.processed}/{job.total} processed, {job.changed} changed.')
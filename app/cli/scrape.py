@@ -3,6 +3,8 @@ import click
 from flask.cli import with_appcontext
 from app.scraper.aws_scraper import AWSScraper
 from app.scraper.azure_scraper import AzureScraper
+from app.utils.feed_archive import get_archive
+from app.utils.feed_replay import replay_archives
 
 @click.group()
 def scrape():
@@ -24,3 +26,25 @@ def azure():
     scraper = AzureScraper()
     scraper.scrape()
     click.echo('Successfully scraped Azure updates.')
+
+@scrape.command()
+@click.option('--provider', type=click.Choice(['aws', 'azure']), default=None, help='Only replay archives from this provider')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='Only replay payloads fetched on or after this date')
+@click.option('--workers', type=int, default=None, help='Parser processes (default: CPU count)')
+@click.option('--dry-run', is_flag=True, help='Parse only, without writing to the database')
+@with_appcontext
+def replay(provider, since, workers, dry_run):
+    """Re-ingest archived feed payloads instead of fetching from the network."""
+    archive = get_archive()
+    if archive is None:
+        click.echo('Feed archiving is disabled (FEED_ARCHIVE_ENABLED).')
+        return
+    records = archive.records(provider=provider, since=since)
+    if not records:
+        click.echo(f'No archived payloads found in {archive.root}.')
+        return
+
+    summary = replay_archives(archive, records, workers=workers, store=not dry_run)
+    click.echo(f"Replayed {summary['archives']} archives with {summary['workers']} workers in {summary['seconds']}s: "
+               f"{summary['parsed']} entries parsed, {summary['added']} new updates"
+               + (' (dry run)' if dry_run else '') + '.')
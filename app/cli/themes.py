@@ -2,6 +2,7 @@
 import click
 from datetime import datetime, timedelta
 from flask.cli import with_appcontext
+from sqlalchemy.orm import undefer
 from app.models import Update, WeeklyTheme
 from app.utils.theme_analyzer import ThemeAnalyzer, get_week_start
 from app import db
@@ -22,7 +23,7 @@ def generate(week=None):
         week_start = get_week_start(datetime.utcnow())
     
     # Get updates for the week
-    updates = Update.query.filter(
+    updates = Update.query.options(undefer(Update.description)).filter(
         Update.published_date >= week_start,
         Update.published_date < week_start + timedelta(days=7)
     ).all()
@@ -24,82 +24,177 @@ to ensure its accuracy and functionality, users should:
 
 from app import db
 from datetime import datetime
+from sqlalchemy.dialects.postgresql import JSONB
 import json
 
+class JSONText(db.TypeDecorator):
+    """JSON array kept as TEXT, or as JSONB on PostgreSQL.
+
+    The attribute value is the JSON text on every backend, so code reading the
+    raw column (tag sync, backfills) does not depend on the database.
+    """
+    impl = db.Text
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(JSONB())
+        return dialect.type_descriptor(db.Text())
+
+    def process_bind_param(self, value, dialect):
+        if dialect.name == 'postgresql' and value is not None:
+            return json.loads(value)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if dialect.name == 'postgresql' and value is not None:
+            return json.dumps(value)
+        return value
+
+def _json_property(attr):
+    """Read/write property for a JSON list stored as text in column attribute ``attr``.
+
+    Decoded values are cached on the instance together with the text they came
+    from, so repeated reads (templates touch each list several times) decode
+    once. A new text value, from the setter or a reload, replaces the cache
+    entry. Each read returns a copy of the cached list, so callers may mutate it.
+    """
+    cache_key = f'{attr}_decoded'
+
+    def getter(self):
+        raw = getattr(self, attr)
+        hit = self.__dict__.get(cache_key)
+        if hit is not None and hit[0] is raw:
+            return list(hit[1])
+        value = json.loads(raw)
+        self.__dict__[cache_key] = (raw, value)
+        return list(value)
+
+    def setter(self, value):
+        if isinstance(value, str):
+            value = [value]
+        elif isinstance(value, (list, tuple)):
+            value = list(value)
+        else:
+            value = []
+        raw = json.dumps(value)
+        setattr(self, attr, raw)
+        self.__dict__[cache_key] = (raw, value)
+
+    return property(getter, setter)
+
 class Update(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     provider = db.Column(db.String(10), nullable=False)  # 'aws' or 'azure'
     title = db.Column(db.String(500), nullable=False)
-    description = db.Column(db.Text)
+    # Large text columns are deferred: queries that render them undefer them explicitly
+    description = db.deferred(db.Column(db.Text))
     url = db.Column(db.String(500))
     published_date = db.Column(db.DateTime, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    _categories = db.Column('categories', db.Text, default='[]')  # JSON array of categories
-    _update_types = db.Column('update_types', db.Text, default='[]')  # JSON array of update types
+    _categories = db.Column('categories', JSONText, default='[]')  # JSON array of categories
+    _update_types = db.Column('update_types', JSONText, default='[]')  # JSON array of update types
     product_name = db.Column(db.String(100))  # Primary product name (first one for Azure)
-    _status = db.Column('status', db.Text, default='[]')  # JSON array of status tags (for Azure)
-    _product_names = db.Column('product_names', db.Text, default='[]')  # JSON array of all product names (for Azure)
-    explanation = db.Column(db.Text)  # Brief explanation of the update generated by LLM
+    _status = db.Column('status', JSONText, default='[]')  # JSON array of status tags (for Azure)
+    _product_names = db.Column('product_names', JSONText, default='[]')  # JSON array of all product names (for Azure)
+    explanation = db.deferred(db.Column(db.Text))  # Brief explanation of the update generated by LLM
+    # The explanation rendered to HTML when it is stored, and the formatter version and segmenter that rendered it
+    explanation_html = db.deferred(db.Column(db.Text), group='explanation_html')
+    explanation_format_version = db.deferred(db.Column(db.Integer), group='explanation_html')
+    explanation_segmenter = db.deferred(db.Column(db.String(20)), group='explanation_html')
     
     __table_args__ = (
         db.UniqueConstraint('provider', 'title', 'published_date', name='unique_update'),
+        # Listing order and keyset pagination seek: provider = ? ORDER BY published_date DESC, id DESC
+        # (SQLite walks the index backwards for the descending order)
+        db.Index('ix_update_provider_published_id', 'provider', 'published_date', 'id'),
+        # AWS product filter: provider = ? AND product_name IN (...)
+        db.Index('ix_update_provider_product', 'provider', 'product_name'),
+        # Provider-independent week ranges in the insights and themes generators
+        db.Index('ix_update_published_date', 'published_date'),
+        # No GIN indexes on the tag columns: tag filters join the update_*_tags tables
     )
     
-    @property
-    def categories(self):
-        return json.loads(self._categories)
-    
-    @categories.setter
-    def categories(self, value):
-        if isinstance(value, str):
-            self._categories = json.dumps([value])
-        elif isinstance(value, (list, tuple)):
-            self._categories = json.dumps(list(value))
-        else:
-            self._categories = '[]'
-    
-    @property
-    def update_types(self):
-        return json.loads(self._update_types)
-    
-    @update_types.setter
-    def update_types(self, value):
-        if isinstance(value, str):
-            self._update_types = json.dumps([value])
-        elif isinstance(value, (list, tuple)):
-            self._update_types = json.dumps(list(value))
-        else:
-            self._update_types = '[]'
-    
-    @property
-    def status(self):
-        return json.loads(self._status)
-    
-    @status.setter
-    def status(self, value):
-        if isinstance(value, str):
-            self._status = json.dumps([value])
-        elif isinstance(value, (list, tuple)):
-            self._status = json.dumps(list(value))
-        else:
-            self._status = '[]'
-    
-    @property
-    def product_names(self):
-        return json.loads(self._product_names)
-    
-    @product_names.setter
-    def product_names(self, value):
-        if isinstance(value, str):
-            self._product_names = json.dumps([value])
-        elif isinstance(value, (list, tuple)):
-            self._product_names = json.dumps(list(value))
-        else:
-            self._product_names = '[]'
+    # Decoded JSON lists, cached per instance (see _json_property)
+    categories = _json_property('_categories')
+    update_types = _json_property('_update_types')
+    status = _json_property('_status')
+    product_names = _json_property('_product_names')
 
     def __repr__(self):
         return f'<Update {self.provider}:{self.title}>'
 
+def _update_tag_table(name):
+    """Association table linking updates to one kind of tag.
+
+    The primary key serves per-update lookups and the (name, update_id) index
+    serves "updates tagged X" filters without touching the update rows.
+    """
+    return db.Table(
+        name,
+        db.Column('update_id', db.Integer, db.ForeignKey('update.id', ondelete='CASCADE'), primary_key=True),
+        db.Column('name', db.String(200), primary_key=True),
+        db.Index(f'ix_{name}_name_update', 'name', 'update_id')
+    )
+
+# Normalized copies of the JSON tag columns, kept in sync by app.utils.update_tags
+update_product_tags = _update_tag_table('update_product_tags')
+update_type_tags = _update_tag_table('update_type_tags')
+update_status_tags = _update_tag_table('update_status_tags')
+UPDATE_TAG_TABLES = {
+    'product': update_product_tags,
+    'type': update_type_tags,
+    'status': update_status_tags
+}
+
+class FacetCount(db.Model):
+    """Number of updates per provider and tag, read by the listing filter sidebars."""
+    __tablename__ = 'facet_counts'
+
+    provider = db.Column(db.String(10), primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True)  # 'product', 'type' or 'status'
+    name = db.Column(db.String(200), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<FacetCount {self.provider}:{self.kind}:{self.name}={self.count}>'
+
+class InsightRollup(db.Model):
+    """Number of updates per week, provider and product/category, read by the insights page."""
+    __tablename__ = 'insight_rollups'
+
+    week_start = db.Column(db.DateTime, primary_key=True)  # Monday 00:00
+    provider = db.Column(db.String(10), primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True)  # 'update' (weekly total), 'product' or 'category'
+    name = db.Column(db.String(200), primary_key=True)  # '' for the weekly totals
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<InsightRollup {self.week_start:%Y-%m-%d}:{self.provider}:{self.kind}:{self.name}={self.count}>'
+
+class InsightTotal(db.Model):
+    """All-time number of updates per provider and product/category (the rollups summed over weeks)."""
+    __tablename__ = 'insight_totals'
+
+    provider = db.Column(db.String(10), primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True)  # 'update' (provider total), 'product' or 'category'
+    name = db.Column(db.String(200), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<InsightTotal {self.provider}:{self.kind}:{self.name}={self.count}>'
+
+class DataVersion(db.Model):
+    """Single row counting committed writes to the data pages show, for HTTP validators."""
+    __tablename__ = 'data_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<DataVersion {self.version} at {self.updated_at}>'
+
 class WeeklyInsight(db.Model):
     """Weekly insights from updates."""
     __tablename__ = 'weekly_insights'
@@ -114,6 +209,10 @@ class WeeklyInsight(db.Model):
     is_cumulative = db.Column(db.Boolean, default=False)  # Flag to identify cumulative insights
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_weekly_insights_cumulative_week', 'is_cumulative', 'week_start'),
+    )
+
     def __repr__(self):
         return f'<WeeklyInsight {self.week_start} - {self.week_end}>'
 
@@ -128,22 +227,154 @@ class WeeklyTheme(db.Model):
     update_count = db.Column(db.Integer)  # Number of updates in this theme
     _services = db.Column('services', db.Text, default='[]')  # List of services involved in this theme
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_weekly_theme_week_provider', 'week_start', 'provider'),
+    )
+    
+    services = _json_property('_services')
     
+    def __repr__(self):
+        return f'<WeeklyTheme {self.provider} - {self.theme_name} ({self.week_start.strftime("%Y-%m-%d")})>'
+
+class ServiceCatalogVersion(db.Model):
+    """Versioned snapshot of the AWS service catalog with its diff to the previous version."""
+    __tablename__ = 'service_catalog_versions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    provider = db.Column(db.String(10), nullable=False, default='aws')
+    version = db.Column(db.Integer, nullable=False)
+    _services = db.Column('services', db.Text, default='[]')  # JSON array of all service names
+    _added = db.Column('added', db.Text, default='[]')  # JSON array of names new in this version
+    _removed = db.Column('removed', db.Text, default='[]')  # JSON array of names dropped in this version
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    reprocessed_at = db.Column(db.DateTime)  # Set once affected updates have been reprocessed
+
+    __table_args__ = (
+        db.UniqueConstraint('provider', 'version', name='unique_catalog_version'),
+    )
+
     @property
     def services(self):
         return json.loads(self._services)
-    
+
     @services.setter
     def services(self, value):
-        if isinstance(value, str):
-            self._services = json.dumps([value])
-        elif isinstance(value, (list, tuple)):
-            self._services = json.dumps(list(value))
-        else:
-            self._services = '[]'
-    
+        self._services = json.dumps(sorted(value or []))
+
+    @property
+    def added(self):
+        return json.loads(self._added)
+
+    @added.setter
+    def added(self, value):
+        self._added = json.dumps(sorted(value or []))
+
+    @property
+    def removed(self):
+        return json.loads(self._removed)
+
+    @removed.setter
+    def removed(self, value):
+        self._removed = json.dumps(sorted(value or []))
+
+    @property
+    def is_baseline(self):
+        """The first recorded version has no predecessor to diff against."""
+        return self.version == 1
+
+    @property
+    def changed_names(self):
+        """All service names that were added or removed in this version."""
+        return sorted(set(self.added) | set(self.removed))
+
     def __repr__(self):
-        return f'<WeeklyTheme {self.provider} - {self.theme_name} ({self.week_start.strftime("%Y-%m-%d")})>'
+        return f'<ServiceCatalogVersion {self.provider} v{self.version} (+{len(self.added)}/-{len(self.removed)})>'
+
+class ReprocessJob(db.Model):
+    """Background job that reprocesses stored updates in keyset-ordered chunks."""
+    __tablename__ = 'reprocess_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    provider = db.Column(db.String(10), nullable=False)  # 'aws' or 'azure'
+    catalog_version = db.Column(db.Integer)  # Only reprocess updates affected by this AWS catalog version
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, completed, failed
+    chunk_size = db.Column(db.Integer, nullable=False, default=200)
+    last_id = db.Column(db.Integer, nullable=False, default=0)  # Checkpoint: highest update id already processed
+    total = db.Column(db.Integer, default=0)
+    processed = db.Column(db.Integer, default=0)
+    changed = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)  # Heartbeat, refreshed on every chunk commit
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'provider': self.provider,
+            'catalog_version': self.catalog_version,
+            'status': self.status,
+            'chunk_size': self.chunk_size,
+            'last_id': self.last_id,
+            'total': self.total,
+            'processed': self.processed,
+            'changed': self.changed,
+            'progress': round(self.processed / self.total, 4) if self.total else (1.0 if self.status == 'completed' else 0.0),
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<ReprocessJob {self.id} {self.provider} {self.status} {self.processed}/{self.total}>'
+
+class ExplanationBatch(db.Model):
+    """Explanations requested through the Message Batches API, tracked until their results are stored."""
+    __tablename__ = 'explanation_batches'
+
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(db.String(100), unique=True)  # Provider's id, set once the batch is submitted
+    # pending (not submitted yet), in_progress, completed (results stored), failed
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    _update_ids = db.Column('update_ids', db.Text, default='[]')  # JSON array of the requested update ids
+    request_count = db.Column(db.Integer, default=0)
+    succeeded = db.Column(db.Integer, default=0)
+    failed = db.Column(db.Integer, default=0)  # Errored, canceled or expired requests
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)  # Last submission or poll
+    finished_at = db.Column(db.DateTime)
+    # Process ('host:pid') allowed to poll the batch until lease_until, so only one writes its results
+    poller = db.Column(db.String(100))
+    lease_until = db.Column(db.DateTime)
+
+    @property
+    def update_ids(self):
+        return json.loads(self._update_ids)
+
+    @update_ids.setter
+    def update_ids(self, value):
+        self._update_ids = json.dumps(list(value or []))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'batch_id': self.batch_id,
+            'status': self.status,
+            'request_count': self.request_count,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'poller': self.poller
+        }
+
+    def __repr__(self):
+        return f'<ExplanationBatch {self.id} {self.batch_id} {self.status} {self.succeeded}/{self.request_count}>'
 
 class Theme(db.Model):
     """Theme model for storing themes generated by LLM."""
@@ -158,3 +389,6 @@ class Theme(db.Model):
 
     def __repr__(self):
         return f'<Theme {self.name} ({self.provider})>'
+
+# Register the flush listeners that keep the tag tables, insight rollups and data version in sync with Update
+from app.utils import data_version, update_tags, insights  # noqa: E402,F401
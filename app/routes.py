@@ -22,33 +22,51 @@ to ensure its accuracy and functionality, users should:
 4. Not rely on this code for critical systems without proper validation
 """
 
+import logging
 from datetime import datetime, timedelta, date
 from flask import render_template, flash, redirect, url_for, request, jsonify, current_app
 from sqlalchemy import func, extract
+from sqlalchemy.orm import undefer, undefer_group
 from app import db
-from app.models import Update, WeeklyInsight, WeeklyTheme
-from app.utils.update_analyzer import generate_explanation, format_explanation_text
+from app.models import Update, WeeklyTheme, ServiceCatalogVersion, ReprocessJob
+from app.utils.update_analyzer import generate_explanation, set_explanation, basic_explanation_html
+from app.utils.explanation_backfill import anthropic_client, backfill_explanations
+from app.utils.explanation_batches import (active_batches, record_batches, start_batch_poller,
+                                              start_batch_submission)
 from app.rag.embeddings import UpdateSearch
 from app.scraper.aws_scraper import AWSScraper
 from app.scraper.azure_scraper import AzureScraper
-from app.scraper.aws_services import AWSServicesFetcher
+from app.utils.service_catalog import refresh_aws_catalog
 from app.utils.theme_analyzer_llm import LLMThemeAnalyzer
 from app.utils.theme_analyzer import get_week_start
 from app.utils.cleaner import clean_all_updates
 from app.utils.scraper import scrape_aws_updates, scrape_azure_updates
+from app.utils.reprocess_jobs import create_job, start_job, find_active_job
+from app.utils.update_tags import tagged_update_ids
+from app.utils.facets import get_facet_counts
+from app.utils.pagination import paginate_updates
+from app.utils.db_engine import read_only
+from app.utils.data_version import cached_page
+from app.utils.fragment_cache import cached_fragment, fragment_stats, request_params
+from app.utils.clean_updates import retention_cutoff
+from app.utils.update_archive import archive_expired_updates, archived_count, archived_updates, update_sources
+from app.utils.insights import rebuild_rollups, weekly_insights, insight_for_week, all_time_insight
+from app.utils.timeseries import KINDS as TIMESERIES_KINDS, GRANULARITIES, bucket_count, get_store
+
+logger = logging.getLogger(__name__)
 
 # Initialize search system
 update_search = UpdateSearch()
+archive_search = UpdateSearch()
 
 def get_update_counts():
     """Get the total counts of AWS and Azure updates."""
-    aws_count = Update.query.filter_by(provider='aws').count()
-    azure_count = Update.query.filter_by(provider='azure').count()
-    return aws_count, azure_count
+    counts = dict(db.session.query(Update.provider, func.count(Update.id)).group_by(Update.provider).all())
+    return counts.get('aws', 0), counts.get('azure', 0)
 
 def rebuild_search_index():
     """Rebuild the search index with all updates."""
-    updates = Update.query.all()
+    updates = Update.query.options(undefer(Update.description)).all()
     update_search.build_index(updates)
 
 def get_available_weeks():
@@ -68,6 +86,31 @@ def get_available_weeks():
     
     return weeks
 
+def same_day(column, day):
+    """Predicates matching ``column`` values on the calendar day of ``day``.
+
+    Unlike ``func.date(column) == ...`` this is a range on the bare column, so
+    an index on it can be used.
+    """
+    start = datetime.combine(day.date() if isinstance(day, datetime) else day, datetime.min.time())
+    return column >= start, column < start + timedelta(days=1)
+
+def paginate_listing(query, page, count_key):
+    """Keyset-paginate an update listing from the request's cursor or page number."""
+    per_page = current_app.config.get('UPDATES_PER_PAGE', 20)
+    # The page number travels with cursor links for display only
+    page = request.args.get('p', page, type=int)
+    try:
+        return paginate_updates(query, per_page, page=page, after=request.args.get('after'),
+                                before=request.args.get('before'), count_key=count_key)
+    except ValueError:
+        # A malformed cursor falls back to plain page-number pagination
+        return paginate_updates(query, per_page, page=page, count_key=count_key)
+
+def listing_filter_args():
+    """The request's filter parameters, for building pagination links."""
+    return {key: values for key, values in request.args.lists() if key not in ('after', 'before', 'p')}
+
 def init_routes(app):
     @app.context_processor
     def inject_now():
@@ -81,386 +124,261 @@ def init_routes(app):
         }    
     
     @app.route('/')
+    @read_only
+    @cached_page
     def index():
         """Home page."""
-        # Get the latest week that has themes
-        latest_theme = WeeklyTheme.query.order_by(WeeklyTheme.week_start.desc()).first()
-        if latest_theme:
-            latest_week = latest_theme.week_start
-            themes = WeeklyTheme.query.filter_by(week_start=latest_week).all()
-        else:
-            themes = []
-        
-        # Split themes by provider
-        aws_themes = [t for t in themes if t.provider == 'aws']
-        azure_themes = [t for t in themes if t.provider == 'azure']
-        
+        def render_theme_cards():
+            # Get the latest week that has themes
+            latest_theme = WeeklyTheme.query.order_by(WeeklyTheme.week_start.desc()).first()
+            if latest_theme:
+                latest_week = latest_theme.week_start
+                themes = WeeklyTheme.query.filter_by(week_start=latest_week).all()
+            else:
+                themes = []
+
+            # Split themes by provider
+            return render_template(
+                'theme_cards.html',
+                aws_themes=[t for t in themes if t.provider == 'aws'],
+                azure_themes=[t for t in themes if t.provider == 'azure'],
+                themes=themes  # Used to check if any themes exist
+            )
+
         # Get latest 3 updates for each provider
-        latest_aws_updates = Update.query.filter_by(provider='aws').order_by(Update.published_date.desc()).limit(3).all()
-        latest_azure_updates = Update.query.filter_by(provider='azure').order_by(Update.published_date.desc()).limit(3).all()
+        latest = Update.query.options(undefer(Update.description)).order_by(Update.published_date.desc())
+        latest_aws_updates = latest.filter_by(provider='aws').limit(3).all()
+        latest_azure_updates = latest.filter_by(provider='azure').limit(3).all()
         
         return render_template(
             'index.html',
-            aws_themes=aws_themes,
-            azure_themes=azure_themes,
-            themes=themes,  # Used to check if any themes exist
+            theme_cards_html=cached_fragment('theme_cards.html', {}, render_theme_cards),
             latest_aws_updates=latest_aws_updates,
             latest_azure_updates=latest_azure_updates
         )
 
     @app.route('/themes')
+    @read_only
+    @cached_page
     def themes():
         """Display themes for a specific week."""
         try:
-            # Get all available weeks first
-            weeks_with_themes = db.session.query(
-                WeeklyTheme.week_start
-            ).distinct().order_by(
-                WeeklyTheme.week_start.desc()
-            ).all()
+            def render_theme_week():
+                # Get all available weeks first
+                weeks_with_themes = db.session.query(
+                    WeeklyTheme.week_start
+                ).distinct().order_by(
+                    WeeklyTheme.week_start.desc()
+                ).all()
             
-            weeks = [week[0] for week in weeks_with_themes]
-            print(f"Available weeks: {weeks}")  # Debug print
+                weeks = [week[0] for week in weeks_with_themes]
             
-            # Get week parameter or use most recent week
-            week_param = request.args.get('week')
-            print(f"Week param: {week_param}")  # Debug print
+                # Get week parameter or use most recent week
+                week_param = request.args.get('week')
+                logger.debug("Themes request: week=%s available=%d", week_param, len(weeks))
             
-            if week_param:
-                try:
-                    # Try multiple date formats to handle different inputs
-                    for date_format in ['%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S']:
-                        try:
-                            selected_week = datetime.strptime(week_param, date_format)
-                            break
-                        except ValueError:
-                            continue
-                    else:
-                        # If none of the formats worked, raise ValueError
-                        raise ValueError(f"Could not parse date: {week_param}")
+                if week_param:
+                    try:
+                        # Try multiple date formats to handle different inputs
+                        for date_format in ['%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S']:
+                            try:
+                                selected_week = datetime.strptime(week_param, date_format)
+                                break
+                            except ValueError:
+                                continue
+                        else:
+                            # If none of the formats worked, raise ValueError
+                            raise ValueError(f"Could not parse date: {week_param}")
                         
-                    # Ensure we're using the start of the week
-                    selected_week = get_week_start(selected_week)
-                    print(f"Parsed selected week: {selected_week}")  # Debug print
-                except ValueError as e:
-                    print(f"Error parsing week parameter: {week_param} - {str(e)}")  # Debug print
+                        # Ensure we're using the start of the week
+                        selected_week = get_week_start(selected_week)
+                    except ValueError as e:
+                        logger.debug("Error parsing week parameter %r: %s", week_param, e)
+                        selected_week = weeks[0] if weeks else get_week_start(datetime.utcnow())
+                else:
+                    # Use most recent week with themes, or current week if none
                     selected_week = weeks[0] if weeks else get_week_start(datetime.utcnow())
-            else:
-                # Use most recent week with themes, or current week if none
-                selected_week = weeks[0] if weeks else get_week_start(datetime.utcnow())
             
-            print(f"Selected week: {selected_week}")  # Debug print
             
-            # Get themes for the selected week
-            # Use func.date() to compare only the date part
-            themes = WeeklyTheme.query.filter(
-                func.date(WeeklyTheme.week_start) == func.date(selected_week)
-            ).order_by(
-                WeeklyTheme.provider,
-                WeeklyTheme.relevance_score.desc()
-            ).all()
+                # Get themes for the selected week, comparing only the date part
+                themes = WeeklyTheme.query.filter(
+                    *same_day(WeeklyTheme.week_start, selected_week)
+                ).order_by(
+                    WeeklyTheme.provider,
+                    WeeklyTheme.relevance_score.desc()
+                ).all()
             
-            print(f"Found {len(themes)} themes for week {selected_week}")  # Debug print
-            for theme in themes:
-                print(f"- {theme.theme_name} ({theme.provider})")  # Debug print
+                logger.debug("Found %d themes for week %s", len(themes), selected_week)
             
-            # If no themes found for the selected week, check if we need to convert the date
-            if not themes and week_param:
-                print(f"No themes found for {selected_week}, trying alternative date formats")
+                # If no themes found for the selected week, check if we need to convert the date
+                if not themes and week_param:
+                    logger.debug("No themes found for %s, trying nearby weeks", selected_week)
                 
-                # Try to find the week by searching for a close match using only date part
-                for week in weeks:
-                    if abs((week.date() - selected_week.date()).days) < 7:
-                        print(f"Found close match: {week} for {selected_week}")
-                        selected_week = week
+                    # Try to find the week by searching for a close match using only date part
+                    for week in weeks:
+                        if abs((week.date() - selected_week.date()).days) < 7:
+                            logger.debug("Found close match %s for %s", week, selected_week)
+                            selected_week = week
                         
-                        # Get themes for the matched week using date comparison
-                        themes = WeeklyTheme.query.filter(
-                            func.date(WeeklyTheme.week_start) == func.date(selected_week)
-                        ).order_by(
-                            WeeklyTheme.provider,
-                            WeeklyTheme.relevance_score.desc()
-                        ).all()
+                            # Get themes for the matched week using date comparison
+                            themes = WeeklyTheme.query.filter(
+                                *same_day(WeeklyTheme.week_start, selected_week)
+                            ).order_by(
+                                WeeklyTheme.provider,
+                                WeeklyTheme.relevance_score.desc()
+                            ).all()
                         
-                        if themes:
-                            print(f"Found {len(themes)} themes using close match")
-                            break
+                            if themes:
+                                break
             
+                return render_template(
+                    'theme_week.html',
+                    themes=themes,
+                    selected_week=selected_week,
+                    weeks=weeks
+                )
+
             return render_template(
                 'themes.html',
-                themes=themes,
-                selected_week=selected_week,
-                weeks=weeks
+                theme_week_html=cached_fragment('theme_week.html', request_params(), render_theme_week)
             )
             
-        except Exception as e:
-            print(f"Error in themes route: {str(e)}")  # Debug print
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error in themes route")
             flash('Error loading themes. Please try again.', 'error')
             return redirect(url_for('index'))
 
     @app.route('/aws_updates')
     @app.route('/aws_updates/page/<int:page>')
+    @read_only
+    @cached_page
     def aws_updates(page=1):
         """Show AWS updates."""
-        # Get filter parameters
-        selected_categories = request.args.getlist('category')
+        def render_listing():
+            # Get filter parameters
+            selected_categories = request.args.getlist('category')
         
-        # Build query
-        query = Update.query.filter_by(provider='aws')
+            # Build query
+            query = Update.query.filter_by(provider='aws').options(undefer(Update.description))
         
-        # Apply product filter if selected
-        if selected_categories:
-            query = query.filter(Update.product_name.in_(selected_categories))
+            # Apply product filter if selected
+            if selected_categories:
+                query = query.filter(Update.product_name.in_(selected_categories))
         
-        # Get paginated results
-        updates = query.order_by(Update.published_date.desc()).paginate(
-            page=page, per_page=20, error_out=False
-        )
-        total_pages = updates.pages
+            # Get a keyset-paginated page of results
+            updates = paginate_listing(query, page, ('aws', tuple(sorted(selected_categories))))
 
-        # Debug print for first 3 updates
-        print("=== AWS Updates Debug ===")
-        for upd in updates.items[:3]:
-            print(f"Title: {upd.title}")
-            print(f"Product: {getattr(upd, 'product_name', None)}")
-            print(f"Categories: {getattr(upd, 'categories', None)}")
-            print(f"Types: {getattr(upd, 'update_types', None)}")
-            print(f"Status: {getattr(upd, 'status', None)}")
-            print("---")
+            if logger.isEnabledFor(logging.DEBUG):
+                for upd in updates.items[:3]:
+                    logger.debug("AWS update: title=%r product=%s categories=%s",
+                                 upd.title, upd.product_name, upd.categories)
 
-        # Get unique product names for filter
-        products = db.session.query(Update.product_name).filter(
-            Update.provider == 'aws',
-            Update.product_name.isnot(None)
-        ).distinct().order_by(Update.product_name).all()
-        products = [p[0] for p in products if p[0]]  # Remove None values
+            # Product names and counts for the filter come from the precomputed facet table
+            facet_counts = get_facet_counts('aws', kinds=('product',))
+            products = sorted(set(facet_counts['product']) | set(selected_categories))
+
+            return render_template(
+                'update_listing.html',
+                updates=updates.items,
+                provider='aws',
+                page=updates.page,
+                total_pages=updates.pages,
+                pagination=updates,
+                filter_args=listing_filter_args(),
+                categories=products,
+                facet_counts=facet_counts,
+                selected_categories=selected_categories
+            )
 
         return render_template(
             'base_updates.html',
-            updates=updates.items,
             provider='aws',
-            page=page,
-            total_pages=total_pages,
-            categories=products,
-            selected_categories=selected_categories
+            listing_html=cached_fragment('update_listing.html', request_params(), render_listing)
         )
 
     @app.route('/azure_updates')
     @app.route('/azure_updates/page/<int:page>')
+    @read_only
+    @cached_page
     def azure_updates(page=1):
         """Show Azure updates."""
-        # Get filter parameters
-        selected_products = request.args.getlist('category')  # Keep parameter name for backwards compatibility
-        selected_types = request.args.getlist('type')
-        selected_statuses = request.args.getlist('status')
-        
-        # Build query
-        query = Update.query.filter_by(provider='azure')
-        
-        # Apply product filter if selected
-        if selected_products:
-            # Filter for updates where any of the selected products exist in the product_names array
-            product_filters = []
-            for product in selected_products:
-                # Need to use the _product_names column (JSON string) for filtering
-                product_filters.append(Update._product_names.like(f'%"{product}"%'))
-            query = query.filter(db.or_(*product_filters))
-        
-        # Apply type filter if selected
-        if selected_types:
-            # Filter for updates where any of the selected types exist in the update_types array
-            type_filters = []
-            for update_type in selected_types:
-                # Need to use the _update_types column (JSON string) for filtering
-                type_filters.append(Update._update_types.like(f'%"{update_type}"%'))
-            query = query.filter(db.or_(*type_filters))
-            
-        # Apply status filter if selected
-        if selected_statuses:
-            # Filter for updates where any of the selected statuses exist in the status array
-            status_filters = []
-            for status in selected_statuses:
-                # Need to use the _status column (JSON string) for filtering
-                status_filters.append(Update._status.like(f'%"{status}"%'))
-            query = query.filter(db.or_(*status_filters))
-        
-        # Get paginated results
-        updates = query.order_by(Update.published_date.desc()).paginate(
-            page=page, per_page=20, error_out=False
-        )
-        total_pages = updates.pages
-
-        # Debug print for first 3 updates
-        print("=== Azure Updates Debug ===")
-        for upd in updates.items[:3]:
-            print(f"Title: {upd.title}")
-            print(f"Product: {getattr(upd, 'product_name', None)}")
-            print(f"Products: {getattr(upd, 'product_names', [])}")
-            print(f"Types: {getattr(upd, 'update_types', [])}")
-            print(f"Status: {getattr(upd, 'status', [])}")
-            print("---")
+        def render_listing():
+            # Get filter parameters
+            selected_products = request.args.getlist('category')  # Keep parameter name for backwards compatibility
+            selected_types = request.args.getlist('type')
+            selected_statuses = request.args.getlist('status')
+        
+            # Build query
+            query = Update.query.filter_by(provider='azure').options(undefer(Update.description))
+        
+            # Apply tag filters; each is an index lookup on its tag table, OR-ed within a kind
+            if selected_products:
+                query = query.filter(Update.id.in_(tagged_update_ids('product', selected_products)))
+            if selected_types:
+                query = query.filter(Update.id.in_(tagged_update_ids('type', selected_types)))
+            if selected_statuses:
+                query = query.filter(Update.id.in_(tagged_update_ids('status', selected_statuses)))
+        
+            # Get a keyset-paginated page of results
+            updates = paginate_listing(query, page, ('azure', tuple(sorted(selected_products)),
+                                                     tuple(sorted(selected_types)), tuple(sorted(selected_statuses))))
+
+            if logger.isEnabledFor(logging.DEBUG):
+                for upd in updates.items[:3]:
+                    logger.debug("Azure update: title=%r products=%s types=%s status=%s",
+                                 upd.title, upd.product_names, upd.update_types, upd.status)
+
+            # Filter values with counts conditioned on the other selected filters
+            facet_counts = get_facet_counts('azure', {
+                'product': selected_products,
+                'type': selected_types,
+                'status': selected_statuses
+            })
+            products = set(facet_counts['product']) | set(selected_products)
+            types = set(facet_counts['type']) | set(selected_types)
+            # Always offer the known status values, even before any update carries them
+            statuses = set(facet_counts['status']) | set(selected_statuses) | {'In development', 'In preview', 'Launched'}
 
-        # Get unique products, types, and statuses for filters
-        products = set()
-        types = set()
-        statuses = set()
-        
-        # Add hardcoded status values to ensure they're always available
-        statuses.update(['In development', 'In preview', 'Launched'])
-        
-        azure_updates = Update.query.filter_by(provider='azure').all()
-        for update in azure_updates:
-            try:
-                if hasattr(update, 'product_names') and update.product_names:
-                    products.update(update.product_names)
-                elif hasattr(update, 'categories') and update.categories:
-                    # Fallback to categories if product_names is empty
-                    products.update(update.categories)
-                    
-                if hasattr(update, 'update_types') and update.update_types:
-                    types.update(update.update_types)
-                    
-                if hasattr(update, 'status') and update.status:
-                    statuses.update(update.status)
-            except Exception as e:
-                print(f"Error processing update {update.id}: {str(e)}")
-        
-        print(f"Found {len(products)} products, {len(types)} types, and {len(statuses)} statuses")
+            return render_template(
+                'update_listing.html',
+                updates=updates.items,
+                provider='azure',
+                page=updates.page,
+                total_pages=updates.pages,
+                pagination=updates,
+                filter_args=listing_filter_args(),
+                categories=sorted(products),  # Keep template variable name for backwards compatibility
+                types=sorted(types),
+                statuses=sorted(statuses),
+                facet_counts=facet_counts,
+                selected_categories=selected_products,  # Keep template variable name for backwards compatibility
+                selected_types=selected_types,
+                selected_statuses=selected_statuses
+            )
 
         return render_template(
             'base_updates.html',
-            updates=updates.items,
             provider='azure',
-            page=page,
-            total_pages=total_pages,
-            categories=sorted(products),  # Keep template variable name for backwards compatibility
-            types=sorted(types),
-            statuses=sorted(statuses),
-            selected_categories=selected_products,  # Keep template variable name for backwards compatibility
-            selected_types=selected_types,
-            selected_statuses=selected_statuses
+            listing_html=cached_fragment('update_listing.html', request_params(), render_listing)
         )
 
     @app.route('/admin/generate_insights', methods=['POST'])
     def admin_generate_insights():
-        """Generate insights from updates."""
+        """Recount the insight rollups from every update, archived ones included.
+
+        The rollups are maintained as updates are written, so this is only
+        needed to repair them.
+        """
         try:
-            # Clear existing insights
-            WeeklyInsight.query.delete()
-            
-            # Find the earliest and latest update dates
-            earliest_update = Update.query.order_by(Update.published_date.asc()).first()
-            latest_update = Update.query.order_by(Update.published_date.desc()).first()
+            with update_sources(include_archive=True) as sources:
+                written = rebuild_rollups(sources)
             
-            if not earliest_update or not latest_update:
+            if not written:
                 flash('No updates found to generate insights from.', 'error')
                 return redirect(url_for('admin'))
             
-            # Start from the beginning of the week of the earliest update
-            start_date = get_week_start(earliest_update.published_date)
-            
-            # End at the end of the current week
-            end_date = get_week_start(datetime.utcnow()) + timedelta(days=7)
-            
-            # Define categories to ignore
-            ignored_categories = {'In preview', 'Launched', 'General availability', 'Generally available'}
-            
-            # Dictionaries for tracking cumulative counts across all weeks
-            cumulative_aws_products = {}
-            cumulative_azure_categories = {}
-            
-            # Generate insights for each week
-            current_week = start_date
-            while current_week < end_date:
-                week_end = current_week + timedelta(days=7)
-                
-                # Get updates for this week
-                aws_updates = Update.query.filter(
-                    Update.provider == 'aws',
-                    Update.published_date >= current_week,
-                    Update.published_date < week_end
-                ).all()
-                
-                azure_updates = Update.query.filter(
-                    Update.provider == 'azure',
-                    Update.published_date >= current_week,
-                    Update.published_date < week_end
-                ).all()
-                
-                # Count updates
-                aws_count = len(aws_updates)
-                azure_count = len(azure_updates)
-                
-                if aws_count > 0 or azure_count > 0:
-                    # Calculate weekly AWS products
-                    weekly_aws_products = {}
-                    for update in aws_updates:
-                        if update.product_name:
-                            weekly_aws_products[update.product_name] = weekly_aws_products.get(update.product_name, 0) + 1
-                            # Also update cumulative counts
-                            cumulative_aws_products[update.product_name] = cumulative_aws_products.get(update.product_name, 0) + 1
-                    
-                    # Calculate weekly Azure categories
-                    weekly_azure_categories = {}
-                    for update in azure_updates:
-                        # For Azure, use the categories but ignore status categories
-                        categories = [cat for cat in update.categories if cat not in ignored_categories]
-                        for category in categories:
-                            weekly_azure_categories[category] = weekly_azure_categories.get(category, 0) + 1
-                            # Also update cumulative counts
-                            cumulative_azure_categories[category] = cumulative_azure_categories.get(category, 0) + 1
-                    
-                    # Get top weekly products/categories for this specific week
-                    aws_top_products = [
-                        {"name": name, "count": count}
-                        for name, count in sorted(weekly_aws_products.items(), key=lambda x: x[1], reverse=True)[:5]
-                    ]
-                    
-                    azure_top_categories = [
-                        {"name": name, "count": count}
-                        for name, count in sorted(weekly_azure_categories.items(), key=lambda x: x[1], reverse=True)[:5]
-                    ]
-                    
-                    # Create insight
-                    insight = WeeklyInsight(
-                        week_start=current_week,
-                        week_end=week_end,
-                        aws_updates=aws_count,
-                        azure_updates=azure_count,
-                        aws_top_products=aws_top_products,
-                        azure_top_categories=azure_top_categories
-                    )
-                    db.session.add(insight)
-                
-                current_week = week_end
-            
-            # Calculate cumulative top products/categories across all weeks
-            cumulative_aws_top_products = [
-                {"name": name, "count": count}
-                for name, count in sorted(cumulative_aws_products.items(), key=lambda x: x[1], reverse=True)[:5]
-            ]
-            
-            cumulative_azure_top_categories = [
-                {"name": name, "count": count}
-                for name, count in sorted(cumulative_azure_categories.items(), key=lambda x: x[1], reverse=True)[:5]
-            ]
-            
-            # Create an insight for the "All Time" data
-            all_time_insight = WeeklyInsight(
-                week_start=start_date,
-                week_end=end_date,
-                aws_updates=Update.query.filter_by(provider='aws').count(),
-                azure_updates=Update.query.filter_by(provider='azure').count(),
-                aws_top_products=cumulative_aws_top_products,
-                azure_top_categories=cumulative_azure_top_categories,
-                is_cumulative=True  # Add a flag to identify this as cumulative data
-            )
-            db.session.add(all_time_insight)
-            
             db.session.commit()
-            flash('Successfully generated insights with cumulative totals.', 'success')
+            flash('Successfully regenerated insights with cumulative totals.', 'success')
         except Exception as e:
             db.session.rollback()
             flash(f'Error generating insights: {str(e)}', 'error')
@@ -474,14 +392,9 @@ def init_routes(app):
             # Get the selected week from the form
             selected_week_str = request.form.get('week')
             
-            # Debug print form data
-            print("\nForm data received:")
-            for key, value in request.form.items():
-                print(f"{key}: {value}")
-            
             # force_regenerate will only be present in form data if checkbox is checked
             force_regenerate = request.form.get('force_regenerate') is not None
-            print(f"Force regenerate value: {force_regenerate}")
+            logger.debug("Generate themes: week=%s force_regenerate=%s", selected_week_str, force_regenerate)
             
             if not selected_week_str:
                 flash('No week selected. Please select a week.', 'error')
@@ -490,35 +403,33 @@ def init_routes(app):
             # Parse the selected week
             try:
                 selected_week = datetime.fromisoformat(selected_week_str)
-                print(f"Selected week: {selected_week}")  # Debug print
             except ValueError:
                 flash('Invalid week format. Please try again.', 'error')
                 return redirect(url_for('admin'))
                 
-            # Calculate the end of the selected week
-            week_end = selected_week + timedelta(days=7)
-            
             # Check if themes already exist for this week using date comparison
             existing_themes = WeeklyTheme.query.filter(
-                func.date(WeeklyTheme.week_start) == func.date(selected_week)
+                *same_day(WeeklyTheme.week_start, selected_week)
             ).all()
             
             if existing_themes and not force_regenerate:
-                print(f"Themes exist and force_regenerate is {force_regenerate}")  # Debug print
                 flash(f'Themes already exist for week of {selected_week.strftime("%b %d, %Y")}. Use force regenerate if you want to recreate them.', 'info')
                 return redirect(url_for('admin'))
             
             # Get updates for the selected week using date comparison
-            updates = Update.query.filter(
-                Update.published_date >= func.date(selected_week),
-                Update.published_date < func.date(week_end)
-            ).all()
+            week_start_day = datetime.combine(selected_week.date(), datetime.min.time())
+            week_range = (Update.published_date >= week_start_day,
+                          Update.published_date < week_start_day + timedelta(days=7))
+            updates = Update.query.options(undefer(Update.description)).filter(*week_range).all()
+            # Weeks reaching back past the retention window may have been moved to the archive
+            if week_start_day < retention_cutoff():
+                updates += archived_updates(*week_range)
             
             if not updates:
                 flash(f'No updates found for the week of {selected_week.strftime("%b %d, %Y")}.', 'warning')
                 return redirect(url_for('admin'))
             
-            print(f"\nFound {len(updates)} updates for week of {selected_week.strftime('%b %d, %Y')}")  # Debug print
+            logger.info("Generating themes from %d updates for week of %s", len(updates), selected_week.date())
             
             # Group updates by provider
             aws_updates = [u for u in updates if u.provider.lower() == 'aws']
@@ -527,16 +438,15 @@ def init_routes(app):
             # Only delete existing themes if we're actually going to generate new ones
             # This happens either when force_regenerate is true or when no themes existed
             if force_regenerate or not existing_themes:
-                print(f"Deleting existing themes (force_regenerate: {force_regenerate}, existing_themes: {bool(existing_themes)})")  # Debug print
+                logger.debug("Deleting existing themes for week of %s", selected_week.date())
                 WeeklyTheme.query.filter(
-                    func.date(WeeklyTheme.week_start) == func.date(selected_week)
+                    *same_day(WeeklyTheme.week_start, selected_week)
                 ).delete(synchronize_session='fetch')
             
             # Generate themes for each provider if they have updates
             analyzer = LLMThemeAnalyzer()
             for provider, provider_updates in [('aws', aws_updates), ('azure', azure_updates)]:
                 if provider_updates:
-                    print(f"\nProcessing {provider} updates for week {selected_week}")  # Debug print
                     try:
                         themes = analyzer.generate_themes(provider_updates)
                           # Save themes
@@ -551,34 +461,25 @@ def init_routes(app):
                                 update_count=theme_data['update_count'],
                                 services=theme_data.get('services', [])
                             )
-                            print(f"Creating WeeklyTheme: {weekly_theme.theme_name} for week {weekly_theme.week_start}")  # Debug print
-                            print(f"Services for this theme: {theme_data.get('services', [])}")  # Debug print
+                            logger.debug("Creating %s theme %r", provider, weekly_theme.theme_name)
                             db.session.add(weekly_theme)
                         
-                    except Exception as e:
-                        print(f"Error generating themes for {provider} in week {selected_week}: {str(e)}")  # Debug print
+                    except Exception:
+                        logger.exception("Error generating %s themes for week of %s", provider, selected_week.date())
                         continue
             
             try:
                 db.session.commit()
-                print("\nSuccessfully committed themes to database")  # Debug print
-                # Query and print all weekly themes after commit
-                all_themes = WeeklyTheme.query.filter(
-                    func.date(WeeklyTheme.week_start) == func.date(selected_week)
-                ).all()
-                print(f"\nWeekly themes for {selected_week.strftime('%b %d, %Y')}:")
-                for t in all_themes:
-                    print(f"- {t.theme_name} (Provider: {t.provider})")
                 
                 flash(f'Successfully generated themes for week of {selected_week.strftime("%b %d, %Y")}.', 'success')
             except Exception as commit_error:
-                print(f"Error committing to database: {str(commit_error)}")
+                logger.error("Error committing themes: %s", commit_error)
                 db.session.rollback()
                 raise
             
         except Exception as e:
             db.session.rollback()
-            print(f"Error in theme generation: {str(e)}")  # Debug print
+            logger.exception("Error in theme generation")
             flash(f'Error generating themes: {str(e)}', 'error')
         
         return redirect(url_for('admin'))
@@ -586,9 +487,14 @@ def init_routes(app):
     @app.route('/admin/update_aws_products', methods=['POST'])
     def admin_update_aws_products():
         try:
-            aws_services_fetcher = AWSServicesFetcher()
-            services = aws_services_fetcher.get_services(refresh=True)
-            flash(f'Successfully updated AWS products list! Found {len(services)} products.', 'success')
+            services, catalog_version = refresh_aws_catalog()
+            message = f'Successfully updated AWS products list! Found {len(services)} products.'
+            if catalog_version and not catalog_version.is_baseline:
+                job = create_job('aws', catalog_version=catalog_version.version)
+                start_job(job.id)
+                message += (f' Catalog version {catalog_version.version}: {len(catalog_version.added)} added, '
+                            f'{len(catalog_version.removed)} removed; reprocessing affected updates in job {job.id}.')
+            flash(message, 'success')
         except Exception as e:
             flash(f'Error updating AWS products list: {str(e)}', 'error')
         return redirect(url_for('admin'))
@@ -604,6 +510,20 @@ def init_routes(app):
         
         return redirect(url_for('admin'))
 
+    @app.route('/admin/archive', methods=['POST'])
+    def admin_archive():
+        """Move updates past the retention window to the archive database."""
+        try:
+            archived = archive_expired_updates()
+            if archived:
+                # Drop the archived rows from the search index; it is rebuilt on the next search
+                update_search.build_index([])
+            flash(f'Successfully archived {archived} updates.', 'success')
+        except Exception as e:
+            flash(f'Error archiving updates: {str(e)}', 'error')
+        
+        return redirect(url_for('admin'))
+
     @app.route('/search')
     def search():
         query = request.args.get('q', '')
@@ -612,24 +532,34 @@ def init_routes(app):
         
         # Ensure index is built
         if not update_search.updates:
-            updates = Update.query.all()
+            updates = Update.query.options(undefer(Update.description)).all()
             update_search.build_index(updates)
         
         # Perform semantic search
         results = update_search.search(query, k=10)
         
+        # Optionally search the archive too, through its own index
+        include_archive = request.args.get('archive', type=int) == 1
+        if include_archive:
+            if len(archive_search.updates) != archived_count():
+                archive_search.build_index(archived_updates())
+            archived = archive_search.search(query, k=10)
+            for result in archived:
+                result['archived'] = True
+            results = sorted(results + archived, key=lambda result: result['score'], reverse=True)[:10]
+        
         # Log search metrics
         current_app.logger.info(f"Search query: '{query}' returned {len(results)} results")
         if results:
             current_app.logger.info(f"Top result score: {results[0]['score']:.2f}")
         
-        return render_template('search.html', query=query, results=results)
+        return render_template('search.html', query=query, results=results, include_archive=include_archive)
 
     @app.route('/admin/rebuild_search')
     def admin_rebuild_search():
         try:
             # Get all updates
-            updates = Update.query.all()
+            updates = Update.query.options(undefer(Update.description)).all()
             
             # Rebuild the search index
             update_search.build_index(updates)
@@ -668,7 +598,8 @@ def init_routes(app):
                 'provider': u.provider,
                 'categories': u.categories,
                 'update_types': u.update_types
-            } for u in azure_updates]
+            } for u in azure_updates],
+            'fragment_cache': fragment_stats()
         }
         return jsonify(debug_info)
 
@@ -701,109 +632,129 @@ def init_routes(app):
             current_app.logger.error(f"Error in debug_themes endpoint: {str(e)}", exc_info=True)
             return jsonify({'error': 'An internal error occurred'}), 500
 
+    def enqueue_reprocess_job(provider, catalog_version=None):
+        """Start (or rejoin) a background reprocessing job and return its status."""
+        job = find_active_job(provider, catalog_version)
+        if job is None:
+            job = create_job(provider, catalog_version=catalog_version)
+        # Starting an already-running job is harmless: only one worker can claim it
+        start_job(job.id)
+        response = job.to_dict()
+        response['status_url'] = url_for('reprocess_job_status', job_id=job.id)
+        return jsonify(response), 202
+
     @app.route('/reprocess-aws')
     def reprocess_aws():
-        """Reprocess existing AWS updates with the improved extraction logic."""
+        """Reprocess existing AWS updates with the improved extraction logic.
+
+        Runs as a resumable background job. With ``?catalog_version=N`` only the
+        updates affected by that service catalog version are reprocessed.
+        """
         try:
-            # Create processor
-            from app.utils.update_processor import UpdateProcessor
-            processor = UpdateProcessor()
-            
-            # Get all AWS updates
-            aws_updates = Update.query.filter_by(provider='aws').all()
-            print(f"Found {len(aws_updates)} AWS updates to reprocess")
-            
-            # Reprocess each update
-            count = 0
-            for update in aws_updates:
-                # Clean description
-                from app.scraper.aws_scraper import AWSScraper
-                scraper = AWSScraper()
-                original_length = len(update.description)
-                update.description = scraper.clean_html(update.description)
-                new_length = len(update.description)
-                print(f"Description length: {original_length} -> {new_length} chars")
-                
-                # Extract product name
-                metadata = processor.process_aws_update({
-                    'title': update.title,
-                    'description': update.description
-                })
-                
-                # Update product name
-                if metadata['product_name']:
-                    update.product_name = metadata['product_name']
-                    count += 1
-                    print(f"Product found: {update.title} -> {metadata['product_name']}")
-                else:
-                    print(f"No product found for: {update.title}")
-            
-            # Commit changes
-            db.session.commit()
-            
-            return f"Successfully reprocessed {count} AWS updates with new product names out of {len(aws_updates)} total."
+            catalog_version = request.args.get('catalog_version', type=int)
+            if catalog_version is not None and not ServiceCatalogVersion.query.filter_by(
+                    provider='aws', version=catalog_version).first():
+                return jsonify({'error': f'Unknown catalog version {catalog_version}'}), 404
+            return enqueue_reprocess_job('aws', catalog_version)
         except Exception as e:
             db.session.rollback()
-            current_app.logger.error(f"Error reprocessing AWS updates: {str(e)}", exc_info=True)
+            current_app.logger.error(f"Error starting AWS reprocessing job: {str(e)}", exc_info=True)
             return jsonify({'error': 'An internal error occurred while reprocessing AWS updates'}), 500
 
     @app.route('/reprocess-azure')
     def reprocess_azure():
-        """Reprocess existing Azure updates with the improved categorization logic."""
+        """Reprocess existing Azure updates with the improved categorization logic.
+
+        Runs as a resumable background job.
+        """
         try:
-            # Create processor
-            from app.utils.update_processor import UpdateProcessor
-            processor = UpdateProcessor()
-            
-            # Get all Azure updates
-            azure_updates = Update.query.filter_by(provider='azure').all()
-            print(f"Found {len(azure_updates)} Azure updates to reprocess")
-            
-            # Reprocess each update
-            count = 0
-            for update in azure_updates:
-                # Extract metadata using the new categorization logic
-                metadata = processor.process_azure_update({
-                    'title': update.title,
-                    'description': update.description,
-                    'categories': update.categories
-                })
-                
-                # Update fields
-                update.product_name = metadata['product_name']
-                update.product_names = metadata['product_names']
-                update.categories = metadata['categories']
-                update.update_types = metadata['update_types']
-                update.status = metadata['status']
-                count += 1
-                
-                print(f"Processed: {update.title}")                
-                print(f"  - Primary Product: {update.product_name}")
-                print(f"  - All Products: {update.product_names}")
-                print(f"  - Update Types: {update.update_types}")
-                print(f"  - Status: {update.status}")
-            
-            # Commit changes
-            db.session.commit()
-            
-            return f"Successfully reprocessed {count} Azure updates with new categorization."
-        except Exception as e:            
+            return enqueue_reprocess_job('azure')
+        except Exception as e:
             db.session.rollback()
-            current_app.logger.error(f"Error reprocessing Azure updates: {str(e)}", exc_info=True)
+            current_app.logger.error(f"Error starting Azure reprocessing job: {str(e)}", exc_info=True)
             return jsonify({'error': 'An internal error occurred while reprocessing Azure updates'}), 500
+
+    @app.route('/api/jobs/<int:job_id>')
+    def reprocess_job_status(job_id):
+        """Progress of a reprocessing job."""
+        job = db.session.get(ReprocessJob, job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job.to_dict())
+
+    @app.route('/api/jobs/<int:job_id>/resume', methods=['POST'])
+    def resume_reprocess_job(job_id):
+        """Resume a failed or stalled reprocessing job from its last checkpoint."""
+        job = db.session.get(ReprocessJob, job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        if job.status == 'completed':
+            return jsonify(job.to_dict())
+        start_job(job.id)
+        response = job.to_dict()
+        response['status_url'] = url_for('reprocess_job_status', job_id=job.id)
+        return jsonify(response), 202
+
+    @app.route('/api/timeseries')
+    @read_only
+    def timeseries():
+        """Update counts per day, week or month for one provider's total, products, types or statuses."""
+        provider = request.args.get('provider')
+        kind = request.args.get('kind', 'total')
+        granularity = request.args.get('granularity', 'day')
+        if provider not in ('aws', 'azure'):
+            return jsonify({'error': 'provider must be aws or azure'}), 400
+        if kind not in TIMESERIES_KINDS:
+            return jsonify({'error': f"kind must be one of {', '.join(TIMESERIES_KINDS)}"}), 400
+        if granularity not in GRANULARITIES:
+            return jsonify({'error': f"granularity must be one of {', '.join(GRANULARITIES)}"}), 400
+
+        store = get_store()
+        try:
+            end = date.fromisoformat(request.args['end']) if request.args.get('end') else store.last_day
+            start = date.fromisoformat(request.args['start']) if request.args.get('start') \
+                else end - timedelta(days=89)
+        except (ValueError, OverflowError):
+            return jsonify({'error': 'start and end must be YYYY-MM-DD dates'}), 400
+        if start > end:
+            return jsonify({'error': 'start must not be after end'}), 400
+        if start > store.last_day or end < store.first_day:
+            return jsonify({'error': f'start and end must overlap the stored days, '
+                                     f'{store.first_day.isoformat()} to {store.last_day.isoformat()}'}), 400
+        start, end = max(start, store.first_day), min(end, store.last_day)
+        max_buckets = current_app.config.get('TIMESERIES_MAX_BUCKETS', 1000)
+        if bucket_count(start, end, granularity) > max_buckets:
+            return jsonify({'error': f'at most {max_buckets} {granularity} buckets can be requested'}), 400
+
+        if kind == 'total':
+            keys = [(provider, 'total', '')]
+        elif request.args.getlist('name'):
+            keys = [(provider, kind, name) for name in request.args.getlist('name')]
+        else:
+            keys = store.names(provider, kind)
+        starts, counts = store.query(keys, start, end, granularity)
+        return jsonify({
+            'provider': provider, 'kind': kind, 'granularity': granularity,
+            'start': start.isoformat(), 'end': end.isoformat(),
+            'buckets': [day.isoformat() for day in starts],
+            'series': [{'name': name or provider, 'counts': values.tolist(), 'total': int(values.sum())}
+                       for (_, _, name), values in zip(keys, counts)]
+        })
             
     @app.route('/health')
     def health_check():
         return jsonify({"status": "healthy", "timestamp": datetime.utcnow().isoformat()}), 200
         
     @app.route('/insights')
+    @read_only
+    @cached_page
     def insights():
         """Show insights page."""
         # Get selected week if provided, otherwise default to "all-time"
         selected_week_str = request.args.get('week', 'all-time')
         
-        # Get weekly insights (excluding cumulative ones)
-        insights = WeeklyInsight.query.filter_by(is_cumulative=False).order_by(WeeklyInsight.week_start.desc()).all()
+        # Get weekly insights (excluding cumulative ones), read from the rollups
+        insights = weekly_insights()
         
         # Prepare data for trend charts
         weeks = []
@@ -833,7 +784,7 @@ def init_routes(app):
         azure_counts.reverse()
         
         # Get cumulative insight for all-time data
-        cumulative_insight = WeeklyInsight.query.filter_by(is_cumulative=True).first()
+        cumulative_insight = all_time_insight()
         
         # By default, show all-time data
         selected_insight = cumulative_insight
@@ -847,15 +798,11 @@ def init_routes(app):
                 # First try exact match with string comparison of date
                 for insight in insights:
                     if insight.week_start.strftime('%Y-%m-%d') == week_start_str:
-                        selected_insight = insight
+                        selected_insight = insight_for_week(insight.week_start)
                         break
                 else:
-                    # Fallback to range query if no exact match found
-                    selected_insight = WeeklyInsight.query.filter(
-                        WeeklyInsight.is_cumulative == False,
-                        WeeklyInsight.week_start >= selected_date,
-                        WeeklyInsight.week_start < selected_date + timedelta(days=7)
-                    ).first()
+                    # Fallback to the week containing the selected date
+                    selected_insight = insight_for_week(selected_date)
                 
                 # If not found, fall back to cumulative
                 if not selected_insight:
@@ -866,10 +813,7 @@ def init_routes(app):
                 selected_insight = cumulative_insight
                 selected_week_str = 'all-time'
         
-        # Debug: Print insights data to help identify any issues
-        print(f"Selected week: {selected_week_str}")
-        print(f"Selected insight: {selected_insight}")
-        print(f"Available weeks: {available_weeks}")        
+        logger.debug("Insights request: week=%s insight=%s", selected_week_str, selected_insight)
         return render_template(
             'insights.html',  # Using the original template name
             weeks=weeks,
@@ -891,8 +835,7 @@ def init_routes(app):
         selected_week = get_week_start(datetime.utcnow())
         
         # Get stats for both providers
-        total_aws = Update.query.filter_by(provider='aws').count()
-        total_azure = Update.query.filter_by(provider='azure').count()
+        total_aws, total_azure = get_update_counts()
         
         # Get latest updates
         latest_aws = Update.query.filter_by(provider='aws').order_by(Update.published_date.desc()).first()
@@ -998,13 +941,13 @@ def init_routes(app):
     @app.route('/api/update/<int:update_id>/explain')    
     def get_update_explanation(update_id):
         try:
-            update = Update.query.get_or_404(update_id)
+            update = Update.query.options(undefer(Update.explanation), undefer_group('explanation_html')) \
+                .get_or_404(update_id)
             
             if not update.explanation:
-                # If no explanation exists, generate one using Claude
+                # If no explanation exists, generate one using Claude and render it once
                 try:
-                    explanation = generate_explanation(update.title)
-                    update.explanation = explanation
+                    set_explanation(update, generate_explanation(update.title))
                     db.session.commit()
                 except Exception as e:
                     current_app.logger.error(f"Error generating explanation: {str(e)}")
@@ -1017,26 +960,9 @@ def init_routes(app):
                     'error': 'Could not generate explanation for this update.'
                 }), 500
             
-            # First apply traditional formatting (for backward compatibility)
-            formatted_explanation = update.explanation
-            if formatted_explanation:
-                # Replace double line breaks with paragraph tags
-                formatted_explanation = '<p>' + formatted_explanation.replace('\r\n\r\n', '</p><p>') + '</p>'
-                # Replace single line breaks with <br> tags
-                formatted_explanation = formatted_explanation.replace('\r\n', '<br>')
-                # Handle the case where we might have \n\n instead of \r\n\r\n
-                formatted_explanation = formatted_explanation.replace('<p><br></p>', '<p>')
-            
-            # For newly generated explanations or if we want enhanced formatting,
-            # also try the spaCy-based paragraph detection if the text doesn't already have HTML
-            if update.explanation and '<p>' not in update.explanation:
-                try:
-                    improved_explanation = format_explanation_text(update.explanation)
-                    if improved_explanation:
-                        formatted_explanation = improved_explanation
-                except Exception as format_error:
-                    current_app.logger.warning(f"SpaCy formatting failed, using traditional formatting: {str(format_error)}")
-                
+            # Rendered when the explanation was stored; rows not rendered yet (see
+            # `flask render_explanations`) get the basic formatting rather than running spaCy here
+            formatted_explanation = update.explanation_html or basic_explanation_html(update.explanation)
             return jsonify({'explanation': formatted_explanation})
             
         except Exception as e:
@@ -1055,48 +981,30 @@ def init_routes(app):
         """Generate explanations for updates."""
         try:
             force_regenerate = bool(request.form.get('force_regenerate'))
-            
-            # Build query for updates without explanations or all updates if force_regenerate
-            query = Update.query
-            if not force_regenerate:
-                query = query.filter(Update.explanation.is_(None))
-            
-            updates = query.order_by(Update.published_date.desc()).all()
-            total_updates = len(updates)
-            
-            if not updates:
+
+            if request.form.get('batch'):
+                # Recorded here; submitted through the Message Batches API and polled on background threads
+                client = anthropic_client(max_retries=2)
+                batches = record_batches(force=force_regenerate)
+                if batches:
+                    start_batch_submission(client, [batch.id for batch in batches])
+                    flash(f'Submitting {sum(batch.request_count for batch in batches)} explanation requests '
+                          f'in {len(batches)} batches in the background.', 'success')
+                else:
+                    if active_batches():
+                        start_batch_poller()
+                    flash('No new updates need explanations.', 'info')
+                return redirect(url_for('admin'))
+
+            # Updates without explanations, or all of them if force_regenerate; each
+            # explanation is committed as it arrives
+            result = backfill_explanations(force=force_regenerate)
+            if not result['total']:
                 flash('No updates found that need explanations.', 'info')
                 return redirect(url_for('admin'))
-            processed = 0
-            for update in updates:
-                try:
-                    # Generate the raw explanation
-                    raw_explanation = generate_explanation(update.title)
-                    
-                    # Store the raw text - formatting will be applied when retrieved
-                    update.explanation = raw_explanation
-                    processed += 1
-                    
-                except Exception as e:
-                    current_app.logger.error(f"Error generating explanation for update {update.id}: {str(e)}")
-                    continue
-                
-                # Commit in batches of 10
-                if processed % 10 == 0:
-                    try:
-                        db.session.commit()
-                    except Exception as commit_error:
-                        current_app.logger.error(f"Error committing batch: {str(commit_error)}")
-                        db.session.rollback()
-            
-            # Final commit for remaining changes
-            try:
-                db.session.commit()
-                flash(f'Successfully generated {processed} explanations out of {total_updates} updates.', 'success')
-            except Exception as commit_error:
-                db.session.rollback()
-                flash(f'Error saving explanations: {str(commit_error)}', 'error')
-                
+            flash(f"Successfully generated {result['generated']} explanations out of {result['total']} updates.",
+                  'success' if not result['failed'] else 'warning')
+
         except Exception as e:
             flash(f'Error generating explanations: {str(e)}', 'error')
         
@@ -1,11 +1,16 @@
 """AWS updates scraper module."""
 import requests
 from bs4 import BeautifulSoup
-from datetime import datetime
+import logging
 import re
 from app.models import Update
 from app import db
 from app.utils.update_processor import UpdateProcessor
+from app.utils.timestamps import TimestampParser
+from app.utils.logging_setup import log_timing
+from app.utils.feed_archive import archive_response
+
+logger = logging.getLogger(__name__)
 
 class AWSScraper:
     """Scraper for AWS updates RSS feed."""
@@ -13,6 +18,7 @@ class AWSScraper:
     def __init__(self):
         self.feed_url = "https://aws.amazon.com/new/feed/"
         self.processor = UpdateProcessor()
+        self.date_parser = TimestampParser(feed='aws')
     
     def clean_html(self, html_content):
         """Clean HTML content using BeautifulSoup and truncate to reasonable length."""
@@ -67,30 +73,14 @@ class AWSScraper:
         return text
 
     def parse_date(self, date_str):
-        """Parse date string into datetime object."""
+        """Parse date string into a naive UTC datetime object."""
         if not date_str:
             return None
-            
-        print(f"Parsing date: {date_str}")
-        
-        # Remove GMT/UTC if present
-        date_str = date_str.replace(' GMT', '').replace(' UTC', '')
-        
-        formats = [
-            '%a, %d %b %Y %H:%M:%S %z',  # With timezone
-            '%a, %d %b %Y %H:%M:%S',      # Without timezone
-            '%Y-%m-%dT%H:%M:%SZ'          # ISO format
-        ]
-        
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_str, fmt)
-            except ValueError as e:
-                print(f"Failed format {fmt}: {str(e)}")
-                continue
-                
-        print(f"Could not parse date: {date_str}")
-        return None
+
+        parsed = self.date_parser.parse(date_str)
+        if parsed is None:
+            logger.warning("Could not parse date: %s", date_str)
+        return parsed
 
     def parse_entry(self, entry):
         """Parse a single RSS entry into an Update object."""
@@ -100,19 +90,11 @@ class AWSScraper:
         description = self.clean_html(entry.get('description', ''))
         published_date = self.parse_date(entry.get('pubDate', ''))
         
-        print(f"\nProcessing entry:")
-        print(f"Title: {title}")
-        print(f"Link: {link}")
-        print(f"Published: {published_date}")
+        logger.debug("Processing entry: title=%r link=%s published=%s", title, link, published_date)
         
         if not all([title, link, published_date]):
-            print("Missing required fields!")
-            if not title:
-                print("- Missing title")
-            if not link:
-                print("- Missing link")
-            if not published_date:
-                print("- Missing published_date")
+            missing = [name for name, value in (('title', title), ('link', link), ('published_date', published_date)) if not value]
+            logger.debug("Skipping entry with missing fields: %s", ', '.join(missing))
             return None
         
         # Process update metadata
@@ -123,7 +105,7 @@ class AWSScraper:
         
         try:
             # Create Update object
-            update = Update(
+            return Update(
                 title=title,
                 url=link,
                 description=description,
@@ -131,37 +113,31 @@ class AWSScraper:
                 provider='aws',
                 product_name=metadata['product_name']
             )
-            print("Successfully created Update object")
-            return update
         except Exception as e:
-            print(f"Error creating Update object: {str(e)}")
+            logger.error("Error creating Update object for %r: %s", title, e)
             return None
 
-    def scrape(self):
-        """Scrape AWS updates from RSS feed."""
-        try:
-            print("Fetching AWS RSS feed...")
-            # Fetch RSS feed
+    def fetch(self):
+        """Fetch the raw RSS payload and store it in the feed archive."""
+        with log_timing(logger, 'scrape.fetch', feed='aws') as fields:
             response = requests.get(self.feed_url)
             response.raise_for_status()
-            print(f"Got response: {response.status_code}")
-            
+            fields.update(status=response.status_code, bytes=len(response.content))
+        archive_response('aws', self.feed_url, response, duration_ms=fields.get('duration_ms'))
+        return response.content
+
+    def parse_feed(self, content):
+        """Parse a raw RSS payload (live or archived) into Update objects."""
+        with log_timing(logger, 'scrape.parse', feed='aws') as fields:
             # Parse XML with BeautifulSoup
-            soup = BeautifulSoup(response.content, 'xml')
-            print(f"Parsed XML response")
-            
-            entries = []
+            soup = BeautifulSoup(content, 'xml')
             
             # Extract entries
             items = soup.find_all('item')
-            print(f"Found {len(items)} items in feed")
-            
-            # Debug first item
-            if items:
-                first_item = items[0]
-                print("\nFirst item raw XML:")
-                print(first_item.prettify())
+            if items and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("First item raw XML:\n%s", items[0].prettify())
             
+            entries = []
             for item in items:
                 entry = {
                     'title': item.title.text if item.title else '',
@@ -171,23 +147,20 @@ class AWSScraper:
                 }
                 entries.append(entry)
             
-            print(f"Extracted {len(entries)} entries")
-            if entries:
-                print("\nFirst entry data:")
-                print(entries[0])
-            
             # Process entries
             updates = []
             for entry in entries:
                 update = self.parse_entry(entry)
                 if update:
                     updates.append(update)
-            
-            print(f"Created {len(updates)} Update objects")
-            return updates
-            
-        except Exception as e:
-            print(f"Error scraping AWS updates: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            fields.update(items=len(items), updates=len(updates))
+        
+        return updates
+
+    def scrape(self):
+        """Scrape AWS updates from RSS feed."""
+        try:
+            return self.parse_feed(self.fetch())
+        except Exception:
+            logger.exception("Error scraping AWS updates")
             return []
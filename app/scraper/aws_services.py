@@ -263,8 +263,16 @@ class AWSServicesFetcher:
         return []
 
     def get_services(self, refresh=False):
-        """Get AWS services, optionally refreshing the list."""
-        if refresh or self._services is None:
+        """Get AWS services, optionally refreshing the list.
+
+        Without ``refresh`` the cached catalog is used, so constructing a processor
+        does not hit the network; the fetch only happens if no cache exists yet.
+        """
+        if refresh:
+            return self.fetch_services()
+        if self._services is None:
+            self._services = self._load_cache() or None
+        if self._services is None:
             return self.fetch_services()
         return self._services
 
@@ -25,11 +25,16 @@ to ensure its accuracy and functionality, users should:
 """Azure updates scraper module."""
 import requests
 from bs4 import BeautifulSoup
-from datetime import datetime
+import logging
 import re
 from app.models import Update
 from app import db
 from app.utils.update_processor import UpdateProcessor
+from app.utils.timestamps import TimestampParser
+from app.utils.logging_setup import log_timing
+from app.utils.feed_archive import archive_response
+
+logger = logging.getLogger(__name__)
 
 class AzureScraper:
     """Scraper for Azure updates RSS feed."""
@@ -37,44 +42,18 @@ class AzureScraper:
     def __init__(self):
         self.feed_url = "https://www.microsoft.com/releasecommunications/api/v2/azure/rss"  # Official Azure RSS feed
         self.processor = UpdateProcessor()
+        self.date_parser = TimestampParser(feed='azure')
     
     def get_update_date(self, entry_dict):
-        """Get the most recent update date from entry."""
-        # Try to get the a10:updated date first
-        updated = entry_dict.get('updated')
-        published = entry_dict.get('published')
-        
-        print(f"Parsing dates - Updated: {updated}, Published: {published}")
-        
-        # Remove GMT/UTC if present
-        if updated:
-            updated = updated.replace(' GMT', '').replace(' UTC', '')
-        if published:
-            published = published.replace(' GMT', '').replace(' UTC', '')
-        
-        formats = [
-            '%a, %d %b %Y %H:%M:%S %z',  # With timezone
-            '%a, %d %b %Y %H:%M:%S',      # Without timezone
-            '%Y-%m-%dT%H:%M:%SZ'          # ISO format
-        ]
-        
-        # Try updated date first
-        if updated:
-            for fmt in formats:
-                try:
-                    return datetime.strptime(updated, fmt)
-                except ValueError:
-                    continue
-        
-        # Fall back to published date
-        if published:
-            for fmt in formats:
-                try:
-                    return datetime.strptime(published, fmt)
-                except ValueError:
-                    continue
+        """Get the most recent update date from entry as a naive UTC datetime."""
+        # Try to get the a10:updated date first, then fall back to the published date
+        for value in (entry_dict.get('updated'), entry_dict.get('published')):
+            parsed = self.date_parser.parse(value)
+            if parsed is not None:
+                return parsed
         
-        print("Could not parse any dates")
+        logger.warning("Could not parse any dates from entry: updated=%s published=%s",
+                       entry_dict.get('updated'), entry_dict.get('published'))
         return None
 
     def clean_html(self, html_content):
@@ -92,19 +71,11 @@ class AzureScraper:
         description = self.clean_html(entry.get('description', ''))
         published_date = self.get_update_date(entry)
         
-        print(f"\nProcessing Azure entry:")
-        print(f"Title: {title}")
-        print(f"Link: {link}")
-        print(f"Published: {published_date}")
+        logger.debug("Processing Azure entry: title=%r link=%s published=%s", title, link, published_date)
         
         if not all([title, link, published_date]):
-            print("Missing required fields!")
-            if not title:
-                print("- Missing title")
-            if not link:
-                print("- Missing link")
-            if not published_date:
-                print("- Missing published_date")
+            missing = [name for name, value in (('title', title), ('link', link), ('published_date', published_date)) if not value]
+            logger.debug("Skipping Azure entry with missing fields: %s", ', '.join(missing))
             return None
         
         # Process update metadata
@@ -114,16 +85,13 @@ class AzureScraper:
             'categories': entry.get('categories', [])
         })
         
-        # Debug print for metadata
-        print(f"Extracted metadata:")
-        print(f"- Primary Product: {metadata['product_name']}")
-        print(f"- All Products: {metadata['product_names']}")
-        print(f"- Update Types: {metadata['update_types']}")
-        print(f"- Status: {metadata['status']}")
+        logger.debug("Extracted metadata: product=%s products=%s types=%s status=%s",
+                     metadata['product_name'], metadata['product_names'],
+                     metadata['update_types'], metadata['status'])
         
         try:
             # Create Update object
-            update = Update(
+            return Update(
                 title=title,
                 url=link,
                 description=description,
@@ -135,41 +103,39 @@ class AzureScraper:
                 update_types=metadata['update_types'],
                 status=metadata['status']
             )
-            print("Successfully created Azure Update object")
-            return update
         except Exception as e:
-            print(f"Error creating Azure Update object: {str(e)}")
+            logger.error("Error creating Azure Update object for %r: %s", title, e)
             return None
 
-    def scrape(self):
-        """Scrape Azure updates from RSS feed."""
-        try:
-            print("Fetching Azure RSS feed...")
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
+    def fetch(self):
+        """Fetch the raw RSS payload and store it in the feed archive."""
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        }
+        with log_timing(logger, 'scrape.fetch', feed='azure') as fields:
             response = requests.get(self.feed_url, headers=headers)
             response.raise_for_status()
-            print(f"Got response: {response.status_code}")
-            print("\nResponse content type:", response.headers.get('content-type', ''))
-            
+            fields.update(status=response.status_code, bytes=len(response.content),
+                          content_type=response.headers.get('content-type', ''))
+        archive_response('azure', self.feed_url, response, duration_ms=fields.get('duration_ms'))
+        return response.content
+
+    def parse_feed(self, content):
+        """Parse a raw RSS payload (live or archived) into Update objects."""
+        with log_timing(logger, 'scrape.parse', feed='azure') as fields:
             # Parse XML with BeautifulSoup
-            soup = BeautifulSoup(response.content, 'xml')
-            print(f"\nParsed XML response")
+            soup = BeautifulSoup(content, 'xml')
             
             # Find the channel element
             channel = soup.find('channel')
             if not channel:
-                print("No channel element found")
+                logger.warning("No channel element found in Azure feed")
                 return []
                 
             # Extract entries from items
             items = channel.find_all('item')
-            print(f"\nFound {len(items)} items in feed")
-            
-            if items:
-                print("\nFirst item structure:")
-                print(items[0].prettify())
+            if items and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("First item structure:\n%s", items[0].prettify())
             
             entries = []
             for item in items:
@@ -183,23 +149,20 @@ class AzureScraper:
                 }
                 entries.append(entry)
             
-            print(f"Extracted {len(entries)} entries")
-            if entries:
-                print("\nFirst entry data:")
-                print(entries[0])
-            
             # Process entries
             updates = []
             for entry in entries:
                 update = self.parse_entry(entry)
                 if update:
                     updates.append(update)
-            
-            print(f"Created {len(updates)} Update objects")
-            return updates
-            
-        except Exception as e:
-            print(f"Error scraping Azure updates: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            fields.update(items=len(items), updates=len(updates))
+        
+        return updates
+
+    def scrape(self):
+        """Scrape Azure updates from RSS feed."""
+        try:
+            return self.parse_feed(self.fetch())
+        except Exception:
+            logger.exception("Error scraping Azure updates")
             return []
@@ -1,140 +1,84 @@
 """
 Utilities to clean and deduplicate AWS and Azure updates.
+
+Cleaning runs as SQL over the ``update`` table without loading rows:
+duplicates (same title and published date) are found with a GROUP BY that
+keeps the lowest id of each group, and with ``delete_old`` updates older than
+``UPDATE_RETENTION_DAYS`` are removed. Both delete in committed chunks of
+``CLEANUP_CHUNK_SIZE`` ids, removing the rows' tags and adjusting facet
+counts as they go.
 """
-from typing import List
-from app.models import Update
-from sqlalchemy import and_
-from app import db
+import logging
 from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, select
+from app import db
+from app.models import Update
+from app.utils.pagination import clear_count_cache
+from app.utils.update_tags import delete_updates
 
-def clean_azure_updates(updates: List[Update], delete_old: bool = False) -> int:
-    """
-    Clean Azure updates by:
-    1. Removing duplicates based on title and published date
-    2. Optionally removing old updates (older than 90 days)
-    3. Removing updates with missing critical fields
-    
-    Returns the number of updates removed.
-    """
-    initial_count = len(updates)
-    removed = 0
-    
-    try:
-        # Get existing updates from database for deduplication
-        existing_updates = Update.query.filter_by(provider='azure').all()
-        existing_map = {(u.title, u.published_date): u for u in existing_updates}
-        
-        # Filter out duplicates and invalid updates
-        valid_updates = []
-        for update in updates:
-            # Skip updates with missing critical fields
-            if not update.title or not update.published_date:
-                removed += 1
-                continue
-                
-            # Skip if this exact update already exists
-            key = (update.title, update.published_date)
-            if key in existing_map:
-                removed += 1
-                continue
-                
-            valid_updates.append(update)
-        
-        # Optionally remove old updates
-        if delete_old:
-            cutoff_date = datetime.utcnow() - timedelta(days=90)
-            old_updates = Update.query.filter(
-                and_(
-                    Update.provider == 'azure',
-                    Update.published_date < cutoff_date
-                )
-            ).all()
-            
-            for update in old_updates:
-                db.session.delete(update)
-                removed += 1
-        
-        # Add valid updates to database
-        for update in valid_updates:
-            db.session.add(update)
-        
-        # Commit changes
+logger = logging.getLogger(__name__)
+
+def _duplicates(provider):
+    """Rows of ``provider`` that repeat an earlier (title, published_date)."""
+    keep = select(func.min(Update.id)).where(Update.provider == provider) \
+        .group_by(Update.title, Update.published_date)
+    return Update.id.not_in(keep)
+
+def retention_cutoff(retention_days=None):
+    """Publication date before which updates are past ``retention_days`` (default ``UPDATE_RETENTION_DAYS``)."""
+    retention_days = retention_days or current_app.config.get('UPDATE_RETENTION_DAYS', 90)
+    return datetime.utcnow() - timedelta(days=retention_days)
+
+def _delete_in_chunks(provider, condition, chunk_size):
+    """Delete ``provider`` updates matching ``condition``, ``chunk_size`` ids per commit. Returns the count."""
+    deleted = 0
+    while True:
+        ids = db.session.scalars(
+            select(Update.id).where(Update.provider == provider, condition).order_by(Update.id).limit(chunk_size)
+        ).all()
+        if not ids:
+            break
+        deleted += delete_updates(db.session.connection(), dict.fromkeys(ids, provider))
         db.session.commit()
-        
-        print(f"Azure updates cleaning complete:")
-        print(f"- Initial count: {initial_count}")
-        print(f"- Updates removed: {removed}")
-        print(f"- New updates added: {len(valid_updates)}")
-        
-        return removed
-        
-    except Exception as e:
-        print(f"Error cleaning Azure updates: {e}")
-        db.session.rollback()
-        return 0
+    if deleted:
+        clear_count_cache()
+    return deleted
 
-def clean_aws_updates(updates: List[Update], delete_old: bool = False) -> int:
+def _count(provider):
+    return db.session.scalar(select(func.count(Update.id)).where(Update.provider == provider))
+
+def clean_provider_updates(provider, delete_old=False, retention_days=None, chunk_size=None):
     """
-    Clean AWS updates by:
-    1. Removing duplicates based on title and published date
-    2. Optionally removing old updates (older than 90 days)
-    3. Removing updates with missing critical fields
-    
-    Returns the number of updates removed.
+    Clean one provider's updates by:
+    1. Removing duplicates based on title and published date (the oldest row is kept)
+    2. Optionally removing updates older than ``retention_days`` (default ``UPDATE_RETENTION_DAYS``)
+
+    Returns ``{'total', 'duplicates', 'expired', 'remaining'}`` counts.
     """
-    initial_count = len(updates)
-    removed = 0
-    
+    chunk_size = chunk_size or current_app.config.get('CLEANUP_CHUNK_SIZE', 500)
+
     try:
-        # Get existing updates from database for deduplication
-        existing_updates = Update.query.filter_by(provider='aws').all()
-        existing_map = {(u.title, u.published_date): u for u in existing_updates}
-        
-        # Filter out duplicates and invalid updates
-        valid_updates = []
-        for update in updates:
-            # Skip updates with missing critical fields
-            if not update.title or not update.published_date:
-                removed += 1
-                continue
-                
-            # Skip if this exact update already exists
-            key = (update.title, update.published_date)
-            if key in existing_map:
-                removed += 1
-                continue
-                
-            valid_updates.append(update)
-        
-        # Optionally remove old updates
+        total = _count(provider)
+        duplicates = _delete_in_chunks(provider, _duplicates(provider), chunk_size)
+        expired = 0
         if delete_old:
-            cutoff_date = datetime.utcnow() - timedelta(days=90)
-            old_updates = Update.query.filter(
-                and_(
-                    Update.provider == 'aws',
-                    Update.published_date < cutoff_date
-                )
-            ).all()
-            
-            for update in old_updates:
-                db.session.delete(update)
-                removed += 1
-        
-        # Add valid updates to database
-        for update in valid_updates:
-            db.session.add(update)
-        
-        # Commit changes
-        db.session.commit()
-        
-        print(f"AWS updates cleaning complete:")
-        print(f"- Initial count: {initial_count}")
-        print(f"- Updates removed: {removed}")
-        print(f"- New updates added: {len(valid_updates)}")
-        
-        return removed
-        
-    except Exception as e:
-        print(f"Error cleaning AWS updates: {e}")
+            expired = _delete_in_chunks(provider, Update.published_date < retention_cutoff(retention_days), chunk_size)
+    except Exception:
         db.session.rollback()
-        return 0
+        raise
+
+    counts = {'total': total, 'duplicates': duplicates, 'expired': expired,
+              'remaining': total - duplicates - expired}
+    logger.info('clean.updates', extra={'fields': {'provider': provider, **counts}})
+    return counts
+
+def clean_azure_updates(delete_old: bool = False) -> int:
+    """Clean Azure updates. Returns the number of updates removed."""
+    counts = clean_provider_updates('azure', delete_old=delete_old)
+    return counts['duplicates'] + counts['expired']
+
+def clean_aws_updates(delete_old: bool = False) -> int:
+    """Clean AWS updates. Returns the number of updates removed."""
+    counts = clean_provider_updates('aws', delete_old=delete_old)
+    return counts['duplicates'] + counts['expired']
@@ -0,0 +1,148 @@
+"""
+Data version and HTTP validators for the read-heavy pages.
+
+``data_version`` holds one counter, bumped after every committed transaction
+that wrote data the pages show: ORM flushes (scraping, theme generation,
+edits), bulk query deletes and updates, and the Core writes that call
+``mark_data_changed`` (cleaning, archiving, insight rebuilds). Changes to
+explanations alone do not count, since pages fetch them from the API. The bump runs
+in its own short transaction right after the commit, so writers never hold a
+lock on the counter; a page rendered in between carries the old version and
+is replaced once the bump lands.
+
+Views decorated with ``@cached_page`` send a strong ETag and Last-Modified
+derived from the version (and the current UTC day, since pages show the year
+and the current week) with ``Cache-Control: public, max-age=HTTP_CACHE_MAX_AGE``,
+which lets nginx cache and revalidate them. Each process keeps the version for
+``DATA_VERSION_TTL`` seconds, so a matching conditional request gets a 304
+without a database query.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+from flask import current_app, has_app_context, request, session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from app import db
+from app.models import DataVersion, ExplanationBatch, ReprocessJob, Update
+
+logger = logging.getLogger(__name__)
+
+_table = DataVersion.__table__
+_CACHE = 'data_version_cache'  # key in app.extensions
+_cache_lock = threading.Lock()
+_EPOCH = datetime(1970, 1, 1)
+
+# Bookkeeping rows that change without changing what pages show
+_UNTRACKED = (DataVersion, ExplanationBatch, ReprocessJob)
+# Update columns the pages leave to the explanation API
+_UNTRACKED_UPDATE_ATTRS = frozenset(('explanation', 'explanation_html', 'explanation_format_version',
+                                     'explanation_segmenter'))
+
+def mark_data_changed(target=None):
+    """Bump the data version when the current transaction of ``target`` (default ``db.session``) commits."""
+    (target or db.session).info['data_changed'] = True
+
+def bump_data_version(connection):
+    """Increment the version on ``connection`` (the caller commits). Returns the new version."""
+    now = datetime.utcnow()
+    result = connection.execute(_table.update().where(_table.c.id == 1)
+                                .values(version=_table.c.version + 1, updated_at=now))
+    if result.rowcount == 0:
+        connection.execute(_table.insert().values(id=1, version=1, updated_at=now))
+    clear_version_cache()
+    return connection.scalar(select(_table.c.version).where(_table.c.id == 1))
+
+def clear_version_cache():
+    if has_app_context():
+        with _cache_lock:
+            current_app.extensions.pop(_CACHE, None)
+
+def current_data_version():
+    """``(version, updated_at)``, read at most once per ``DATA_VERSION_TTL`` seconds per process."""
+    ttl = current_app.config.get('DATA_VERSION_TTL', 5)
+    cached = current_app.extensions.get(_CACHE)
+    if cached and time.monotonic() - cached[0] < ttl:
+        return cached[1]
+    row = db.session.execute(select(_table.c.version, _table.c.updated_at).where(_table.c.id == 1)).first()
+    value = (row.version, row.updated_at) if row else (0, _EPOCH)
+    with _cache_lock:
+        current_app.extensions[_CACHE] = (time.monotonic(), value)
+    return value
+
+def _shows_change(obj):
+    """Whether the pending change of the dirty ``obj`` touches what pages show."""
+    if isinstance(obj, _UNTRACKED):
+        return False
+    if isinstance(obj, Update):
+        return any(attr.history.has_changes() for attr in inspect(obj).attrs
+                   if attr.key not in _UNTRACKED_UPDATE_ATTRS)
+    return True
+
+@event.listens_for(Session, 'after_flush')
+def _mark_after_flush(session, flush_context):
+    if any(not isinstance(obj, _UNTRACKED) for obj in (*session.new, *session.deleted)) \
+            or any(_shows_change(obj) for obj in session.dirty):
+        mark_data_changed(session)
+
+@event.listens_for(Session, 'after_bulk_delete')
+@event.listens_for(Session, 'after_bulk_update')
+def _mark_after_bulk_statement(context):
+    if not issubclass(context.mapper.class_, _UNTRACKED):
+        mark_data_changed(context.session)
+
+@event.listens_for(Session, 'after_commit')
+def _bump_after_commit(session):
+    if not session.info.pop('data_changed', False):
+        return
+    try:
+        with db.engine.begin() as connection:
+            version = bump_data_version(connection)
+        logger.debug('data_version.bump', extra={'fields': {'version': version}})
+    except Exception as e:
+        # Pages keep their old validators until the next bump (or the next day)
+        logger.warning("Could not bump the data version: %s", e)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop('data_changed', None)
+
+def page_validators():
+    """``(etag, last_modified)`` for the current data version and UTC day."""
+    version, updated_at = current_data_version()
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return f'v{version}-{today:%Y%m%d}', max(updated_at, today).replace(microsecond=0)
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    return since is not None and since.replace(tzinfo=None) >= last_modified
+
+def _set_cache_headers(response, etag, last_modified):
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get('HTTP_CACHE_MAX_AGE', 60)
+    return response
+
+def cached_page(view):
+    """Answer conditional GETs of ``view`` from the data version, with a 304 when nothing changed."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+            # The page carries one-off messages: render it for this client only
+            response = current_app.make_response(view(*args, **kwargs))
+            response.cache_control.private = True
+            response.cache_control.no_store = True
+            return response
+        etag, last_modified = page_validators()
+        if _not_modified(etag, last_modified):
+            return _set_cache_headers(current_app.response_class(status=304), etag, last_modified)
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code == 200:
+            _set_cache_headers(response, etag, last_modified)
+        return response
+    return wrapper
@@ -0,0 +1,144 @@
+"""
+Engine configuration: SQLite connection tuning and the read-only engine.
+
+Every new SQLite connection gets the ``SQLITE_PRAGMAS`` from the config
+(WAL journaling, ``synchronous=NORMAL``, a larger page cache, memory-mapped
+reads and a busy timeout), applied from a ``connect`` event. With WAL,
+readers no longer block on the writer and the writer no longer waits for
+readers to finish.
+
+Read-only views are marked with ``@read_only``. While one runs, queries
+that would go to the default engine use the read-only engine instead: a
+separate engine (and connection pool) on the same file whose connections are
+also set to ``query_only``, so page renders never queue behind connections
+held by the scheduler or admin writes. Flushes always use the primary
+engine. ``READ_ONLY_DATABASE_URI`` can point it elsewhere, e.g. at a
+replica; without it the engine is only created for file-based SQLite.
+
+``DATABASE_URL`` selects another backend such as PostgreSQL. Server backends
+get a connection pool sized so that all gunicorn workers together stay within
+``DB_MAX_CONNECTIONS``.
+"""
+import logging
+import multiprocessing
+import os
+from functools import wraps
+from flask import current_app, g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+READ_ONLY_ENGINE = 'read_only_engine'  # key in app.extensions
+
+DEFAULT_SQLITE_PRAGMAS = {
+    # busy_timeout first so switching an existing file to WAL waits for other connections
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY'
+}
+
+def _is_sqlite_file(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+def database_uri(default):
+    """``DATABASE_URL`` if set (``postgres://`` normalised for SQLAlchemy), else ``default``."""
+    uri = os.environ.get('DATABASE_URL')
+    if not uri:
+        return default
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+def worker_count():
+    """Number of gunicorn worker processes sharing the database (``WEB_CONCURRENCY``)."""
+    try:
+        return max(1, int(os.environ['WEB_CONCURRENCY']))
+    except (KeyError, ValueError):
+        return multiprocessing.cpu_count() * 2 + 1
+
+def pool_options(config, workers=None):
+    """Pool arguments splitting ``DB_MAX_CONNECTIONS`` between the worker processes."""
+    workers = workers or worker_count()
+    budget = max(1, config.get('DB_MAX_CONNECTIONS', 90) // workers)
+    pool_size = max(1, min(config.get('DB_POOL_SIZE', 5), budget))
+    return {
+        'pool_size': pool_size,
+        'max_overflow': budget - pool_size,
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': True
+    }
+
+def configure_engine_options(app):
+    """Set pool options for server backends. Call before ``db.init_app``."""
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI')
+    if not uri or make_url(uri).get_backend_name() == 'sqlite':
+        return
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    for key, value in pool_options(app.config).items():
+        options.setdefault(key, value)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    logger.info("Database pool: pool_size=%d max_overflow=%d", options['pool_size'], options['max_overflow'])
+
+def sqlite_pragma_listener(pragmas, read_only=False):
+    """``connect`` listener applying ``pragmas`` (and ``query_only`` if ``read_only``)."""
+    statements = [f'PRAGMA {name}={value}' for name, value in pragmas.items()]
+    if read_only:
+        statements.append('PRAGMA query_only=ON')
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    return set_pragmas
+
+def configure_engines(app, db):
+    """Tune the app's SQLite engines and create the read-only engine. Call after ``db.init_app``."""
+    pragmas = app.config.get('SQLITE_PRAGMAS', DEFAULT_SQLITE_PRAGMAS)
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', sqlite_pragma_listener(pragmas))
+                logger.debug("Configured SQLite pragmas for bind %s", key or 'default')
+        primary = db.engines[None]
+
+    uri = app.config.get('READ_ONLY_DATABASE_URI')
+    if not uri and primary.dialect.name == 'sqlite' and _is_sqlite_file(primary.url):
+        uri = primary.url
+    if not uri:
+        return None
+    engine = create_engine(uri, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', sqlite_pragma_listener(pragmas, read_only=True))
+    app.extensions[READ_ONLY_ENGINE] = engine
+    return engine
+
+def read_only(view):
+    """Route the view's default-engine queries through the read-only engine."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+class RoutingSession(Session):
+    """Session that sends reads of read-only views to the read-only engine."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or self._flushing or not (has_request_context() and g.get('db_read_only')):
+            return engine
+        read_engine = current_app.extensions.get(READ_ONLY_ENGINE)
+        if read_engine is not None and engine is self._db.engines.get(None):
+            return read_engine
+        return engine
@@ -0,0 +1,37 @@
+"""
+Index maintenance for existing databases.
+
+``db.create_all()`` only creates indexes together with new tables, so indexes
+added to existing models later are created here (``CREATE INDEX`` with a
+``checkfirst`` probe). Indexes limited to another dialect with ``ddl_if``
+(e.g. PostgreSQL GIN indexes) are skipped.
+"""
+import logging
+from app import db
+
+logger = logging.getLogger(__name__)
+
+def _applies_to(index, dialect):
+    condition = index._ddl_if
+    if condition is None or condition.dialect is None:
+        return True
+    if isinstance(condition.dialect, str):
+        return condition.dialect == dialect
+    return dialect in condition.dialect
+
+def ensure_indexes():
+    """Create any index declared on the models that the database is missing. Returns their names."""
+    created = []
+    inspector = db.inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing and _applies_to(index, db.engine.dialect.name):
+                index.create(bind=db.engine, checkfirst=True)
+                created.append(index.name)
+    if created:
+        logger.info("Created missing indexes: %s", ', '.join(created))
+    return created
@@ -0,0 +1,234 @@
+"""
+Concurrent generation of update explanations.
+
+``ExplanationBackfill`` sends Messages API requests from a pool of
+``EXPLANATION_CONCURRENCY`` threads, while the calling thread stores each
+explanation and commits it as soon as it arrives, so an interrupted backfill
+keeps everything generated so far. Requests are paced by two token buckets,
+one for requests and one for tokens per minute (the prompt estimate plus
+``max_tokens`` is reserved up front; unused tokens are returned once the
+response reports its usage). Overload (529), rate limit (429) and other
+retryable errors pause every worker: the pause honours ``retry-after`` and
+doubles with each consecutive error, then shrinks again as requests succeed.
+"""
+import logging
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import anthropic
+from flask import current_app
+from sqlalchemy import or_, select
+from app import db
+from app.models import Update
+from app.utils.update_analyzer import (EXPLANATION_MAX_TOKENS, explanation_prompt, explanation_request,
+                                       message_text, set_explanation)
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying after a pause (timeout, conflict, rate limit, server errors and 529 overload);
+# others (bad request, authentication) fail the update
+RETRYABLE_STATUSES = (408, 409, 429)
+
+def _retryable(error):
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    status = getattr(error, 'status_code', None)
+    return status is not None and (status in RETRYABLE_STATUSES or status >= 500)
+
+class TokenBucket:
+    """Refills ``per_minute`` tokens a minute, holding at most ``capacity`` (default: ten seconds' worth)."""
+
+    def __init__(self, per_minute, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or max(1.0, per_minute / 6.0)
+        self.tokens = self.capacity
+        self._clock, self._sleep = clock, sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        """Take ``amount`` tokens (at most ``capacity``), waiting until they are available."""
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            self._sleep(wait)
+
+    def refund(self, amount):
+        """Return tokens reserved but not used."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+class AdaptiveBackoff:
+    """Pause shared by all workers after retryable errors."""
+
+    def __init__(self, base=1.0, maximum=60.0, clock=time.monotonic, sleep=time.sleep):
+        self.base, self.maximum = base, maximum
+        self.delay = 0.0
+        self._resume_at = 0.0
+        self._clock, self._sleep = clock, sleep
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Sleep until the current pause, if any, is over."""
+        while True:
+            with self._lock:
+                remaining = self._resume_at - self._clock()
+            if remaining <= 0:
+                return
+            self._sleep(remaining)
+
+    def failed(self, retry_after=None):
+        """Double the pause (with jitter), or wait ``retry_after`` seconds if the server asks for longer."""
+        with self._lock:
+            self.delay = min(self.maximum, self.delay * 2 if self.delay else self.base)
+            pause = max(retry_after or 0, self.delay * random.uniform(1.0, 1.25))
+            self._resume_at = max(self._resume_at, self._clock() + pause)
+            return pause
+
+    def succeeded(self):
+        with self._lock:
+            self.delay = self.delay / 2 if self.delay > self.base else 0.0
+
+def _retry_after(error):
+    response = getattr(error, 'response', None)
+    try:
+        return float(response.headers.get('retry-after')) if response is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _estimated_tokens(title):
+    # About four characters per token for the prompt, plus the whole response allowance
+    return math.ceil(len(explanation_prompt(title)) / 4) + EXPLANATION_MAX_TOKENS
+
+class ExplanationBackfill:
+    """Generates explanations with bounded concurrency, rate limits and adaptive backoff."""
+
+    def __init__(self, client, concurrency=4, requests_per_minute=50, tokens_per_minute=80000,
+                 max_retries=6, backoff_base=1.0, backoff_max=60.0):
+        self.client = client
+        self.concurrency = max(1, concurrency)
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.backoff = AdaptiveBackoff(backoff_base, backoff_max)
+        self.max_retries = max_retries
+        self.retries = 0
+        self._retries_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, client):
+        return cls(client,
+                   concurrency=config.get('EXPLANATION_CONCURRENCY', 4),
+                   requests_per_minute=config.get('EXPLANATION_REQUESTS_PER_MINUTE', 50),
+                   tokens_per_minute=config.get('EXPLANATION_TOKENS_PER_MINUTE', 80000),
+                   max_retries=config.get('EXPLANATION_MAX_RETRIES', 6),
+                   backoff_base=config.get('EXPLANATION_BACKOFF_BASE', 1.0))
+
+    def explain(self, title):
+        """The explanation of ``title``, retrying retryable errors up to ``max_retries`` times."""
+        for attempt in range(self.max_retries + 1):
+            self.backoff.wait()
+            reserved = _estimated_tokens(title)
+            if self.requests:
+                self.requests.acquire()
+            if self.tokens:
+                self.tokens.acquire(reserved)
+            try:
+                message = self.client.messages.create(**explanation_request(title))
+            except anthropic.APIError as e:
+                if attempt == self.max_retries or not _retryable(e):
+                    raise
+                pause = self.backoff.failed(_retry_after(e))
+                with self._retries_lock:
+                    self.retries += 1
+                logger.info('explanations.retry', extra={'fields': {
+                    'error': type(e).__name__, 'attempt': attempt + 1, 'pause': round(pause, 2)}})
+                continue
+            self.backoff.succeeded()
+            usage = getattr(message, 'usage', None)
+            if self.tokens and usage is not None:
+                self.tokens.refund(max(0, reserved - usage.input_tokens - usage.output_tokens))
+            return message_text(message)
+
+    def run(self, items, store, progress=None):
+        """Explain every ``(update_id, title)`` of ``items`` and pass each result to ``store(update_id, text)``.
+
+        ``store`` runs in the calling thread (so it may use the app's session and commit);
+        ``progress(update_id, error)`` is called once per item. Returns counts of
+        generated and failed items and of retries.
+        """
+        generated = failed = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='explain') as pool:
+            futures = {pool.submit(self.explain, title): update_id for update_id, title in items}
+            try:
+                for future in as_completed(futures):
+                    update_id, error = futures[future], None
+                    try:
+                        store(update_id, future.result())
+                        generated += 1
+                    except Exception as e:
+                        error = e
+                        failed += 1
+                        logger.warning("Could not generate the explanation of update %s: %s", update_id, e)
+                    if progress:
+                        progress(update_id, error)
+            except BaseException:
+                # Interrupted (e.g. Ctrl-C): drop the queued requests rather than make them and discard the results
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+        logger.info('explanations.backfill', extra={'fields': {
+            'generated': generated, 'failed': failed, 'retries': self.retries, 'concurrency': self.concurrency}})
+        return {'generated': generated, 'failed': failed, 'retries': self.retries}
+
+def anthropic_client(max_retries=0):
+    """Anthropic client for backfills; by default retries are left to ``ExplanationBackfill``."""
+    api_key = os.getenv('ANTHROPIC_API_KEY')
+    if not api_key:
+        raise Exception('ANTHROPIC_API_KEY environment variable not set')
+    return anthropic.Anthropic(api_key=api_key, max_retries=max_retries)
+
+def updates_to_explain(force=False):
+    """``(id, title)`` of the updates without an explanation (or of all updates), newest first."""
+    query = select(Update.id, Update.title).order_by(Update.published_date.desc(), Update.id.desc())
+    if not force:
+        query = query.where(or_(Update.explanation.is_(None), Update.explanation == ''))
+    return db.session.execute(query).all()
+
+def store_explanation(update_id, text):
+    """Save ``text`` (with its HTML) as the explanation of update ``update_id`` and commit it."""
+    update = db.session.get(Update, update_id)
+    if update is None:
+        return
+    try:
+        set_explanation(update, text)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        # Updates are only needed for their own commit
+        db.session.expunge_all()
+
+def backfill_explanations(force=False, client=None, progress=None):
+    """Generate the explanations of ``updates_to_explain(force)`` with the configured concurrency and limits.
+
+    Returns counts of ``total``, ``generated`` and ``failed`` updates and of ``retries``.
+    """
+    items = updates_to_explain(force)
+    if not items:
+        return {'total': 0, 'generated': 0, 'failed': 0, 'retries': 0}
+    backfill = ExplanationBackfill.from_config(current_app.config, client or anthropic_client())
+    return {'total': len(items), **backfill.run(items, store_explanation, progress)}
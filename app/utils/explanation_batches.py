@@ -0,0 +1,306 @@
+"""
+Explanation generation through the Message Batches API.
+
+For large backfills ``submit_batches`` packages the prompts of the updates
+still missing an explanation into batches of up to ``EXPLANATION_BATCH_SIZE``
+requests (custom id ``update-<id>``). Each batch is recorded as an
+``ExplanationBatch`` before it is submitted, claiming its updates, and gets the
+provider's batch id once accepted; the admin page only records them and leaves
+submission to ``start_batch_submission``'s background thread. ``poll_batches``
+checks the active batches; when one has ended its results are streamed back
+and written in bulk, committing every ``EXPLANATION_BATCH_WRITE_SIZE`` rows
+together with their rendered HTML.
+
+All state is in the database: after a restart polling resumes the recorded
+batches (on the first request each worker serves, see ``init_app``, or with
+``flask generate_explanations --batch``) instead of submitting again (writing
+results is idempotent), updates in an active batch are never requested twice,
+and updates whose request errored or expired, or whose batch the provider no
+longer knows, are picked up by the next submission. A batch left ``pending``
+(its process stopped during submission) releases its updates once it is
+``EXPLANATION_BATCH_SUBMIT_TIMEOUT`` seconds old; both that transition and the
+submitter's are conditional updates, so neither overwrites the other. Every
+worker may run a poller, but each submitted batch is polled by one process at
+a time: ``claim_batch`` takes a lease of ``EXPLANATION_BATCH_LEASE`` seconds on
+its row with a conditional update, and another process only takes over once
+the lease has run out.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+import anthropic
+from flask import current_app
+from sqlalchemy import or_, select, update as update_statement
+from app import db
+from app.models import ExplanationBatch, Update
+from app.utils.explanation_backfill import anthropic_client, updates_to_explain
+from app.utils.update_analyzer import (FORMATTER_VERSION, configured_segmenter, explanation_request, message_text,
+                                       render_explanations_html)
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('pending', 'in_progress')
+_CUSTOM_ID_PREFIX = 'update-'
+
+_poller = None  # this process's background polling thread
+_poller_lock = threading.Lock()
+_resumed_pid = None  # process that has checked for batches to resume
+
+def _custom_id(update_id):
+    return f'{_CUSTOM_ID_PREFIX}{update_id}'
+
+def _update_id(custom_id):
+    if custom_id.startswith(_CUSTOM_ID_PREFIX) and custom_id[len(_CUSTOM_ID_PREFIX):].isdigit():
+        return int(custom_id[len(_CUSTOM_ID_PREFIX):])
+    return None
+
+def active_batches():
+    """Batches not submitted yet or still waiting for their results, oldest first."""
+    return ExplanationBatch.query.filter(ExplanationBatch.status.in_(ACTIVE_STATUSES)) \
+        .order_by(ExplanationBatch.id).all()
+
+def _finish(batch, status, error=None):
+    batch.status = status
+    batch.error = error
+    batch.finished_at = batch.updated_at = datetime.utcnow()
+    db.session.commit()
+
+def record_batches(force=False, batch_size=None):
+    """Record pending batches for the updates to explain (see ``updates_to_explain``) that no active batch
+    covers, claiming those updates. Returns the batches.
+    """
+    batch_size = batch_size or current_app.config.get('EXPLANATION_BATCH_SIZE', 10000)
+    claimed = {update_id for batch in active_batches() for update_id in batch.update_ids}
+    update_ids = [update_id for update_id, _ in updates_to_explain(force) if update_id not in claimed]
+    batches = [ExplanationBatch(update_ids=update_ids[start:start + batch_size],
+                                request_count=len(update_ids[start:start + batch_size]))
+               for start in range(0, len(update_ids), batch_size)]
+    db.session.add_all(batches)
+    db.session.commit()
+    return batches
+
+def submit_batch(client, batch):
+    """Submit the recorded ``batch`` and store the provider's batch id. Returns the batch."""
+    titles = dict(db.session.execute(select(Update.id, Update.title).where(Update.id.in_(batch.update_ids))).all())
+    requests = [
+        {'custom_id': _custom_id(update_id), 'params': explanation_request(titles[update_id])}
+        for update_id in batch.update_ids if update_id in titles  # Skip cleaned-up updates
+    ]
+    try:
+        submitted = client.messages.batches.create(requests=requests)
+    except Exception as e:
+        _finish(batch, 'failed', str(e))
+        raise
+    # Also revives a batch a poller gave up on meanwhile: it exists now, so its results are collected
+    db.session.execute(
+        update_statement(ExplanationBatch)
+        .where(ExplanationBatch.id == batch.id, ExplanationBatch.batch_id.is_(None))
+        .values(batch_id=submitted.id, status='in_progress', request_count=len(requests),
+                error=None, finished_at=None, updated_at=datetime.utcnow()))
+    db.session.commit()
+    logger.info('explanations.batch_submit', extra={'fields': {
+        'batch': batch.batch_id, 'requests': batch.request_count}})
+    return batch
+
+def _submit_recorded(client, batches):
+    for index, batch in enumerate(batches):
+        try:
+            submit_batch(client, batch)
+        except Exception:
+            # Release the updates of the batches not submitted yet
+            for rest in batches[index + 1:]:
+                _finish(rest, 'failed', 'Not submitted')
+            raise
+    return batches
+
+def submit_batches(client, force=False, batch_size=None):
+    """Record (see ``record_batches``) and submit batches for the updates to explain.
+
+    Returns the submitted batches.
+    """
+    return _submit_recorded(client, record_batches(force, batch_size))
+
+def _write_chunk(rows):
+    """Store ``(update_id, text)`` pairs with their HTML in one bulk update and commit them."""
+    existing = set(db.session.scalars(select(Update.id).where(Update.id.in_([update_id for update_id, _ in rows]))))
+    rows = [(update_id, text) for update_id, text in rows if update_id in existing]  # Skip cleaned-up updates
+    if rows:
+        html = render_explanations_html([text for _, text in rows])
+        db.session.execute(update_statement(Update), [
+            {'id': update_id, 'explanation': text, 'explanation_html': rendered or None,
+             'explanation_format_version': FORMATTER_VERSION, 'explanation_segmenter': configured_segmenter()}
+            for (update_id, text), rendered in zip(rows, html)
+        ])
+    db.session.commit()
+    return len(rows)
+
+def write_results(client, batch, chunk_size=None):
+    """Stream the results of an ended ``batch`` into ``Update.explanation`` and mark it completed."""
+    chunk_size = chunk_size or current_app.config.get('EXPLANATION_BATCH_WRITE_SIZE', 500)
+    succeeded = failed = 0
+    rows = []
+    for entry in client.messages.batches.results(batch.batch_id):
+        update_id = _update_id(entry.custom_id)
+        if entry.result.type != 'succeeded' or update_id is None:
+            failed += 1
+            continue
+        rows.append((update_id, message_text(entry.result.message)))
+        if len(rows) >= chunk_size:
+            succeeded += _write_chunk(rows)
+            rows = []
+            claim_batch(batch)  # Keep the lease through long result streams
+    if rows:
+        succeeded += _write_chunk(rows)
+
+    batch.succeeded, batch.failed = succeeded, failed
+    _finish(batch, 'completed')
+    logger.info('explanations.batch_results', extra={'fields': {
+        'batch': batch.batch_id, 'succeeded': succeeded, 'failed': failed}})
+    return batch
+
+def _abandon_if_stale(batch):
+    """Fail the pending ``batch`` if its submission started over ``EXPLANATION_BATCH_SUBMIT_TIMEOUT`` seconds ago."""
+    timeout = current_app.config.get('EXPLANATION_BATCH_SUBMIT_TIMEOUT', 3600)
+    now = datetime.utcnow()
+    if batch.updated_at and now - batch.updated_at < timedelta(seconds=timeout):
+        return  # Possibly still being submitted by another process
+    # Only if the submitter has not recorded the provider's batch id in the meantime
+    db.session.execute(
+        update_statement(ExplanationBatch)
+        .where(ExplanationBatch.id == batch.id, ExplanationBatch.status == 'pending')
+        .values(status='failed', error='Never submitted', finished_at=now, updated_at=now))
+    db.session.commit()
+
+def _poller_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+def claim_batch(batch):
+    """Take or renew this process's lease on polling ``batch``. False while another process holds it."""
+    now = datetime.utcnow()
+    poller = _poller_id()
+    result = db.session.execute(
+        update_statement(ExplanationBatch)
+        .where(ExplanationBatch.id == batch.id,
+               or_(ExplanationBatch.poller.is_(None), ExplanationBatch.poller == poller,
+                   ExplanationBatch.lease_until.is_(None), ExplanationBatch.lease_until < now))
+        .values(poller=poller,
+                lease_until=now + timedelta(seconds=current_app.config.get('EXPLANATION_BATCH_LEASE', 600)))
+        .execution_options(synchronize_session=False))
+    db.session.commit()
+    return result.rowcount == 1
+
+def poll_batch(client, batch):
+    """Check ``batch`` and store its results once it has ended. Returns the batch."""
+    if batch.batch_id is None:
+        # Once the submission has timed out, its updates go into the next submission
+        _abandon_if_stale(batch)
+        return batch
+    try:
+        remote = client.messages.batches.retrieve(batch.batch_id)
+    except anthropic.NotFoundError:
+        # Deleted, or submitted with another API key: polling again would never find it
+        _finish(batch, 'failed', 'Batch not found')
+        logger.warning("Explanation batch %s was not found; its updates are released", batch.batch_id)
+        return batch
+    batch.updated_at = datetime.utcnow()
+    if remote.processing_status != 'ended':
+        db.session.commit()
+        return batch
+    if not remote.results_url:
+        # Ended without results, e.g. expired before processing started
+        counts = remote.request_counts
+        batch.failed = counts.errored + counts.canceled + counts.expired
+        _finish(batch, 'failed', 'Batch ended without results')
+        return batch
+    return write_results(client, batch)
+
+def poll_batches(client):
+    """Poll every active batch once. Returns the batches still active."""
+    for batch in active_batches():
+        try:
+            if batch.batch_id is not None and not claim_batch(batch):
+                continue  # Polled by another process
+            poll_batch(client, batch)
+        except Exception as e:
+            # Left active and retried on the next poll
+            db.session.rollback()
+            logger.warning("Could not poll explanation batch %s: %s", batch.batch_id, e)
+    return active_batches()
+
+def wait_for_batches(client, poll_interval=None, progress=None):
+    """Poll until no batch is active; ``progress(active_batches)`` is called after every round."""
+    poll_interval = current_app.config.get('EXPLANATION_BATCH_POLL_INTERVAL', 60) if poll_interval is None \
+        else poll_interval
+    while True:
+        active = poll_batches(client)
+        if progress:
+            progress(active)
+        if not active:
+            return
+        db.session.expunge_all()
+        time.sleep(poll_interval)
+
+def _submit_in_app_context(app, client, batch_ids):
+    with app.app_context():
+        try:
+            _submit_recorded(client, ExplanationBatch.query.filter(ExplanationBatch.id.in_(batch_ids))
+                             .order_by(ExplanationBatch.id).all())
+        except Exception:
+            logger.exception('Explanation batch submission failed')
+        finally:
+            db.session.remove()
+    start_batch_poller(app)
+
+def start_batch_submission(client, batch_ids, app=None):
+    """Submit the recorded batches ``batch_ids`` and then poll them on daemon threads, so the request that
+    recorded them can return immediately. Returns the submitting thread.
+    """
+    app = app or current_app._get_current_object()
+    thread = threading.Thread(target=_submit_in_app_context, args=(app, client, list(batch_ids)),
+                              name='explanation-batch-submit', daemon=True)
+    thread.start()
+    return thread
+
+def _poll_in_app_context(app):
+    with app.app_context():
+        try:
+            wait_for_batches(anthropic_client(max_retries=2))
+        except Exception:
+            logger.exception('Explanation batch polling stopped')
+        finally:
+            db.session.remove()
+
+def start_batch_poller(app=None):
+    """Poll active batches on a daemon thread, unless this process already does. Returns the thread."""
+    global _poller
+    app = app or current_app._get_current_object()
+    with _poller_lock:
+        if _poller is None or not _poller.is_alive():
+            _poller = threading.Thread(target=_poll_in_app_context, args=(app,),
+                                       name='explanation-batches', daemon=True)
+            _poller.start()
+        return _poller
+
+def resume_batch_polling(app=None):
+    """Start the poller if recorded batches are still active, once per process (e.g. after a restart)."""
+    global _resumed_pid
+    with _poller_lock:
+        if _resumed_pid == os.getpid():
+            return
+        _resumed_pid = os.getpid()
+    if not os.getenv('ANTHROPIC_API_KEY'):
+        return
+    try:
+        if active_batches():
+            start_batch_poller(app)
+    except Exception as e:
+        logger.warning("Could not resume explanation batch polling: %s", e)
+
+def init_app(app):
+    """Resume polling on the first request each worker serves, so batches submitted before a restart finish."""
+    @app.before_request
+    def _resume_batch_polling():
+        resume_batch_polling(app)
@@ -0,0 +1,95 @@
+"""
+Facet counts for the update listing filters.
+
+``facet_counts`` holds one row per (provider, tag kind, tag name) with the
+number of updates carrying that tag. It is adjusted incrementally from the
+tag sync in ``app.utils.update_tags`` on every flush and rebuilt from the tag
+tables with one GROUP BY when a bulk delete makes the deltas unknowable.
+
+When a listing is filtered, the counts for each kind are conditioned on the
+filters of the other kinds and computed with a GROUP BY over the indexed tag
+tables, restricted to the matching update ids, so no update rows are decoded.
+"""
+from collections import Counter
+from sqlalchemy import select, func, literal
+from app import db
+from app.models import Update, FacetCount, UPDATE_TAG_TABLES as TAG_TABLES
+
+_facets = FacetCount.__table__
+
+def apply_facet_delta(connection, added, removed):
+    """Adjust counts by ``added``/``removed`` iterables of (provider, kind, name)."""
+    delta = Counter(added)
+    delta.subtract(Counter(removed))
+    for (provider, kind, name), change in delta.items():
+        if not change:
+            continue
+        key = (_facets.c.provider == provider) & (_facets.c.kind == kind) & (_facets.c.name == name)
+        result = connection.execute(_facets.update().where(key).values(count=_facets.c.count + change))
+        if result.rowcount == 0 and change > 0:
+            connection.execute(_facets.insert().values(provider=provider, kind=kind, name=name, count=change))
+    if any(change < 0 for change in delta.values()):
+        connection.execute(_facets.delete().where(_facets.c.count <= 0))
+
+def rebuild_facet_counts(connection=None):
+    """Recompute every count from the tag tables."""
+    connection = connection or db.session.connection()
+    connection.execute(_facets.delete())
+    for kind, table in TAG_TABLES.items():
+        connection.execute(_facets.insert().from_select(
+            ['provider', 'kind', 'name', 'count'],
+            select(Update.provider, literal(kind), table.c.name, func.count())
+            .join(Update, Update.id == table.c.update_id)
+            .group_by(Update.provider, table.c.name)
+        ))
+
+def ensure_facet_counts():
+    """Build the counts if the table is empty but tags exist (e.g. right after upgrading)."""
+    if db.session.execute(select(_facets.c.provider).limit(1)).first() is not None:
+        return False
+    if all(db.session.execute(select(table.c.update_id).limit(1)).first() is None
+           for table in TAG_TABLES.values()):
+        return False
+    rebuild_facet_counts()
+    db.session.commit()
+    return True
+
+def _matching_ids(provider, filters, exclude_kind):
+    """Ids of ``provider`` updates matching every filter except ``exclude_kind``."""
+    query = select(Update.id).where(Update.provider == provider)
+    for kind, names in filters.items():
+        if kind != exclude_kind and names:
+            table = TAG_TABLES[kind]
+            query = query.where(Update.id.in_(select(table.c.update_id).where(table.c.name.in_(list(names)))))
+    return query
+
+def get_facet_counts(provider, filters=None, kinds=('product', 'type', 'status')):
+    """Return ``{kind: {name: count}}`` for the listing sidebar.
+
+    Each kind's counts are conditioned on the selected values of the other
+    kinds (so alternatives within a kind stay visible); without such filters
+    they come straight from the precomputed table.
+    """
+    filters = {kind: names for kind, names in (filters or {}).items() if names}
+    counts = {kind: {} for kind in kinds}
+
+    unconditioned = [kind for kind in kinds if not any(k != kind for k in filters)]
+    if unconditioned:
+        rows = db.session.execute(
+            select(_facets.c.kind, _facets.c.name, _facets.c.count)
+            .where(_facets.c.provider == provider, _facets.c.kind.in_(unconditioned))
+        )
+        for kind, name, count in rows:
+            counts[kind][name] = count
+
+    for kind in kinds:
+        if kind in unconditioned:
+            continue
+        table = TAG_TABLES[kind]
+        rows = db.session.execute(
+            select(table.c.name, func.count())
+            .where(table.c.update_id.in_(_matching_ids(provider, filters, kind)))
+            .group_by(table.c.name)
+        )
+        counts[kind] = dict(rows.all())
+    return counts
@@ -0,0 +1,136 @@
+"""
+Raw feed archive.
+
+Every payload the scrapers fetch is stored gzip-compressed and addressed by the
+SHA-256 of its uncompressed bytes, so an unchanged feed is stored once however
+often it is fetched. Each fetch appends one JSON line to ``index.jsonl`` with
+its metadata (provider, URL, status, selected headers, sizes, timing).
+
+Layout under ``FEED_ARCHIVE_DIR``::
+
+    objects/ab/abcdef....xml.gz
+    index.jsonl
+
+The index is a plain file rather than a table so the archive survives dropping
+and rebuilding the database, which is what ``flask scrape replay`` is for.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'instance', 'feed_archive'))
+_ARCHIVED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Date')
+_index_lock = threading.Lock()
+
+class FeedArchive:
+    """Content-addressed store of raw feed payloads."""
+
+    def __init__(self, root):
+        self.root = root
+        self.index_path = os.path.join(root, 'index.jsonl')
+
+    def object_path(self, sha256):
+        return os.path.join(self.root, 'objects', sha256[:2], f'{sha256}.xml.gz')
+
+    def store(self, provider, url, content, status_code=None, headers=None, duration_ms=None):
+        """Store ``content`` if it is new and record the fetch. Returns the index record."""
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = self.object_path(sha256)
+        is_new = not os.path.exists(path)
+        if is_new:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename so readers never see a partial object
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as gz:
+                    gz.write(content)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+        record = {
+            'provider': provider,
+            'sha256': sha256,
+            'url': url,
+            'fetched_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'status': status_code,
+            'headers': {name: headers[name] for name in _ARCHIVED_HEADERS if headers and name in headers},
+            'bytes': len(content),
+            'stored_bytes': os.path.getsize(path),
+            'duration_ms': duration_ms,
+            'new': is_new
+        }
+        line = json.dumps(record, sort_keys=True) + '\n'
+        with _index_lock, open(self.index_path, 'a', encoding='utf-8') as index:
+            index.write(line)
+        return record
+
+    def load(self, sha256):
+        """Return the uncompressed payload for ``sha256``."""
+        with gzip.open(self.object_path(sha256), 'rb') as gz:
+            return gz.read()
+
+    def records(self, provider=None, since=None, unique=True):
+        """Fetch records in fetch order, optionally filtered by provider and start date.
+
+        With ``unique`` only the first fetch of each payload is returned, since
+        replaying the same bytes twice cannot produce new updates.
+        """
+        if not os.path.exists(self.index_path):
+            return []
+
+        since_value = since.isoformat() if since else None
+        seen = set()
+        results = []
+        with open(self.index_path, encoding='utf-8') as index:
+            for line in index:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning("Skipping corrupt feed archive index line")
+                    continue
+                if provider and record['provider'] != provider:
+                    continue
+                if since_value and record['fetched_at'] < since_value:
+                    continue
+                if unique:
+                    if record['sha256'] in seen:
+                        continue
+                    seen.add(record['sha256'])
+                results.append(record)
+        return results
+
+def get_archive():
+    """The configured archive, or None when archiving is disabled."""
+    if has_app_context():
+        if not current_app.config.get('FEED_ARCHIVE_ENABLED', True):
+            return None
+        return FeedArchive(current_app.config.get('FEED_ARCHIVE_DIR') or _DEFAULT_DIR)
+    return FeedArchive(_DEFAULT_DIR)
+
+def archive_response(provider, url, response, duration_ms=None):
+    """Archive a fetched feed response. Failures are logged and never raised."""
+    try:
+        archive = get_archive()
+        if archive is None:
+            return None
+        record = archive.store(provider, url, response.content, status_code=response.status_code,
+                               headers=response.headers, duration_ms=duration_ms)
+        logger.debug("Archived %s feed payload %s (new=%s)", provider, record['sha256'], record['new'])
+        return record
+    except Exception as e:
+        logger.warning("Failed to archive %s feed payload: %s", provider, e)
+        return None
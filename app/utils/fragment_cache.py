@@ -0,0 +1,239 @@
+"""
+Cache of rendered HTML fragments, shared by all workers.
+
+``cached_fragment`` returns a partial template rendered for some parameters
+at the current data version (``app.utils.data_version``). On a hit neither the
+fragment's queries nor its template run; on a miss ``render()`` does both and
+the result is stored. A write bumps the data version, which changes every key,
+so stale fragments are never read again and age out.
+
+Fragments live in a SQLite database (``FRAGMENT_CACHE_URI``, by default
+``instance/fragment_cache.db``) holding at most ``FRAGMENT_CACHE_MAX_BYTES`` of
+HTML; beyond that the least recently used fragments are evicted. Hits and
+misses are counted per template in the same database (see ``fragment_stats``
+and ``/debug``). Without ``FRAGMENT_CACHE_URI`` fragments are rendered every
+time.
+
+A hit is a single read: each worker keeps its hit and miss counts in memory
+and writes them every ``FRAGMENT_CACHE_FLUSH_INTERVAL`` seconds, and a
+fragment's ``last_used`` is only moved once it is ``FRAGMENT_CACHE_TOUCH_INTERVAL``
+seconds old. Workers also estimate the stored size from what they wrote since
+they last summed it, and only sum (and evict) when the estimate is over budget
+or the flush interval has passed.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from flask import current_app, request
+from markupsafe import Markup
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, Text, create_engine, event, func, select
+from sqlalchemy.engine import make_url
+from app.utils.data_version import current_data_version
+from app.utils.db_engine import DEFAULT_SQLITE_PRAGMAS, sqlite_pragma_listener
+
+logger = logging.getLogger(__name__)
+
+FRAGMENT_ENGINE = 'fragment_cache_engine'  # key in app.extensions
+_WORKER_STATE = 'fragment_cache_worker'  # key in app.extensions
+_engine_lock = threading.Lock()
+
+_metadata = MetaData()
+fragments = Table(
+    'fragments', _metadata,
+    Column('key', String(64), primary_key=True),
+    Column('template', String(100), nullable=False),
+    Column('html', Text, nullable=False),
+    Column('size', Integer, nullable=False),
+    Column('last_used', Float, nullable=False, index=True)
+)
+fragment_counters = Table(
+    'fragment_counters', _metadata,
+    Column('template', String(100), primary_key=True),
+    Column('hits', Integer, nullable=False, default=0),
+    Column('misses', Integer, nullable=False, default=0)
+)
+
+def get_fragment_engine():
+    """The app's fragment cache engine, or None when the cache is not configured."""
+    engine = current_app.extensions.get(FRAGMENT_ENGINE)
+    if engine is not None:
+        return engine
+    uri = current_app.config.get('FRAGMENT_CACHE_URI')
+    if not uri:
+        return None
+    with _engine_lock:
+        engine = current_app.extensions.get(FRAGMENT_ENGINE)
+        if engine is None:
+            url = make_url(uri)
+            if url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:'):
+                os.makedirs(os.path.dirname(os.path.abspath(url.database)), exist_ok=True)
+            engine = create_engine(uri)
+            if engine.dialect.name == 'sqlite':
+                pragmas = current_app.config.get('SQLITE_PRAGMAS', DEFAULT_SQLITE_PRAGMAS)
+                event.listen(engine, 'connect', sqlite_pragma_listener(pragmas))
+            _metadata.create_all(engine)
+            current_app.extensions[FRAGMENT_ENGINE] = engine
+    return engine
+
+def request_params(**extra):
+    """Parameters identifying the current request's fragment: endpoint, URL arguments and query string."""
+    return {'endpoint': request.endpoint, 'view_args': request.view_args or {},
+            'args': sorted(request.args.items(multi=True)), **extra}
+
+def fragment_key(template, params):
+    version, updated_at = current_data_version()
+    raw = json.dumps([template, params, version, updated_at.isoformat()], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+class _WorkerState:
+    """This process's counts not written yet and its estimate of the stored fragment size."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()  # (template, 'hits' or 'misses') -> count
+        self.flushed_at = time.monotonic()
+        self.stored_bytes = None  # size when last summed plus what this process stored since
+        self.summed_at = 0.0
+
+def _worker_state():
+    state = current_app.extensions.get(_WORKER_STATE)
+    if state is None:
+        with _engine_lock:
+            state = current_app.extensions.setdefault(_WORKER_STATE, _WorkerState())
+    return state
+
+def _flush_interval():
+    return current_app.config.get('FRAGMENT_CACHE_FLUSH_INTERVAL', 10)
+
+def _count(connection, template, column, amount):
+    table = fragment_counters
+    result = connection.execute(table.update().where(table.c.template == template)
+                                .values({column: table.c[column] + amount}))
+    if result.rowcount == 0:
+        connection.execute(table.insert().values({'template': template, 'hits': 0, 'misses': 0, column: amount}))
+
+def flush_counts(engine=None):
+    """Write this process's pending hit and miss counts."""
+    engine = engine or get_fragment_engine()
+    if engine is None:
+        return
+    state = _worker_state()
+    with state.lock:
+        counts, state.counts = state.counts, Counter()
+        state.flushed_at = time.monotonic()
+    if not counts:
+        return
+    try:
+        with engine.begin() as connection:
+            for (template, column), amount in sorted(counts.items()):
+                _count(connection, template, column, amount)
+    except Exception as e:
+        # Kept for the next flush
+        with state.lock:
+            state.counts.update(counts)
+        logger.warning("Could not write fragment cache counts: %s", e)
+
+def _tally(engine, template, column):
+    state = _worker_state()
+    with state.lock:
+        state.counts[template, column] += 1
+        due = time.monotonic() - state.flushed_at >= _flush_interval()
+    if due:
+        flush_counts(engine)
+
+def _evict(connection, max_bytes):
+    """Drop least recently used fragments until the cache is within 90% of ``max_bytes``.
+
+    Returns the number of fragments evicted and the size left.
+    """
+    total = connection.scalar(select(func.coalesce(func.sum(fragments.c.size), 0)))
+    if total <= max_bytes:
+        return 0, total
+    excess, evicted = total - int(max_bytes * 0.9), []
+    for key, size in connection.execute(select(fragments.c.key, fragments.c.size).order_by(fragments.c.last_used)):
+        if excess <= 0:
+            break
+        evicted.append(key)
+        excess -= size
+        total -= size
+    connection.execute(fragments.delete().where(fragments.c.key.in_(evicted)))
+    return len(evicted), total
+
+def _store(connection, key, template, html):
+    """Store ``html`` under ``key``, evicting if the cache is likely over budget. Returns the number evicted."""
+    size = len(html.encode())
+    connection.execute(fragments.delete().where(fragments.c.key == key))
+    connection.execute(fragments.insert().values(key=key, template=template, html=html,
+                                                 size=size, last_used=time.time()))
+    max_bytes = current_app.config.get('FRAGMENT_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+    state = _worker_state()
+    with state.lock:
+        if state.stored_bytes is not None:
+            state.stored_bytes += size
+        # Other workers store fragments too, so the estimate is checked against a real sum now and then
+        due = state.stored_bytes is None or state.stored_bytes > max_bytes \
+            or time.monotonic() - state.summed_at >= _flush_interval()
+    if not due:
+        return 0
+    evicted, total = _evict(connection, max_bytes)
+    with state.lock:
+        state.stored_bytes, state.summed_at = total, time.monotonic()
+    return evicted
+
+def cached_fragment(template, params, render):
+    """HTML of ``template`` for ``params`` at the current data version; ``render()`` produces it on a miss.
+
+    ``render`` should run the fragment's queries as well as its template, so a hit skips both.
+    """
+    engine = get_fragment_engine()
+    if engine is None:
+        return Markup(render())
+    key = fragment_key(template, params)
+    try:
+        with engine.connect() as connection:
+            row = connection.execute(select(fragments.c.html, fragments.c.last_used)
+                                     .where(fragments.c.key == key)).first()
+        if row is not None:
+            now = time.time()
+            if now - row.last_used >= current_app.config.get('FRAGMENT_CACHE_TOUCH_INTERVAL', 60):
+                with engine.begin() as connection:
+                    connection.execute(fragments.update().where(fragments.c.key == key).values(last_used=now))
+            _tally(engine, template, 'hits')
+            return Markup(row.html)
+    except Exception as e:
+        logger.warning("Fragment cache unavailable, rendering %s: %s", template, e)
+        return Markup(render())
+
+    html = str(render())
+    try:
+        with engine.begin() as connection:
+            evicted = _store(connection, key, template, html)
+        if evicted:
+            logger.info('fragment_cache.evict', extra={'fields': {'template': template, 'evicted': evicted}})
+    except Exception as e:
+        logger.warning("Could not store fragment %s: %s", template, e)
+    _tally(engine, template, 'misses')
+    return Markup(html)
+
+def fragment_stats():
+    """``{template: {'hits', 'misses', 'fragments', 'bytes'}}`` across all workers.
+
+    Other workers' counts lag by up to ``FRAGMENT_CACHE_FLUSH_INTERVAL`` seconds.
+    """
+    engine = get_fragment_engine()
+    if engine is None:
+        return {}
+    flush_counts(engine)
+    with engine.connect() as connection:
+        stats = {template: {'hits': hits, 'misses': misses, 'fragments': 0, 'bytes': 0}
+                 for template, hits, misses in connection.execute(select(fragment_counters))}
+        for template, count, size in connection.execute(
+            select(fragments.c.template, func.count(), func.sum(fragments.c.size)).group_by(fragments.c.template)
+        ):
+            stats.setdefault(template, {'hits': 0, 'misses': 0})
+            stats[template].update(fragments=count, bytes=size)
+    return stats
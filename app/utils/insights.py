@@ -0,0 +1,309 @@
+"""
+Weekly insights.
+
+Insights are read from ``insight_rollups``, one row per (week, provider, kind,
+name) holding the number of updates it counts: kind ``update`` has the weekly
+totals (name ``''``), ``product`` the AWS product counts and ``category`` the
+Azure category counts (status categories excluded). Weeks start on Monday.
+``insight_totals`` holds the same counts summed over all weeks, for the
+all-time view, whose top lists are picked with a heap.
+
+The rollups are adjusted in the same transaction as every ORM flush that
+inserts, changes or deletes an update (both tables get the same deltas), and by
+``app.utils.update_tags.delete_updates``. ``rebuild_rollups`` recomputes them
+with two grouped queries (AWS by week and product, Azure by week and category
+list) when a bulk delete makes the deltas unknowable or an admin asks for it.
+Archiving moves updates without touching the rollups, so archived history
+stays counted; an archived update scraped again moves back out of the archive,
+so it is never counted twice.
+"""
+import heapq
+import json
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Update, InsightRollup, InsightTotal, WeeklyInsight
+from app.utils.data_version import mark_data_changed
+
+# Status tags that Azure mixes into its categories
+IGNORED_CATEGORIES = {'In preview', 'Launched', 'General availability', 'Generally available'}
+TOP_LIMIT = 5
+# Dialects whose INSERT ... ON CONFLICT adjusts the counts in one statement
+UPSERT_DIALECTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+# Update attributes the rollup keys are derived from
+_SOURCE_ATTRS = ('provider', 'published_date', 'product_name', '_categories')
+_rollups = InsightRollup.__table__
+_totals = InsightTotal.__table__
+
+def week_start(value):
+    """Monday 00:00 of the week containing ``value``."""
+    monday = value - timedelta(days=value.weekday())
+    return monday.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def week_bucket(column, dialect_name):
+    """SQL expression for the Monday starting ``column``'s week (a date string on SQLite)."""
+    if dialect_name == 'postgresql':
+        return func.date_trunc('week', column)
+    # SQLite: step back six days, then forward to the next Monday
+    return func.date(column, '-6 days', 'weekday 1')
+
+def _as_week(value):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return week_start(value)
+
+def _categories(raw):
+    try:
+        names = json.loads(raw or '[]')
+    except ValueError:
+        return []
+    return [name for name in names if isinstance(name, str) and name not in IGNORED_CATEGORIES]
+
+def rollup_keys(provider, published_date, product_name, categories):
+    """Rollup keys (week, provider, kind, name) an update with these column values counts towards."""
+    if published_date is None:
+        return []
+    week = week_start(published_date)
+    keys = [(week, provider, 'update', '')]
+    if provider == 'aws' and product_name:
+        keys.append((week, provider, 'product', product_name))
+    elif provider == 'azure':
+        keys.extend((week, provider, 'category', name) for name in _categories(categories))
+    return keys
+
+def _keys_for(update, old=False):
+    """Keys of ``update``'s current values, or with ``old`` the values before pending changes."""
+    values = []
+    for attr in _SOURCE_ATTRS:
+        history = inspect(update).attrs[attr].history
+        values.append(history.deleted[0] if old and history.deleted else getattr(update, attr))
+    return rollup_keys(*values)
+
+def _apply_delta(connection, table, columns, delta):
+    """Add ``delta`` ({key tuple: change}) to ``table``'s counts, keyed by ``columns``."""
+    rows = [dict(zip(columns, key), count=change) for key, change in delta.items() if change]
+    if not rows:
+        return
+    dialect_name = connection.dialect.name
+    if dialect_name in UPSERT_DIALECTS:
+        # One upsert, so concurrent writers adding the same new key both count instead of racing to insert it
+        statement = UPSERT_DIALECTS[dialect_name](table)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=list(columns), set_={'count': table.c.count + statement.excluded.count}), rows)
+    else:
+        for row in rows:
+            match = [table.c[column] == row[column] for column in columns]
+            result = connection.execute(table.update().where(*match).values(count=table.c.count + row['count']))
+            if result.rowcount == 0 and row['count'] > 0:
+                connection.execute(table.insert().values(**row))
+    if any(row['count'] < 0 for row in rows):
+        connection.execute(table.delete().where(table.c.count <= 0))
+
+def apply_rollup_delta(connection, added, removed):
+    """Adjust counts by ``added``/``removed`` iterables of (week, provider, kind, name)."""
+    delta = Counter(added)
+    delta.subtract(Counter(removed))
+    totals = Counter()
+    for key, change in delta.items():
+        totals[key[1:]] += change
+    _apply_delta(connection, _rollups, ('week_start', 'provider', 'kind', 'name'), delta)
+    _apply_delta(connection, _totals, ('provider', 'kind', 'name'), totals)
+
+def removed_rollup_keys(connection, ids):
+    """Keys counted by the stored updates ``ids``, for callers deleting them with Core statements."""
+    rows = connection.execute(select(Update.provider, Update.published_date, Update.product_name,
+                                     Update._categories).where(Update.id.in_(list(ids))))
+    return [key for row in rows for key in rollup_keys(*row)]
+
+def _keep_value(target, value, oldvalue, initiator):
+    return value
+
+# Load the previous value when one of these is set on an expired update, so its old keys are known
+for _attr in _SOURCE_ATTRS:
+    event.listen(getattr(Update, _attr), 'set', _keep_value, active_history=True, retval=True)
+
+@event.listens_for(Session, 'before_flush')
+def _collect_deleted_rollups(session, flush_context, instances):
+    # Imported before the flush: its first import registers Session listeners, which must not
+    # happen while the after_flush listeners are being dispatched
+    import app.utils.update_archive  # noqa: F401
+    deleted = [obj for obj in session.deleted if isinstance(obj, Update)]
+    if deleted:
+        with session.no_autoflush:
+            session.info['removed_rollups'] = [key for obj in deleted for key in _keys_for(obj, old=True)]
+
+@event.listens_for(Session, 'after_flush')
+def _sync_rollups_after_flush(session, flush_context):
+    added, removed = [], session.info.pop('removed_rollups', None) or []
+    new = [obj for obj in session.new if isinstance(obj, Update)]
+    if new:
+        from app.utils.update_archive import take_back_archived_copies
+        for obj in new:
+            added.extend(_keys_for(obj))
+        # An archived update scraped again is counted by its new row instead of its archived copy
+        removed.extend(take_back_archived_copies(session, new))
+    for obj in session.dirty:
+        if isinstance(obj, Update) and any(inspect(obj).attrs[attr].history.has_changes() for attr in _SOURCE_ATTRS):
+            removed.extend(_keys_for(obj, old=True))
+            added.extend(_keys_for(obj))
+    if added or removed:
+        apply_rollup_delta(session.connection(), added, removed)
+
+@event.listens_for(Session, 'after_bulk_delete')
+def _rebuild_rollups_after_bulk_delete(delete_context):
+    """``Query.delete()`` bypasses the flush, so recount from the remaining (and archived) updates."""
+    if delete_context.mapper.class_ is not Update:
+        return
+    from app.utils.update_archive import update_sources
+    with update_sources(include_archive=True) as sources:
+        rebuild_rollups([delete_context.session.connection()] + sources[1:])
+
+def _dialect_name(source):
+    dialect = getattr(source, 'dialect', None) or source.get_bind().dialect
+    return dialect.name
+
+def _grouped_counts(sources, provider, key):
+    """``{(week, key value): count}`` for ``provider``'s updates, summed over ``sources``."""
+    counts = Counter()
+    for source in sources:
+        week = week_bucket(Update.published_date, _dialect_name(source)).label('week')
+        statement = select(week, key, func.count(Update.id)) \
+            .where(Update.provider == provider).group_by(week, key)
+        for week_value, key_value, count in source.execute(statement):
+            counts[_as_week(week_value), key_value] += count
+    return counts
+
+def rebuild_totals(connection):
+    """Recompute ``insight_totals`` from the rollups."""
+    connection.execute(_totals.delete())
+    columns = (_rollups.c.provider, _rollups.c.kind, _rollups.c.name)
+    connection.execute(_totals.insert().from_select(
+        ['provider', 'kind', 'name', 'count'], select(*columns, func.sum(_rollups.c.count)).group_by(*columns)))
+
+def rebuild_rollups(sources=None):
+    """Recompute every rollup (and the totals) from the updates in ``sources`` (sessions or connections; default the
+    hot database), writing through the first one. Returns the number of rollup rows. The caller commits.
+    """
+    sources = sources or [db.session]
+    counts = Counter()
+    for (week, product_name), count in _grouped_counts(sources, 'aws', Update.product_name).items():
+        counts[week, 'aws', 'update', ''] += count
+        if product_name:
+            counts[week, 'aws', 'product', product_name] += count
+
+    # Azure category lists repeat a lot: decode each distinct list once
+    decoded = {}
+    for (week, raw), count in _grouped_counts(sources, 'azure', Update._categories).items():
+        counts[week, 'azure', 'update', ''] += count
+        if raw not in decoded:
+            decoded[raw] = _categories(raw)
+        for name in decoded[raw]:
+            counts[week, 'azure', 'category', name] += count
+
+    target = sources[0]
+    target.execute(_rollups.delete())
+    if counts:
+        target.execute(_rollups.insert(), [
+            {'week_start': week, 'provider': provider, 'kind': kind, 'name': name, 'count': count}
+            for (week, provider, kind, name), count in counts.items()
+        ])
+    rebuild_totals(target)
+    mark_data_changed()
+    return len(counts)
+
+def ensure_insight_rollups():
+    """Build the rollups if the table is empty but updates exist (e.g. right after upgrading)."""
+    if db.session.execute(select(_rollups.c.week_start).limit(1)).first() is not None:
+        if db.session.execute(select(_totals.c.provider).limit(1)).first() is not None:
+            return False
+        # Rollups from before the totals table existed
+        rebuild_totals(db.session.connection())
+        db.session.commit()
+        return True
+    if db.session.execute(select(Update.id).limit(1)).first() is None:
+        return False
+    from app.utils.update_archive import update_sources
+    with update_sources(include_archive=True) as sources:
+        rebuild_rollups(sources)
+    db.session.commit()
+    return True
+
+def _top(rows):
+    """The ``TOP_LIMIT`` (name, count) rows with the highest counts, ties by name, picked with a heap."""
+    ranked = heapq.nsmallest(TOP_LIMIT, rows, key=lambda row: (-row[1], row[0]))
+    return [{'name': name, 'count': count} for name, count in ranked]
+
+def _top_names(provider, kind, *criteria):
+    total = func.sum(_rollups.c.count)
+    rows = db.session.execute(
+        select(_rollups.c.name, total)
+        .where(_rollups.c.provider == provider, _rollups.c.kind == kind, *criteria)
+        .group_by(_rollups.c.name).order_by(total.desc(), _rollups.c.name).limit(TOP_LIMIT)
+    )
+    return _top(rows)
+
+def _all_time_top(provider, kind, end):
+    """Top names of all-time ``kind`` counts, leaving out weeks from ``end`` on."""
+    counts = dict(db.session.execute(
+        select(_totals.c.name, _totals.c.count).where(_totals.c.provider == provider, _totals.c.kind == kind)
+    ).all())
+    # Future-dated updates are rare: take their few rollups back out
+    for name, count in db.session.execute(
+        select(_rollups.c.name, _rollups.c.count)
+        .where(_rollups.c.provider == provider, _rollups.c.kind == kind, _rollups.c.week_start >= end)
+    ):
+        counts[name] -= count
+    return _top((name, count) for name, count in counts.items() if count > 0)
+
+def _current_week_end(now=None):
+    return week_start(now or datetime.utcnow()) + timedelta(days=7)
+
+def weekly_insights(now=None):
+    """Per-week AWS/Azure update counts up to the current week, newest first.
+
+    Returns unsaved ``WeeklyInsight`` objects without top lists (see ``insight_for_week``).
+    """
+    totals = defaultdict(dict)
+    for week, provider, count in db.session.execute(
+        select(_rollups.c.week_start, _rollups.c.provider, _rollups.c.count)
+        .where(_rollups.c.kind == 'update', _rollups.c.week_start < _current_week_end(now))
+    ):
+        totals[week][provider] = count
+    return [WeeklyInsight(week_start=week, week_end=week + timedelta(days=7), aws_updates=counts.get('aws', 0),
+                          azure_updates=counts.get('azure', 0), is_cumulative=False)
+            for week, counts in sorted(totals.items(), reverse=True)]
+
+def insight_for_week(week):
+    """Unsaved ``WeeklyInsight`` for the week starting ``week``, with its top products and categories."""
+    week = week_start(week)
+    this_week = _rollups.c.week_start == week
+    totals = dict(db.session.execute(
+        select(_rollups.c.provider, _rollups.c.count).where(this_week, _rollups.c.kind == 'update')
+    ).all())
+    if not totals:
+        return None
+    return WeeklyInsight(week_start=week, week_end=week + timedelta(days=7), aws_updates=totals.get('aws', 0),
+                         azure_updates=totals.get('azure', 0), is_cumulative=False,
+                         aws_top_products=_top_names('aws', 'product', this_week),
+                         azure_top_categories=_top_names('azure', 'category', this_week))
+
+def all_time_insight(now=None):
+    """Unsaved all-time ``WeeklyInsight`` (``is_cumulative``), or None when nothing is counted.
+
+    Update totals include future-dated updates; the top lists cover weeks up to the current one.
+    """
+    first_week = db.session.scalar(select(func.min(_rollups.c.week_start)))
+    if first_week is None:
+        return None
+    end = _current_week_end(now)
+    totals = dict(db.session.execute(
+        select(_totals.c.provider, _totals.c.count).where(_totals.c.kind == 'update')
+    ).all())
+    return WeeklyInsight(week_start=first_week, week_end=end, aws_updates=totals.get('aws', 0),
+                         azure_updates=totals.get('azure', 0), is_cumulative=True,
+                         aws_top_products=_all_time_top('aws', 'product', end),
+                         azure_top_categories=_all_time_top('azure', 'category', end))
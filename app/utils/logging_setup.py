@@ -0,0 +1,143 @@
+"""
+Central logging configuration.
+
+All application loggers live under the ``app`` namespace (Flask's
+``app.logger`` included). Records are put on an in-memory queue by a
+``QueueHandler`` and written by a ``QueueListener`` thread, so request and
+scraper threads never block on log I/O. A process forked from the one that
+started the listener (uWSGI workers forked from the master) starts its own
+listener on the inherited queue, since threads do not survive a fork. Messages use lazy ``%`` formatting and
+are gated by ``LOG_LEVEL``, so debug output costs a level check in production.
+
+Structured fields are passed as ``extra={'fields': {...}}`` and rendered as
+``key=value`` pairs (``LOG_FORMAT=text``) or as JSON lines (``LOG_FORMAT=json``).
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from contextlib import contextmanager
+from flask import g, request
+from flask.logging import default_handler
+
+_listener = None
+_listener_pid = None  # Process whose thread runs ``_listener``
+_queue_handler = None
+
+class StructuredFormatter(logging.Formatter):
+    """Formatter that appends the record's ``fields`` as text pairs or emits JSON."""
+
+    def __init__(self, json_output=False):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+        self.json_output = json_output
+
+    def format(self, record):
+        fields = getattr(record, 'fields', None) or {}
+        if self.json_output:
+            payload = {
+                'ts': self.formatTime(record),
+                'level': record.levelname,
+                'logger': record.name,
+                'message': record.getMessage()
+            }
+            payload.update(fields)
+            if record.exc_info:
+                payload['exc_info'] = self.formatException(record.exc_info)
+            return json.dumps(payload, default=str)
+
+        message = super().format(record)
+        if fields:
+            message += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return message
+
+def _run_listener(log_queue, handlers):
+    global _listener, _listener_pid
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    _listener_pid = os.getpid()
+
+def _ensure_listener():
+    """Start a listener for the inherited queue if this process was forked after the listener started."""
+    if _listener is not None and _listener_pid != os.getpid():
+        _run_listener(_listener.queue, _listener.handlers)
+
+def _stop_listener():
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+
+class _ForkSafeQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that makes sure the current process drains its queue (covers forks without hooks)."""
+
+    def enqueue(self, record):
+        if _listener_pid != os.getpid():
+            _ensure_listener()
+        super().enqueue(record)
+
+def _start_listener(json_output):
+    """Start the single background writer shared by every app in the process."""
+    global _queue_handler
+    if _listener is not None:
+        _ensure_listener()
+        return _queue_handler
+
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(StructuredFormatter(json_output=json_output))
+    _run_listener(log_queue, [stream_handler])
+    _queue_handler = _ForkSafeQueueHandler(log_queue)
+    return _queue_handler
+
+atexit.register(_stop_listener)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_ensure_listener)
+
+def configure_logging(app):
+    """Attach the queue handler to the ``app`` logger and add request timing."""
+    level = logging.getLevelName(str(app.config.get('LOG_LEVEL', 'INFO')).upper())
+    if not isinstance(level, int):
+        level = logging.INFO
+
+    handler = _start_listener(app.config.get('LOG_FORMAT', 'text') == 'json')
+    logger = logging.getLogger('app')
+    logger.setLevel(level)
+    logger.removeHandler(default_handler)
+    if handler not in logger.handlers:
+        logger.addHandler(handler)
+    logger.propagate = False
+
+    request_logger = logging.getLogger('app.request')
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request_timing(response):
+        started = g.pop('request_started', None)
+        if started is not None and request_logger.isEnabledFor(logging.INFO):
+            request_logger.info('request', extra={'fields': {
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 2)
+            }})
+        return response
+
+@contextmanager
+def log_timing(logger, event, level=logging.INFO, **fields):
+    """Log ``event`` with a ``duration_ms`` field once the block finishes.
+
+    The block may add result fields (e.g. item counts) to the yielded dict.
+    """
+    started = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        if logger.isEnabledFor(level):
+            fields['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            logger.log(level, event, extra={'fields': fields})
@@ -0,0 +1,146 @@
+"""
+Keyset (seek) pagination for update listings.
+
+Listings are ordered by ``(published_date DESC, id DESC)``. Instead of
+``OFFSET`` a page starts from the last row of the previous one, encoded in an
+opaque cursor, so every page costs the same index range scan. Page-number URLs
+still work: the boundary row of page N is located by scanning only the
+``(provider, published_date, id)`` index, then the page is fetched by key.
+
+Total counts are cached per listing/filter combination for
+``LISTING_COUNT_TTL`` seconds and dropped whenever this process writes updates.
+"""
+import base64
+import math
+import threading
+import time
+from datetime import datetime
+from flask import current_app, has_app_context
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from app.models import Update
+
+_count_cache = {}
+_count_lock = threading.Lock()
+
+def encode_cursor(published_date, update_id):
+    """Encode a row's sort key as a URL-safe token."""
+    raw = f'{published_date.isoformat()}|{update_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token):
+    """Decode a cursor into ``(published_date, id)``. Raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        published, update_id = raw.split('|')
+        return datetime.fromisoformat(published), int(update_id)
+    except Exception as e:
+        raise ValueError(f'Invalid cursor: {token!r}') from e
+
+class KeysetPage:
+    """One page of a keyset-paginated listing."""
+
+    def __init__(self, items, per_page, page=None, total=None, has_next=False, has_prev=False):
+        self.items = items
+        self.per_page = per_page
+        self.page = page
+        self.total = total
+        self.has_next = has_next
+        self.has_prev = has_prev
+
+    @property
+    def pages(self):
+        return max(1, math.ceil(self.total / self.per_page)) if self.total is not None else None
+
+    @property
+    def next_cursor(self):
+        if not (self.has_next and self.items):
+            return None
+        return encode_cursor(self.items[-1].published_date, self.items[-1].id)
+
+    @property
+    def prev_cursor(self):
+        if not (self.has_prev and self.items):
+            return None
+        return encode_cursor(self.items[0].published_date, self.items[0].id)
+
+def _older_than(key):
+    published_date, update_id = key
+    # The first conjunct is an index range; the second only trims equal timestamps
+    return (Update.published_date <= published_date) & (
+        (Update.published_date < published_date) | (Update.id < update_id))
+
+def _newer_than(key):
+    published_date, update_id = key
+    return (Update.published_date >= published_date) & (
+        (Update.published_date > published_date) | (Update.id > update_id))
+
+def _newest_first(query):
+    return query.order_by(Update.published_date.desc(), Update.id.desc())
+
+def _page_boundary(query, page, per_page):
+    """Sort key of the last row before ``page``, read from the index only."""
+    return _newest_first(query.with_entities(Update.published_date, Update.id)) \
+        .offset((page - 1) * per_page - 1).limit(1).first()
+
+def cached_count(query, key):
+    """``query.count()`` cached for ``LISTING_COUNT_TTL`` seconds under ``key``."""
+    ttl = current_app.config.get('LISTING_COUNT_TTL', 60) if has_app_context() else 60
+    now = time.monotonic()
+    with _count_lock:
+        hit = _count_cache.get(key)
+        if hit and now - hit[1] < ttl:
+            return hit[0]
+    # count(id) over the filtered rows; Query.count() would wrap every mapped column in a subquery
+    total = query.order_by(None).with_entities(func.count(Update.id)).scalar()
+    with _count_lock:
+        _count_cache[key] = (total, now)
+    return total
+
+def clear_count_cache():
+    with _count_lock:
+        _count_cache.clear()
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_counts_after_flush(session, flush_context):
+    if any(isinstance(obj, Update) for obj in session.new) or \
+            any(isinstance(obj, Update) for obj in session.deleted):
+        clear_count_cache()
+
+@event.listens_for(Session, 'after_bulk_delete')
+def _invalidate_counts_after_bulk_delete(delete_context):
+    if delete_context.mapper.class_ is Update:
+        clear_count_cache()
+
+def paginate_updates(query, per_page, page=1, after=None, before=None, count_key=None):
+    """Return a ``KeysetPage`` of ``query`` (an ``Update`` query, unordered).
+
+    ``after``/``before`` are cursors from a neighbouring page and take
+    precedence over ``page``; ``page`` is then only used for display. Invalid
+    cursors raise ValueError.
+    """
+    page = max(page or 1, 1)
+    total = cached_count(query, count_key) if count_key is not None else None
+
+    if before:
+        rows = query.filter(_newer_than(decode_cursor(before))) \
+            .order_by(Update.published_date.asc(), Update.id.asc()).limit(per_page + 1).all()
+        has_prev = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        return KeysetPage(items, per_page, page=page, total=total, has_next=True, has_prev=has_prev)
+
+    if after:
+        key = decode_cursor(after)
+    elif page > 1:
+        key = _page_boundary(query, page, per_page)
+        if key is None:
+            # Past the end, as with the old OFFSET pagination
+            return KeysetPage([], per_page, page=page, total=total, has_prev=True)
+    else:
+        key = None
+
+    if key is not None:
+        query = query.filter(_older_than(tuple(key)))
+    rows = _newest_first(query).limit(per_page + 1).all()
+    return KeysetPage(rows[:per_page], per_page, page=page, total=total,
+                      has_next=len(rows) > per_page, has_prev=key is not None)
@@ -0,0 +1,223 @@
+"""
+Resumable background jobs for reprocessing stored updates.
+
+A job walks one provider's updates in primary-key order, ``chunk_size`` rows at
+a time. Every chunk is committed together with the job's checkpoint
+(``last_id``) and heartbeat, so memory and transaction size stay bounded and a
+job interrupted by a crash or worker restart continues where it stopped.
+"""
+import bisect
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.orm import undefer
+from app import db
+from app.models import Update, ReprocessJob, ServiceCatalogVersion
+
+logger = logging.getLogger(__name__)
+
+# A running job whose heartbeat is older than this is considered dead and may be resumed
+STALE_AFTER = timedelta(minutes=5)
+
+ACTIVE_STATUSES = ('pending', 'running')
+
+def create_job(provider, catalog_version=None, chunk_size=None):
+    """Create a pending reprocessing job for ``provider``."""
+    if provider not in ('aws', 'azure'):
+        raise ValueError(f'Unknown provider: {provider}')
+    if catalog_version is not None and provider != 'aws':
+        raise ValueError('Catalog versions only apply to AWS updates')
+
+    job = ReprocessJob(
+        provider=provider,
+        catalog_version=catalog_version,
+        chunk_size=chunk_size or current_app.config.get('REPROCESS_CHUNK_SIZE', 200)
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def claim_job(job_id, stale_after=STALE_AFTER):
+    """Atomically mark a job as running. Returns False if another worker owns it."""
+    now = datetime.utcnow()
+    result = db.session.execute(
+        db.update(ReprocessJob).where(
+            ReprocessJob.id == job_id,
+            db.or_(
+                ReprocessJob.status.in_(('pending', 'failed')),
+                db.and_(ReprocessJob.status == 'running', ReprocessJob.updated_at < now - stale_after)
+            )
+        ).values(status='running', updated_at=now, error=None)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+def _target_ids(job):
+    """Sorted update ids for catalog-targeted jobs, or None to walk the whole provider."""
+    if job.catalog_version is None:
+        return None
+    from app.utils.service_catalog import find_affected_update_ids
+    version = ServiceCatalogVersion.query.filter_by(provider='aws', version=job.catalog_version).first()
+    if not version:
+        raise ValueError(f'Unknown catalog version {job.catalog_version}')
+    return find_affected_update_ids(version)
+
+def _build_processor(job):
+    from app.utils.update_processor import UpdateProcessor
+    if job.catalog_version is not None:
+        version = ServiceCatalogVersion.query.filter_by(provider='aws', version=job.catalog_version).first()
+        return UpdateProcessor(services=version.services)
+    return UpdateProcessor()
+
+def _next_chunk(job, target_ids):
+    """Load the next chunk of updates after the job's checkpoint.
+
+    Returns the updates and the id to move the checkpoint to, or ``None`` once no ids are left.
+    Targeted chunks may hold no updates at all when their rows were deleted meanwhile.
+    """
+    query = Update.query.filter(Update.provider == job.provider).options(undefer(Update.description))
+    if target_ids is not None:
+        start = bisect.bisect_right(target_ids, job.last_id)
+        chunk_ids = target_ids[start:start + job.chunk_size]
+        if not chunk_ids:
+            return [], None
+        return query.filter(Update.id.in_(chunk_ids)).order_by(Update.id).all(), chunk_ids[-1]
+    updates = query.filter(Update.id > job.last_id).order_by(Update.id).limit(job.chunk_size).all()
+    return updates, updates[-1].id if updates else None
+
+def _reprocess_aws(update, processor, scraper, clean_description):
+    """Re-clean the description and re-extract the product. Returns True if the row changed."""
+    changed = False
+    if clean_description and update.description:
+        description = scraper.clean_html(update.description)
+        if description != update.description:
+            update.description = description
+            changed = True
+
+    metadata = processor.process_aws_update({
+        'title': update.title,
+        'description': update.description
+    })
+    if metadata['product_name'] and metadata['product_name'] != update.product_name:
+        update.product_name = metadata['product_name']
+        changed = True
+    return changed
+
+def _reprocess_azure(update, processor):
+    """Re-run Azure categorization. Returns True if any field changed."""
+    metadata = processor.process_azure_update({
+        'title': update.title,
+        'description': update.description,
+        'categories': update.categories
+    })
+    before = (update.product_name, update._product_names, update._categories, update._update_types, update._status)
+    update.product_name = metadata['product_name']
+    update.product_names = metadata['product_names']
+    update.categories = metadata['categories']
+    update.update_types = metadata['update_types']
+    update.status = metadata['status']
+    return before != (update.product_name, update._product_names, update._categories, update._update_types, update._status)
+
+def run_job(job_id, stale_after=STALE_AFTER):
+    """Run (or resume) a job in the current app context.
+
+    Returns the finished job, or None if it could not be claimed.
+    """
+    if not claim_job(job_id, stale_after):
+        return None
+
+    job = db.session.get(ReprocessJob, job_id)
+    try:
+        target_ids = _target_ids(job)
+        processor = _build_processor(job)
+        scraper = None
+        if job.provider == 'aws':
+            from app.scraper.aws_scraper import AWSScraper
+            scraper = AWSScraper()
+
+        if not job.total:
+            if target_ids is not None:
+                job.total = len(target_ids)
+            else:
+                job.total = Update.query.filter_by(provider=job.provider).count()
+            db.session.commit()
+
+        while True:
+            updates, last_id = _next_chunk(job, target_ids)
+            if last_id is None:
+                break
+
+            changed = 0
+            for update in updates:
+                if job.provider == 'aws':
+                    # Catalog-targeted jobs only need the product name re-extracted
+                    changed += _reprocess_aws(update, processor, scraper, clean_description=job.catalog_version is None)
+                else:
+                    changed += _reprocess_azure(update, processor)
+
+            # Commit the chunk and its checkpoint together
+            job.last_id = last_id
+            job.processed += len(updates)
+            job.changed += changed
+            job.updated_at = datetime.utcnow()
+            db.session.commit()
+            logger.info('Reprocess job %s: %s/%s rows (last id %s)', job.id, job.processed, job.total, job.last_id)
+
+            # Drop the processed rows from the identity map to keep memory flat
+            db.session.expunge_all()
+            job = db.session.get(ReprocessJob, job_id)
+
+        if job.catalog_version is not None:
+            version = ServiceCatalogVersion.query.filter_by(provider='aws', version=job.catalog_version).first()
+            version.reprocessed_at = datetime.utcnow()
+        job.status = 'completed'
+        job.finished_at = job.updated_at = datetime.utcnow()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Reprocess job %s failed', job_id)
+        job = db.session.get(ReprocessJob, job_id)
+        job.status = 'failed'
+        job.error = str(e)
+        job.updated_at = datetime.utcnow()
+        db.session.commit()
+    return job
+
+def _run_in_app_context(app, job_id):
+    with app.app_context():
+        try:
+            run_job(job_id)
+        finally:
+            db.session.remove()
+
+def start_job(job_id, app=None):
+    """Run a job on a daemon thread so the request that created it can return immediately."""
+    app = app or current_app._get_current_object()
+    thread = threading.Thread(
+        target=_run_in_app_context,
+        args=(app, job_id),
+        name=f'reprocess-job-{job_id}',
+        daemon=True
+    )
+    thread.start()
+    return thread
+
+def resumable_jobs(stale_after=STALE_AFTER):
+    """Jobs that were never started, failed, or whose worker stopped sending heartbeats."""
+    cutoff = datetime.utcnow() - stale_after
+    return ReprocessJob.query.filter(
+        db.or_(
+            ReprocessJob.status.in_(('pending', 'failed')),
+            db.and_(ReprocessJob.status == 'running', ReprocessJob.updated_at < cutoff)
+        )
+    ).order_by(ReprocessJob.id).all()
+
+def find_active_job(provider, catalog_version=None):
+    """Return an existing pending/running job for the same work, if any."""
+    return ReprocessJob.query.filter(
+        ReprocessJob.provider == provider,
+        ReprocessJob.catalog_version.is_(None) if catalog_version is None
+        else ReprocessJob.catalog_version == catalog_version,
+        ReprocessJob.status.in_(ACTIVE_STATUSES)
+    ).order_by(ReprocessJob.id.desc()).first()
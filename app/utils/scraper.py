@@ -1,72 +1,51 @@
 """Utility functions for scraping updates."""
+import logging
 from app.scraper.aws_scraper import AWSScraper
 from app.scraper.azure_scraper import AzureScraper
 from app import db
 from app.models import Update
 from sqlalchemy.exc import IntegrityError
-from app.scraper.aws_services import AWSServicesFetcher
+from app.utils.service_catalog import refresh_aws_catalog, reprocess_catalog_change
+
+logger = logging.getLogger(__name__)
 
 def scrape_aws_updates():
     """Scrape AWS updates."""
-    print("\nStarting AWS updates scrape...")
+    logger.info("Starting AWS updates scrape")
     
     # First, refresh the AWS services cache
     try:
-        print("Refreshing AWS services cache...")
-        aws_services_fetcher = AWSServicesFetcher()
-        services = aws_services_fetcher.get_services(refresh=True)
-        print(f"AWS services cache refreshed. Found {len(services)} services.")
+        services, catalog_version = refresh_aws_catalog()
+        logger.info("AWS services cache refreshed with %d services", len(services))
+        if catalog_version and not catalog_version.is_baseline:
+            logger.info("Recorded AWS catalog version %s (+%d/-%d)", catalog_version.version,
+                        len(catalog_version.added), len(catalog_version.removed))
+            affected, changed = reprocess_catalog_change(catalog_version)
+            logger.info("Reprocessed %d affected AWS updates (%d product names changed)", affected, changed)
     except Exception as e:
-        print(f"Warning: Failed to refresh AWS services cache: {str(e)}")
-        print("Continuing with existing cache...")
+        logger.warning("Failed to refresh AWS services cache, continuing with existing cache: %s", e)
     
     # Now scrape updates
     scraper = AWSScraper()
     updates = scraper.scrape()
-    print(f"Got {len(updates)} AWS updates from scraper")
-    count = 0
-    
-    # Save updates to database
-    for update in updates:
-        try:
-            existing = db.session.query(db.exists().where(
-                db.and_(
-                    Update.provider == update.provider,
-                    Update.title == update.title,
-                    Update.published_date == update.published_date
-                )
-            )).scalar()
-            
-            if not existing:
-                print(f"Adding new AWS update: {update.title}")
-                db.session.add(update)
-                count += 1
-            else:
-                print(f"Skipping existing AWS update: {update.title}")
-        except IntegrityError as e:
-            print(f"IntegrityError for AWS update: {update.title}")
-            print(str(e))
-            db.session.rollback()
-            continue
-        except Exception as e:
-            print(f"Error processing AWS update: {update.title}")
-            print(str(e))
-            db.session.rollback()
-            continue
-    
-    db.session.commit()
-    print(f"Added {count} new AWS updates")
+    logger.info("Got %d AWS updates from scraper", len(updates))
+    count = save_updates(updates, 'AWS')
+    logger.info("Added %d new AWS updates", count)
     return count
 
 def scrape_azure_updates():
     """Scrape Azure updates."""
-    print("\nStarting Azure updates scrape...")
+    logger.info("Starting Azure updates scrape")
     scraper = AzureScraper()
     updates = scraper.scrape()
-    print(f"Got {len(updates)} Azure updates from scraper")
+    logger.info("Got %d Azure updates from scraper", len(updates))
+    count = save_updates(updates, 'Azure')
+    logger.info("Added %d new Azure updates", count)
+    return count
+
+def save_updates(updates, label):
+    """Add updates that are not stored yet and commit. Returns the number added."""
     count = 0
-    
-    # Save updates to database
     for update in updates:
         try:
             existing = db.session.query(db.exists().where(
@@ -78,22 +57,19 @@ def scrape_azure_updates():
             )).scalar()
             
             if not existing:
-                print(f"Adding new Azure update: {update.title}")
+                logger.debug("Adding new %s update: %s", label, update.title)
                 db.session.add(update)
                 count += 1
             else:
-                print(f"Skipping existing Azure update: {update.title}")
+                logger.debug("Skipping existing %s update: %s", label, update.title)
         except IntegrityError as e:
-            print(f"IntegrityError for Azure update: {update.title}")
-            print(str(e))
+            logger.warning("IntegrityError for %s update %r: %s", label, update.title, e)
             db.session.rollback()
             continue
         except Exception as e:
-            print(f"Error processing Azure update: {update.title}")
-            print(str(e))
+            logger.warning("Error processing %s update %r: %s", label, update.title, e)
             db.session.rollback()
             continue
     
     db.session.commit()
-    print(f"Added {count} new Azure updates")
     return count
@@ -0,0 +1,100 @@
+"""
+Versioned AWS service catalog.
+
+Each refresh of the AWS services list is stored as a numbered version together
+with the names added and removed since the previous version. Reprocessing after
+a refresh only touches the updates whose titles mention one of those names.
+"""
+from datetime import datetime
+from sqlalchemy.orm import undefer
+from app import db
+from app.models import Update, ServiceCatalogVersion
+from app.scraper.aws_services import AWSServicesFetcher
+from app.utils.title_search import find_update_ids_by_title
+
+def get_latest_version(provider='aws'):
+    """Return the most recent catalog version, or None if none was recorded."""
+    return ServiceCatalogVersion.query.filter_by(provider=provider).order_by(
+        ServiceCatalogVersion.version.desc()
+    ).first()
+
+def record_catalog_version(services, provider='aws'):
+    """Store ``services`` as a new catalog version if it differs from the latest one.
+
+    Returns the new ServiceCatalogVersion, or None when the catalog is unchanged.
+    """
+    services = set(services or [])
+    if not services:
+        return None
+
+    latest = get_latest_version(provider)
+    previous = set(latest.services) if latest else set()
+    if latest and services == previous:
+        return None
+
+    version = ServiceCatalogVersion(
+        provider=provider,
+        version=(latest.version + 1) if latest else 1,
+        services=services,
+        added=services - previous,
+        removed=previous - services
+    )
+    db.session.add(version)
+    db.session.commit()
+    return version
+
+def refresh_aws_catalog():
+    """Fetch the AWS services list and record a catalog version if it changed.
+
+    Returns a tuple of (services, new_version_or_None).
+    """
+    services = AWSServicesFetcher().get_services(refresh=True)
+    return services, record_catalog_version(services)
+
+def find_affected_update_ids(version):
+    """Ids of AWS updates affected by a catalog version.
+
+    An update is affected when its title contains an added or removed service
+    name, or when its stored product name is a service that was removed.
+    """
+    affected = set(find_update_ids_by_title(version.changed_names, provider='aws'))
+    if version.removed:
+        affected.update(update_id for (update_id,) in db.session.query(Update.id).filter(
+            Update.provider == 'aws',
+            Update.product_name.in_(version.removed)
+        ))
+    return sorted(affected)
+
+def reprocess_catalog_change(version, processor=None):
+    """Re-extract product names for the updates affected by ``version``.
+
+    Uses the services stored in the version itself so the result does not depend
+    on the state of the on-disk cache. Updates whose product was removed from the
+    catalog and matches no other service lose their product name. Returns
+    (affected_count, changed_count).
+    """
+    if processor is None:
+        from app.utils.update_processor import UpdateProcessor
+        processor = UpdateProcessor(services=version.services)
+
+    update_ids = find_affected_update_ids(version)
+    updates = Update.query.filter(Update.id.in_(update_ids)).options(undefer(Update.description)).all() \
+        if update_ids else []
+    removed = set(version.removed)
+    changed = 0
+    for update in updates:
+        metadata = processor.process_aws_update({
+            'title': update.title,
+            'description': update.description
+        })
+        # Same rule as the full reprocess: only overwrite when a product was found,
+        # except that a service removed from the catalog is never kept
+        product_name = metadata['product_name'] or \
+            (None if update.product_name in removed else update.product_name)
+        if product_name != update.product_name:
+            update.product_name = product_name
+            changed += 1
+
+    version.reprocessed_at = datetime.utcnow()
+    db.session.commit()
+    return len(update_ids), changed
@@ -8,6 +8,7 @@ from typing import List, Dict, Tuple
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.cluster import DBSCAN
 import numpy as np
+from sqlalchemy.orm import undefer
 from app.models import Update, WeeklyTheme
 from app import db
 
@@ -134,7 +135,7 @@ def generate_weekly_themes():
     # Process each provider
     for provider in ['aws', 'azure']:
         # Get this week's updates
-        updates = Update.query.filter(
+        updates = Update.query.options(undefer(Update.description)).filter(
             Update.provider == provider,
             Update.published_date >= week_start
         ).all()
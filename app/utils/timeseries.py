@@ -0,0 +1,216 @@
+"""
+Daily update counts for ``/api/timeseries``.
+
+``TimeSeriesStore`` holds one row of daily counts per series in a dense NumPy
+array (``counts[series, day]``). The series are the per-provider totals and
+each provider's products, update types and statuses, read from the tag
+tables with grouped queries. Day, week and month buckets for any date range
+are slices summed with ``np.add.reduceat``, so a year of one product's
+cadence costs microseconds once the store is loaded.
+
+The store is persisted to ``TIMESERIES_PATH`` (an ``.npz`` file) and shared by
+every worker. It records a signature of the ``update`` and ``facet_counts``
+tables (row count, highest id, total tags) and is rebuilt when the signature
+changes or the store is older than ``TIMESERIES_MAX_AGE`` seconds, which also
+catches edits that keep the signature. Only the hot table is counted, not the
+update archive.
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+from flask import current_app, has_app_context
+from sqlalchemy import func, select
+from app import db
+from app.models import Update, FacetCount, UPDATE_TAG_TABLES as TAG_TABLES
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('total',) + tuple(TAG_TABLES)
+GRANULARITIES = ('day', 'week', 'month')
+_DEFAULT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'instance', 'timeseries.npz'))
+_lock = threading.Lock()
+_cached = {}
+
+def _as_date(value):
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+def bucket_starts(start, end, granularity):
+    """First day of every ``granularity`` bucket overlapping ``start``..``end`` (inclusive)."""
+    if granularity == 'day':
+        first, step = start, lambda day: day + timedelta(days=1)
+    elif granularity == 'week':
+        first, step = start - timedelta(days=start.weekday()), lambda day: day + timedelta(days=7)
+    elif granularity == 'month':
+        first = start.replace(day=1)
+        step = lambda day: (day + timedelta(days=32)).replace(day=1)
+    else:
+        raise ValueError(f'Unknown granularity {granularity!r}')
+    starts = []
+    while first <= end:
+        starts.append(first)
+        first = step(first)
+    return starts
+
+def bucket_count(start, end, granularity):
+    """Number of ``granularity`` buckets overlapping ``start``..``end``, without listing them."""
+    if granularity == 'day':
+        return (end - start).days + 1
+    if granularity == 'week':
+        return ((end - start).days + start.weekday()) // 7 + 1
+    if granularity == 'month':
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    raise ValueError(f'Unknown granularity {granularity!r}')
+
+def _bucket_end(first, granularity):
+    """Last day of the bucket starting on ``first``."""
+    if granularity == 'day':
+        return first
+    if granularity == 'week':
+        return first + timedelta(days=6)
+    return (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+class TimeSeriesStore:
+    """Dense daily counts per (provider, kind, name) series."""
+
+    def __init__(self, first_day, keys, counts, signature=(), built_at=None):
+        self.first_day = first_day
+        self.keys = [tuple(key) for key in keys]
+        self.index = {key: row for row, key in enumerate(self.keys)}
+        self.counts = counts
+        self.signature = tuple(signature)
+        self.built_at = built_at or time.time()
+
+    @property
+    def last_day(self):
+        return self.first_day + timedelta(days=self.counts.shape[1] - 1)
+
+    @classmethod
+    def build(cls, session=None, signature=()):
+        """Count updates per series and day with one grouped query per kind."""
+        session = session or db.session
+        day = func.date(Update.published_date)
+        rows = [(provider, 'total', '', _as_date(value), count) for provider, value, count in session.execute(
+            select(Update.provider, day, func.count(Update.id)).group_by(Update.provider, day))]
+        for kind, table in TAG_TABLES.items():
+            rows.extend((provider, kind, name, _as_date(value), count) for provider, name, value, count in session.execute(
+                select(Update.provider, table.c.name, day, func.count()).select_from(table)
+                .join(Update, Update.id == table.c.update_id)
+                .group_by(Update.provider, table.c.name, day)))
+
+        if not rows:
+            return cls(date.today(), [], np.zeros((0, 1), dtype=np.int32), signature)
+        first_day = min(row[3] for row in rows)
+        days = (max(row[3] for row in rows) - first_day).days + 1
+        keys = sorted({row[:3] for row in rows})
+        index = {key: i for i, key in enumerate(keys)}
+        counts = np.zeros((len(keys), days), dtype=np.int32)
+        series = np.fromiter((index[row[:3]] for row in rows), dtype=np.int64, count=len(rows))
+        offsets = np.fromiter(((row[3] - first_day).days for row in rows), dtype=np.int64, count=len(rows))
+        np.add.at(counts, (series, offsets), np.fromiter((row[4] for row in rows), dtype=np.int32, count=len(rows)))
+        return cls(first_day, keys, counts, signature)
+
+    def save(self, path):
+        """Write the store atomically, so readers in other workers never see a partial file."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp.npz')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                np.savez_compressed(
+                    handle, counts=self.counts, first_day=np.int64(self.first_day.toordinal()),
+                    providers=np.array([key[0] for key in self.keys], dtype=str),
+                    kinds=np.array([key[1] for key in self.keys], dtype=str),
+                    names=np.array([key[2] for key in self.keys], dtype=str),
+                    signature=np.array(self.signature, dtype=np.int64), built_at=np.float64(self.built_at))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            keys = zip(data['providers'].tolist(), data['kinds'].tolist(), data['names'].tolist())
+            return cls(date.fromordinal(int(data['first_day'])), keys, data['counts'],
+                       data['signature'].tolist(), float(data['built_at']))
+
+    def names(self, provider=None, kind=None):
+        """Series keys, optionally filtered by provider and kind."""
+        return [key for key in self.keys
+                if (provider is None or key[0] == provider) and (kind is None or key[1] == kind)]
+
+    def query(self, keys, start, end, granularity='day'):
+        """Bucket start dates and one count array per key over ``start``..``end`` (inclusive).
+
+        Unknown keys and days outside the stored range count as zero.
+        """
+        starts = bucket_starts(start, end, granularity)
+        if not starts:
+            return [], [np.zeros(0, dtype=np.int64) for _ in keys]
+        # Stored day offsets covered by the buckets, from the first bucket's start to the last one's end
+        span_start = (starts[0] - self.first_day).days
+        span_end = (_bucket_end(starts[-1], granularity) - self.first_day).days
+        width = span_end - span_start + 1
+        offsets = np.array([(day - starts[0]).days for day in starts], dtype=np.int64)
+
+        results = []
+        for key in keys:
+            window = np.zeros(width, dtype=np.int64)
+            row = self.index.get(key)
+            if row is not None:
+                # Copy the overlap between the requested window and the stored days
+                lo, hi = max(span_start, 0), min(span_end, self.counts.shape[1] - 1)
+                if lo <= hi:
+                    window[lo - span_start:hi - span_start + 1] = self.counts[row, lo:hi + 1]
+            results.append(np.add.reduceat(window, offsets))
+        return starts, results
+
+def _store_path():
+    if has_app_context():
+        return current_app.config.get('TIMESERIES_PATH') or _DEFAULT_PATH
+    return _DEFAULT_PATH
+
+def current_signature(session=None):
+    """Cheap fingerprint of the data the store is built from."""
+    session = session or db.session
+    rows, last_id = session.execute(select(func.count(Update.id), func.max(Update.id))).one()
+    tags = session.scalar(select(func.sum(FacetCount.count)))
+    return (rows or 0, last_id or 0, tags or 0)
+
+def get_store():
+    """The current store: from this worker's memory, the shared file, or rebuilt from the database."""
+    path = _store_path()
+    max_age = current_app.config.get('TIMESERIES_MAX_AGE', 300)
+    signature = current_signature()
+
+    def fresh(store):
+        return store is not None and store.signature == signature and time.time() - store.built_at < max_age
+
+    store = _cached.get(path)
+    if fresh(store):
+        return store
+    with _lock:
+        store = _cached.get(path)
+        if not fresh(store) and os.path.exists(path):
+            try:
+                store = TimeSeriesStore.load(path)
+            except Exception as e:
+                logger.warning("Ignoring unreadable time series store %s: %s", path, e)
+                store = None
+        if not fresh(store):
+            started = time.perf_counter()
+            store = TimeSeriesStore.build(signature=signature)
+            store.save(path)
+            logger.info('timeseries.build', extra={'fields': {
+                'series': len(store.keys), 'days': store.counts.shape[1],
+                'duration_ms': round((time.perf_counter() - started) * 1000, 1)}})
+        _cached[path] = store
+    return store
@@ -0,0 +1,144 @@
+"""
+Fast timestamp parsing for RSS/Atom feed dates.
+
+Feed items carry RFC 822 dates (``Wed, 30 Apr 2025 16:00:32 GMT``) or ISO 8601
+timestamps (``2025-04-30T16:00:32Z``). Both are matched with precompiled
+regular expressions instead of trying several ``strptime`` formats per item,
+and each ``TimestampParser`` remembers which format last succeeded so a feed
+that always uses one style hits it first. All results are naive UTC datetimes,
+which is how ``Update.published_date`` is stored.
+"""
+import re
+from datetime import datetime, timedelta
+
+_MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+
+# RFC 822 zone names, as offsets in minutes east of UTC
+_ZONES = {
+    'Z': 0, 'UT': 0, 'UTC': 0, 'GMT': 0,
+    'EST': -300, 'EDT': -240, 'CST': -360, 'CDT': -300,
+    'MST': -420, 'MDT': -360, 'PST': -480, 'PDT': -420
+}
+
+_RFC822 = re.compile(
+    r'\s*(?:[A-Za-z]{3},\s*)?(\d{1,2})\s+([A-Za-z]{3})\s+(\d{2,4})\s+'
+    r'(\d{1,2}):(\d{2})(?::(\d{2}))?\s*([A-Za-z]{1,3}|[+-]\d{4})?\s*$'
+)
+
+_ISO8601 = re.compile(
+    r'\s*(\d{4})-(\d{2})-(\d{2})(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6})\d*)?)?)?'
+    r'\s*(Z|[+-]\d{2}:?\d{2})?\s*$'
+)
+
+# Formats the scrapers used before this module existed, kept as a slow fallback
+_LEGACY_FORMATS = (
+    '%a, %d %b %Y %H:%M:%S %z',
+    '%a, %d %b %Y %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%SZ'
+)
+
+def _offset_minutes(zone):
+    """Offset in minutes for a zone token, or None if it is unknown."""
+    if not zone:
+        return 0
+    if zone[0] in '+-':
+        digits = zone[1:].replace(':', '')
+        minutes = int(digits[:2]) * 60 + int(digits[2:4])
+        return -minutes if zone[0] == '-' else minutes
+    return _ZONES.get(zone.upper())
+
+def _to_utc(dt, offset_minutes):
+    return dt - timedelta(minutes=offset_minutes) if offset_minutes else dt
+
+def parse_rfc822(value):
+    """Parse an RFC 822 date into naive UTC, or return None."""
+    match = _RFC822.match(value)
+    if not match:
+        return None
+    day, month, year, hour, minute, second, zone = match.groups()
+    month_number = _MONTHS.get(month.lower())
+    offset = _offset_minutes(zone)
+    if month_number is None or offset is None:
+        return None
+    year = int(year)
+    if year < 100:
+        year += 2000 if year < 50 else 1900
+    try:
+        dt = datetime(year, month_number, int(day), int(hour), int(minute), int(second or 0))
+    except ValueError:
+        return None
+    return _to_utc(dt, offset)
+
+def parse_iso8601(value):
+    """Parse an ISO 8601 timestamp into naive UTC, or return None."""
+    match = _ISO8601.match(value)
+    if not match:
+        return None
+    year, month, day, hour, minute, second, fraction, zone = match.groups()
+    try:
+        dt = datetime(
+            int(year), int(month), int(day),
+            int(hour or 0), int(minute or 0), int(second or 0),
+            int(fraction.ljust(6, '0')) if fraction else 0
+        )
+    except ValueError:
+        return None
+    return _to_utc(dt, _offset_minutes(zone))
+
+def parse_legacy(value):
+    """Slow path: the original strptime formats, normalized to naive UTC."""
+    for fmt in _LEGACY_FORMATS:
+        try:
+            dt = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if dt.tzinfo is not None:
+            dt = (dt - dt.utcoffset()).replace(tzinfo=None)
+        return dt
+    return None
+
+class TimestampParser:
+    """Feed timestamp parser that tries the last successful format first.
+
+    Keep one instance per feed so the memoized format reflects that feed's style.
+    """
+
+    _parsers = (parse_rfc822, parse_iso8601, parse_legacy)
+
+    def __init__(self, feed=None):
+        self.feed = feed
+        self._last = None
+
+    def parse(self, value):
+        """Parse ``value`` into a naive UTC datetime, or return None."""
+        if not value:
+            return None
+        if isinstance(value, datetime):
+            if value.tzinfo is not None:
+                return (value - value.utcoffset()).replace(tzinfo=None)
+            return value
+
+        if self._last is not None:
+            result = self._last(value)
+            if result is not None:
+                return result
+
+        for parser in self._parsers:
+            if parser is self._last:
+                continue
+            result = parser(value)
+            if result is not None:
+                self._last = parser
+                return result
+        return None
+
+    __call__ = parse
+
+_default_parser = TimestampParser()
+
+def parse_timestamp(value):
+    """Parse a feed timestamp with a shared parser instance."""
+    return _default_parser.parse(value)
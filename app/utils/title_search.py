@@ -0,0 +1,104 @@
+"""
+Full-text index over update titles.
+
+On SQLite an FTS5 external-content table mirrors ``update.title`` and is kept
+in sync by triggers, so looking up the updates that mention a service name is
+an index probe instead of a ``LIKE '%name%'`` scan. Other backends (or SQLite
+builds without FTS5) fall back to a plain LIKE query.
+"""
+import re
+from sqlalchemy import text
+from app import db
+from app.models import Update
+
+FTS_TABLE = 'update_title_fts'
+
+_TRIGGERS = {
+    'update_title_fts_ai': f'''
+        CREATE TRIGGER IF NOT EXISTS update_title_fts_ai AFTER INSERT ON "update" BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title) VALUES (new.id, new.title);
+        END''',
+    'update_title_fts_ad': f'''
+        CREATE TRIGGER IF NOT EXISTS update_title_fts_ad AFTER DELETE ON "update" BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title) VALUES ('delete', old.id, old.title);
+        END''',
+    'update_title_fts_au': f'''
+        CREATE TRIGGER IF NOT EXISTS update_title_fts_au AFTER UPDATE OF title ON "update" BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title) VALUES ('delete', old.id, old.title);
+            INSERT INTO {FTS_TABLE}(rowid, title) VALUES (new.id, new.title);
+        END''',
+}
+
+def _is_sqlite():
+    return db.engine.dialect.name == 'sqlite'
+
+def has_title_index():
+    """Return True if the FTS table and all its sync triggers exist."""
+    if not _is_sqlite():
+        return False
+    names = {row[0] for row in db.session.execute(text(
+        "SELECT name FROM sqlite_master WHERE name LIKE 'update_title_fts%'"
+    ))}
+    return FTS_TABLE in names and all(name in names for name in _TRIGGERS)
+
+def ensure_title_index():
+    """Create the FTS table and triggers if missing, rebuilding the index when (re)created.
+
+    Triggers are dropped together with the ``update`` table, so a missing trigger
+    means the index can no longer be trusted and is rebuilt from scratch.
+    """
+    if not _is_sqlite() or has_title_index():
+        return False
+    try:
+        db.session.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(title, content='update', content_rowid='id')"
+        ))
+        for ddl in _TRIGGERS.values():
+            db.session.execute(text(ddl))
+        db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        db.session.commit()
+        return True
+    except Exception as e:
+        # SQLite builds without FTS5 simply use the LIKE fallback
+        db.session.rollback()
+        print(f"Title index unavailable, falling back to LIKE queries: {e}")
+        return False
+
+def _fts_phrase(name):
+    """Build an FTS5 prefix-phrase query for a service name (e.g. '"amazon q"*')."""
+    tokens = re.findall(r'\w+', name.lower())
+    if not tokens:
+        return None
+    return '"' + ' '.join(tokens) + '"*'
+
+def find_update_ids_by_title(names, provider=None):
+    """Return ids of updates whose title contains any of ``names``.
+
+    The FTS lookup is a superset filter (token and prefix based); candidates are
+    confirmed with a case-sensitive substring check, matching how
+    ``UpdateProcessor.extract_aws_product`` compares service names to titles.
+    """
+    names = [n for n in set(names) if n]
+    if not names:
+        return []
+
+    query = db.session.query(Update.id, Update.title)
+    if provider:
+        query = query.filter(Update.provider == provider)
+
+    if has_title_index():
+        phrases = [p for p in (_fts_phrase(n) for n in names) if p]
+        if not phrases:
+            return []
+        candidate_ids = db.session.execute(
+            text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :q"),
+            {'q': ' OR '.join(phrases)}
+        ).scalars().all()
+        if not candidate_ids:
+            return []
+        query = query.filter(Update.id.in_(candidate_ids))
+    else:
+        query = query.filter(db.or_(*[Update.title.contains(n, autoescape=True) for n in names]))
+
+    return sorted(update_id for update_id, title in query if any(n in title for n in names))
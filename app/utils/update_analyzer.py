@@ -2,55 +2,112 @@
 Utility functions for analyzing and processing updates.
 """
 from anthropic import Anthropic
+from collections import namedtuple
+import logging
 import os
 import re
-import spacy
+from flask import current_app, has_app_context
 
-# Load spaCy model - will be loaded on first use
-nlp = None
+logger = logging.getLogger(__name__)
 
-def load_nlp_model():
-    """
-    Load the spaCy NLP model lazily.
-    
-    Returns:
-        The loaded spaCy model
+# Sentence segmentation backends for paragraph detection: 'sentencizer' (spaCy's rule-based
+# splitter in a blank pipeline), 'regex' (no spaCy at all), or 'parser' (the full en_core_web_sm
+# pipeline, only when passed explicitly, e.g. `flask render_explanations --segmenter parser`)
+SEGMENTERS = ('sentencizer', 'regex', 'parser')
+CONFIGURABLE_SEGMENTERS = ('sentencizer', 'regex')  # Values SENTENCE_SEGMENTER may name
+DEFAULT_SEGMENTER = 'sentencizer'
+_pipelines = {}  # segmenter name -> loaded pipeline, per process
+
+# Bump when the HTML produced by format_explanation_text changes; `flask render_explanations`
+# re-renders stored explanations formatted by an older version (or by another segmenter)
+FORMATTER_VERSION = 2
+
+# Components of en_core_web_sm paragraph detection does not use (sentences come from the parser)
+UNUSED_PIPES = ('tagger', 'attribute_ruler', 'lemmatizer', 'ner')
+
+# Sentence ends (., ! or ?, with closing quotes or brackets) followed by whitespace, and blank lines
+_SENTENCE_BREAK = re.compile(r'([.!?][\'")\]]*)\s+|\n\s*\n')
+_ABBREVIATIONS = ('e.g.', 'i.e.', 'etc.', 'vs.', 'approx.')
+_Sentence = namedtuple('_Sentence', 'text start_char end_char')
+_Doc = namedtuple('_Doc', 'text sents')
+
+class RegexSegmenter:
+    """Splits text into sentences with a regular expression; a drop-in for a spaCy pipeline here."""
+    pipe_names = ()
+
+    def __call__(self, text):
+        sents, start = [], 0
+        for match in _SENTENCE_BREAK.finditer(text):
+            end = match.end(1) if match.group(1) else match.start()
+            if match.group(1) and text[start:end].lower().endswith(_ABBREVIATIONS):
+                continue
+            if text[start:end].strip():
+                sents.append(_Sentence(text[start:end], start, end))
+            start = match.end()
+        if text[start:].strip():
+            sents.append(_Sentence(text[start:], start, len(text)))
+        return _Doc(text, sents)
+
+    def pipe(self, texts, batch_size=None):
+        return (self(text) for text in texts)
+
+def configured_segmenter():
+    """The segmenter named by ``SENTENCE_SEGMENTER``, never the full parser.
+
+    Config reaches web workers and their background threads, which must not load
+    en_core_web_sm; the parser is only used when a command is given it explicitly.
     """
-    global nlp
-    if nlp is None:
-        try:
-            nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            # If model is not available, download it
-            import subprocess
-            subprocess.run(["python", "-m", "spacy", "download", "en_core_web_sm"], check=True)
-            nlp = spacy.load("en_core_web_sm")
-    return nlp
-
-def format_explanation_text(text):
+    name = current_app.config.get('SENTENCE_SEGMENTER', DEFAULT_SEGMENTER) if has_app_context() else DEFAULT_SEGMENTER
+    if name == 'parser':
+        logger.warning("SENTENCE_SEGMENTER=parser is ignored (pass --segmenter parser to "
+                       "`flask render_explanations`), using %s", DEFAULT_SEGMENTER)
+        return DEFAULT_SEGMENTER
+    if name not in CONFIGURABLE_SEGMENTERS:
+        raise ValueError(f"Unknown SENTENCE_SEGMENTER {name!r}, expected one of {', '.join(CONFIGURABLE_SEGMENTERS)}")
+    return name
+
+def _load_pipeline(segmenter):
+    if segmenter == 'regex':
+        return RegexSegmenter()
+    # Imported here so workers using the regex segmenter never load spaCy
+    import spacy
+    from spacy.pipeline import Sentencizer
+    if segmenter == 'sentencizer':
+        model = spacy.blank('en')
+        # Blank lines end a sentence too, so headings without punctuation start their own paragraph
+        model.add_pipe('sentencizer', config={'punct_chars': Sentencizer.default_punct_chars + ['\n\n']})
+        return model
+    try:
+        return spacy.load("en_core_web_sm", exclude=UNUSED_PIPES)
+    except OSError:
+        # If model is not available, download it
+        import subprocess
+        subprocess.run(["python", "-m", "spacy", "download", "en_core_web_sm"], check=True)
+        return spacy.load("en_core_web_sm", exclude=UNUSED_PIPES)
+
+def load_nlp_model(segmenter=None):
     """
-    Format explanation text into paragraphs using spaCy NLP for better paragraph detection.
+    Load the sentence segmentation pipeline lazily.
     
     Args:
-        text (str): The raw explanation text
+        segmenter (str): One of SEGMENTERS (default: the configured one)
     
     Returns:
-        str: HTML-formatted text with proper paragraph tags
+        The loaded pipeline (a spaCy Language or a RegexSegmenter)
     """
-    if not text:
-        return ""
-    
-    # First handle basic formatting with standard line breaks
-    # This helps with simple cases and preserves existing formatting
-    basic_formatted = text.replace('\r\n\r\n', '\n\n')
-    basic_formatted = basic_formatted.replace('\r\n', '\n')
-    
-    # Initialize spaCy if not already loaded
-    model = load_nlp_model()
-    
-    # Process the text with spaCy
-    doc = model(basic_formatted)
-    
+    segmenter = segmenter or configured_segmenter()
+    if segmenter not in SEGMENTERS:
+        raise ValueError(f"Unknown segmenter {segmenter!r}, expected one of {', '.join(SEGMENTERS)}")
+    if segmenter not in _pipelines:
+        _pipelines[segmenter] = _load_pipeline(segmenter)
+        logger.info('nlp.load', extra={'fields': {'segmenter': segmenter}})
+    return _pipelines[segmenter]
+
+def _normalize_newlines(text):
+    return text.replace('\r\n\r\n', '\n\n').replace('\r\n', '\n')
+
+def _paragraphs_html(text, doc):
+    """HTML paragraphs for ``text`` from its parsed ``doc``."""
     # Break into paragraphs - a sentence that starts after a newline 
     # or a sentence that follows another sentence with high likelihood of being
     # in a new paragraph (based on content and structure)
@@ -66,8 +123,9 @@ def format_explanation_text(text):
         # Check if this sentence starts a new paragraph based on various heuristics
         starts_new_para = False
         
-        # 1. Explicit newline before sentence
-        if '\n\n' in doc.text[prev_sent_end:sent.start_char]:
+        # 1. Explicit newline before sentence (segmenters may keep it inside either sentence)
+        sent_start = sent.start_char + len(sent.text) - len(sent.text.lstrip())
+        if '\n\n' in doc.text[prev_sent_end:sent_start]:
             starts_new_para = True
         
         # 2. First sentence or follows a sentence ending with a common paragraph terminator
@@ -89,7 +147,7 @@ def format_explanation_text(text):
             # Add to current paragraph
             current_para.append(sent_text)
             
-        prev_sent_end = sent.end_char
+        prev_sent_end = sent_start + len(sent_text)
     
     # Add the last paragraph
     if current_para:
@@ -106,6 +164,104 @@ def format_explanation_text(text):
         
     return html
 
+def format_explanation_text(text, segmenter=None):
+    """
+    Format explanation text into paragraphs using spaCy NLP for better paragraph detection.
+    
+    Args:
+        text (str): The raw explanation text
+        segmenter (str): Sentence segmentation backend (default: SENTENCE_SEGMENTER)
+    
+    Returns:
+        str: HTML-formatted text with proper paragraph tags
+    """
+    if not text:
+        return ""
+    
+    # Normalize line breaks first so explicit paragraph breaks are recognized
+    model = load_nlp_model(segmenter)
+    return _paragraphs_html(text, model(_normalize_newlines(text)))
+
+def format_explanations(texts, batch_size=64, segmenter=None):
+    """
+    Format many explanations like ``format_explanation_text`` with one ``nlp.pipe`` pass.
+    
+    Args:
+        texts (list): Raw explanation texts
+        batch_size (int): Texts spaCy processes per batch
+        segmenter (str): Sentence segmentation backend (default: SENTENCE_SEGMENTER)
+    
+    Returns:
+        list: HTML for each text, in order
+    """
+    model = load_nlp_model(segmenter)
+    docs = model.pipe((_normalize_newlines(text) for text in texts if text), batch_size=batch_size)
+    return [_paragraphs_html(text, next(docs)) if text else "" for text in texts]
+
+def basic_explanation_html(text):
+    """Line-break formatting for explanations that already contain HTML or have not been rendered yet."""
+    if not text:
+        return ""
+    # Replace double line breaks with paragraph tags
+    html = '<p>' + text.replace('\r\n\r\n', '</p><p>') + '</p>'
+    # Replace single line breaks with <br> tags
+    html = html.replace('\r\n', '<br>')
+    # Handle the case where we might have \n\n instead of \r\n\r\n
+    return html.replace('<p><br></p>', '<p>')
+
+def render_explanation(text, formatted=None):
+    """HTML shown for an explanation: ``formatted`` (spaCy paragraphs, computed if not given), or the
+    basic formatting when the text already has HTML or spaCy fails."""
+    if not text:
+        return ""
+    if '<p>' in text:
+        return basic_explanation_html(text)
+    try:
+        return formatted if formatted is not None else format_explanation_text(text)
+    except Exception as e:
+        logger.warning("SpaCy formatting failed, using basic formatting: %s", e)
+        return basic_explanation_html(text)
+
+def render_explanations_html(texts, batch_size=64, segmenter=None):
+    """``render_explanation`` for many texts, formatting the plain ones in one ``pipe`` pass."""
+    plain = [text for text in texts if text and '<p>' not in text]
+    try:
+        formatted = dict(zip(plain, format_explanations(plain, batch_size=batch_size, segmenter=segmenter)))
+    except Exception as e:
+        logger.warning("SpaCy formatting failed, using basic formatting: %s", e)
+        formatted = {}
+    return [formatted.get(text) or basic_explanation_html(text) for text in texts]
+
+def set_explanation(update, text):
+    """Store ``text`` as ``update``'s explanation together with its rendered HTML."""
+    update.explanation = text
+    update.explanation_html = render_explanation(text) or None
+    update.explanation_format_version = FORMATTER_VERSION
+    update.explanation_segmenter = configured_segmenter()
+
+# Model and response size of generated explanations
+EXPLANATION_MODEL = "claude-3-5-sonnet-20240620"
+EXPLANATION_MAX_TOKENS = 1000
+
+def explanation_prompt(title):
+    """The prompt asking Claude to explain the update titled ``title``."""
+    return f"provide brief explanation for '{title}' ignore keywords like \"in preview\" or \"launched\" or \"retired\" or \"in development\" from title for generating description. Don't mention status like \"Public Preview\" or \"Private Preview\" or \"Generally Available\"."
+
+def explanation_request(title):
+    """Parameters of the Messages API request explaining ``title``."""
+    return {'model': EXPLANATION_MODEL, 'max_tokens': EXPLANATION_MAX_TOKENS,
+            'messages': [{"role": "user", "content": explanation_prompt(title)}]}
+
+def message_text(message):
+    """The text of a Messages API response, stripped."""
+    explanation = ""
+    for content in message.content:
+        if hasattr(content, 'text'):
+            explanation += content.text
+        elif isinstance(content, str):
+            explanation += content
+    return explanation.strip()
+
 def generate_explanation(title: str) -> str:
     """
     Generate an explanation for a cloud service update using Claude.
@@ -125,19 +281,4 @@ def generate_explanation(title: str) -> str:
         raise Exception('ANTHROPIC_API_KEY environment variable not set')
         
     client = Anthropic(api_key=api_key)
-    prompt = f"provide brief explanation for '{title}' ignore keywords like \"in preview\" or \"launched\" or \"retired\" or \"in development\" from title for generating description. Don't mention status like \"Public Preview\" or \"Private Preview\" or \"Generally Available\"."
-    
-    message = client.messages.create(
-        model="claude-3-5-sonnet-20240620",
-        max_tokens=1000,
-        messages=[{"role": "user", "content": prompt}]
-    )
-    
-    explanation = ""
-    for content in message.content:
-        if hasattr(content, 'text'):
-            explanation += content.text
-        elif isinstance(content, str):
-            explanation += content
-            
-    return explanation.strip()
\ No newline at end of file
+    return message_text(client.messages.create(**explanation_request(title)))
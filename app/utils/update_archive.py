@@ -0,0 +1,195 @@
+"""
+Cold-storage archive for updates past the retention window.
+
+``archive_expired_updates`` moves updates older than ``UPDATE_RETENTION_DAYS``
+out of the hot ``update`` table, in committed chunks, into a separate archive
+database (``UPDATE_ARCHIVE_URI``, by default ``instance/update_archive.db``).
+The archive holds the same ``update`` table (with its own ids), so queries
+written against the hot table run unchanged against it::
+
+    with archive_session() as archive:
+        archive.scalars(select(Update).where(Update.provider == 'aws'))
+
+Each chunk is written to the archive before it is deleted from the hot table,
+and archiving a row again replaces its archived copy, so an interrupted run is
+finished by running it again. An archived update that is scraped into the hot
+table again is deleted from the archive when that insert commits.
+"""
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from flask import current_app
+from sqlalchemy import MetaData, create_engine, event, func, select, text, tuple_
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, undefer
+from app import db
+from app.models import Update
+from app.utils.clean_updates import retention_cutoff
+from app.utils.db_engine import DEFAULT_SQLITE_PRAGMAS, sqlite_pragma_listener
+from app.utils.pagination import clear_count_cache
+from app.utils.update_tags import delete_updates
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_ENGINE = 'update_archive_engine'
+_DEFAULT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'instance', 'update_archive.db'))
+_engine_lock = threading.Lock()
+_TAKEN_BACK = 'archived_copies_taken_back'  # session.info key of archived ids to delete on commit
+
+# The archive's copy of the ``update`` table (without the tag tables it does not need)
+ARCHIVE_TABLE = Update.__table__.to_metadata(MetaData())
+
+def _archive_uri():
+    return current_app.config.get('UPDATE_ARCHIVE_URI') or f'sqlite:///{_DEFAULT_PATH}'
+
+def _sqlite_file(uri):
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:'):
+        return url.database
+    return None
+
+def archive_exists():
+    """Whether an archive has been created (or is a server database that may hold one)."""
+    if ARCHIVE_ENGINE in current_app.extensions:
+        return True
+    path = _sqlite_file(_archive_uri())
+    return path is None or os.path.exists(path)
+
+def get_archive_engine():
+    """The app's archive engine, creating the archive database on first use."""
+    engine = current_app.extensions.get(ARCHIVE_ENGINE)
+    if engine is not None:
+        return engine
+    with _engine_lock:
+        engine = current_app.extensions.get(ARCHIVE_ENGINE)
+        if engine is None:
+            uri = _archive_uri()
+            path = _sqlite_file(uri)
+            if path:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            engine = create_engine(uri)
+            if engine.dialect.name == 'sqlite':
+                pragmas = current_app.config.get('SQLITE_PRAGMAS', DEFAULT_SQLITE_PRAGMAS)
+                event.listen(engine, 'connect', sqlite_pragma_listener(pragmas))
+            ARCHIVE_TABLE.metadata.create_all(engine)
+            if engine.dialect.name == 'postgresql':
+                # Archives written with the hot ids never advanced the id sequence; start past them
+                with engine.begin() as connection:
+                    connection.execute(text("SELECT setval(pg_get_serial_sequence('\"update\"', 'id'), "
+                                            "coalesce(max(id), 0) + 1, false) FROM \"update\""))
+            current_app.extensions[ARCHIVE_ENGINE] = engine
+    return engine
+
+@contextmanager
+def archive_session():
+    """Read-only ORM session on the archive database."""
+    session = Session(get_archive_engine())
+    try:
+        yield session
+    finally:
+        session.close()
+
+@contextmanager
+def update_sources(include_archive=False):
+    """Sessions to read updates from: the hot database, plus the archive if requested and present."""
+    if not (include_archive and archive_exists()):
+        yield [db.session]
+        return
+    with archive_session() as archive:
+        yield [db.session, archive]
+
+def archived_updates(*criteria):
+    """Archived updates matching ``criteria``, fully loaded and detached, oldest first."""
+    if not archive_exists():
+        return []
+    with archive_session() as archive:
+        return archive.scalars(
+            select(Update).options(undefer(Update.description), undefer(Update.explanation))
+            .where(*criteria).order_by(Update.published_date, Update.id)
+        ).all()
+
+def archived_count():
+    """Number of archived updates."""
+    if not archive_exists():
+        return 0
+    with archive_session() as archive:
+        return archive.scalar(select(func.count(Update.id)))
+
+def _write_chunk(connection, rows):
+    """Replace any archived copies of ``rows`` (by unique key) and insert them under new archive ids.
+
+    Hot ids are not kept: SQLite reuses them after deletes, so they may name another archived update.
+    """
+    table = ARCHIVE_TABLE
+    keys = [(row['provider'], row['title'], row['published_date']) for row in rows]
+    connection.execute(table.delete().where(
+        tuple_(table.c.provider, table.c.title, table.c.published_date).in_(keys)))
+    connection.execute(table.insert(), [{name: value for name, value in row.items() if name != 'id'}
+                                        for row in rows])
+
+def take_back_archived_copies(session, updates):
+    """Rollup keys of the archived copies of ``updates``, new rows being flushed by ``session``.
+
+    An update is archived again under the same provider, title and published date,
+    so the copies are deleted from the archive once ``session`` commits, leaving
+    the new rows as the only (and only counted) copies.
+    """
+    if not archive_exists():
+        return []
+    from app.utils.insights import rollup_keys
+    table = ARCHIVE_TABLE
+    keys = [(update.provider, update.title, update.published_date) for update in updates]
+    with get_archive_engine().connect() as connection:
+        rows = connection.execute(
+            select(table.c.id, table.c.provider, table.c.published_date, table.c.product_name, table.c.categories)
+            .where(tuple_(table.c.provider, table.c.title, table.c.published_date).in_(keys))
+        ).all()
+    if rows:
+        session.info.setdefault(_TAKEN_BACK, set()).update(row[0] for row in rows)
+    return [key for row in rows for key in rollup_keys(*row[1:])]
+
+@event.listens_for(Session, 'after_commit')
+def _delete_taken_back_copies(session):
+    ids = session.info.pop(_TAKEN_BACK, None)
+    if ids:
+        with get_archive_engine().begin() as connection:
+            connection.execute(ARCHIVE_TABLE.delete().where(ARCHIVE_TABLE.c.id.in_(list(ids))))
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_taken_back_copies(session):
+    session.info.pop(_TAKEN_BACK, None)
+
+def archive_expired_updates(retention_days=None, chunk_size=None):
+    """Move updates older than ``retention_days`` (default ``UPDATE_RETENTION_DAYS``) to the archive.
+
+    Returns the number of updates archived.
+    """
+    chunk_size = chunk_size or current_app.config.get('CLEANUP_CHUNK_SIZE', 500)
+    cutoff = retention_cutoff(retention_days)
+    engine = get_archive_engine()
+    table = Update.__table__
+
+    archived = 0
+    try:
+        while True:
+            rows = [dict(row) for row in db.session.execute(
+                select(table).where(table.c.published_date < cutoff).order_by(table.c.id).limit(chunk_size)
+            ).mappings()]
+            if not rows:
+                break
+            with engine.begin() as connection:
+                _write_chunk(connection, rows)
+            # Archived updates stay counted in the insight rollups
+            archived += delete_updates(db.session.connection(), {row['id']: row['provider'] for row in rows},
+                                       keep_rollups=True)
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        if archived:
+            clear_count_cache()
+
+    logger.info('archive.updates', extra={'fields': {'archived': archived, 'cutoff': cutoff.isoformat()}})
+    return archived
@@ -1,17 +1,20 @@
 """Update processor module for cloud updates."""
 import re
 import json
+import logging
 import os
 from datetime import datetime
 from app.scraper.aws_services import AWSServicesFetcher
 
+logger = logging.getLogger(__name__)
+
 class UpdateProcessor:
     """Process cloud updates to extract metadata."""
     
-    def __init__(self):
-        # Use the existing AWSServicesFetcher to get services
+    def __init__(self, services=None):
+        # Use the existing AWSServicesFetcher to get services unless a catalog is given
         self.aws_services_fetcher = AWSServicesFetcher()
-        self.aws_services = self.aws_services_fetcher.get_services()
+        self.aws_services = services if services is not None else self.aws_services_fetcher.get_services()
         # Sort by length for better matching (longer names first)
         self.aws_services = sorted(self.aws_services, key=len, reverse=True)
         
@@ -111,19 +114,14 @@ class UpdateProcessor:
         categories = entry.get('categories', [])
         status_tags = []
         
-        # Debug
-        print(f"Extracting status from categories: {categories}")
-        print(f"Status tags to look for: {self.azure_status_tags}")
-        
         for category in categories:
             category = category.strip()
             if category in self.azure_status_tags:
                 status_tags.append(category)
-                print(f"Found status tag: {category}")
         
         # If no status tags found, default to 'Launched'
         if not status_tags:
-            print("No status tags found, defaulting to 'Launched'")
+            logger.debug("No status tags in %s, defaulting to 'Launched'", categories)
             status_tags = ['Launched']
             
         return list(set(status_tags))
@@ -133,19 +131,14 @@ class UpdateProcessor:
         categories = entry.get('categories', [])
         update_types = []
         
-        # Debug
-        print(f"Extracting update types from categories: {categories}")
-        print(f"Update types to look for: {self.azure_update_types}")
-        
         for category in categories:
             category = category.strip()
             if category in self.azure_update_types:
                 update_types.append(category)
-                print(f"Found update type: {category}")
                 
         # If no update types found, default to 'Features'
         if not update_types:
-            print("No update types found, defaulting to 'Features'")
+            logger.debug("No update types in %s, defaulting to 'Features'", categories)
             update_types = ['Features']
             
         return list(set(update_types))
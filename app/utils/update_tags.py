@@ -0,0 +1,188 @@
+"""
+Normalized product/type/status tags for updates.
+
+``Update`` keeps its tags as JSON text for display, which can only be filtered
+with leading-wildcard ``LIKE`` scans. The ``update_*_tags`` association tables
+hold the same values one row per (update, tag) so filters become index
+lookups. They are maintained from ORM flushes (inserts, attribute changes,
+deletes and bulk query deletes) and can be rebuilt from the JSON columns with
+``backfill_update_tags``. Every tag row added or removed is also applied to the
+facet counts in ``app.utils.facets``.
+"""
+import json
+import logging
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Update, UPDATE_TAG_TABLES as TAG_TABLES
+from app.utils.facets import apply_facet_delta, rebuild_facet_counts
+from app.utils.insights import apply_rollup_delta, removed_rollup_keys
+from app.utils.data_version import mark_data_changed
+
+logger = logging.getLogger(__name__)
+
+# Update attributes the tags (and their facet counts) are derived from
+_SOURCE_ATTRS = ('provider', 'product_name', '_product_names', '_update_types', '_status')
+
+def _json_list(raw):
+    if not raw:
+        return []
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        return []
+    return value if isinstance(value, list) else []
+
+def _clean(names):
+    return {name.strip() for name in names if isinstance(name, str) and name.strip()}
+
+def tags_from_columns(product_name, product_names, update_types, status):
+    """Tags per kind from the stored column values (JSON text for the lists)."""
+    products = _clean(_json_list(product_names))
+    if not products and product_name:
+        # AWS updates only have the single product_name column
+        products = _clean([product_name])
+    return {
+        'product': products,
+        'type': _clean(_json_list(update_types)),
+        'status': _clean(_json_list(status))
+    }
+
+def _tags_for(update):
+    return tags_from_columns(update.product_name, update._product_names, update._update_types, update._status)
+
+def _old_provider(update):
+    """Provider the stored tags were counted under, before any pending change."""
+    history = inspect(update).attrs.provider.history
+    return history.deleted[0] if history.deleted else update.provider
+
+def _remove_tags(connection, providers):
+    """Delete the tag rows of the given update ids, returning them as (provider, kind, name)."""
+    removed = []
+    ids = list(providers)
+    for kind, table in TAG_TABLES.items():
+        rows = connection.execute(select(table.c.update_id, table.c.name).where(table.c.update_id.in_(ids)))
+        removed.extend((providers[update_id], kind, name) for update_id, name in rows)
+        connection.execute(table.delete().where(table.c.update_id.in_(ids)))
+    return removed
+
+def _insert_tags(connection, updates):
+    """Insert tag rows for ``updates``, returning them as (provider, kind, name)."""
+    added = []
+    for kind, table in TAG_TABLES.items():
+        rows = []
+        for update in updates:
+            for name in sorted(_tags_for(update)[kind]):
+                rows.append({'update_id': update.id, 'name': name})
+                added.append((update.provider, kind, name))
+        if rows:
+            connection.execute(table.insert(), rows)
+    return added
+
+def _tags_changed(update):
+    state = inspect(update)
+    return any(state.attrs[attr].history.has_changes() for attr in _SOURCE_ATTRS)
+
+@event.listens_for(Session, 'before_flush')
+def _remove_tags_of_deleted(session, flush_context, instances):
+    """Drop the tags of updates about to be deleted while their rows still exist.
+
+    Databases enforcing the ``ON DELETE CASCADE`` foreign key (PostgreSQL)
+    would otherwise remove them before ``after_flush`` could count them.
+    """
+    deleted = [obj for obj in session.deleted if isinstance(obj, Update)]
+    if deleted:
+        with session.no_autoflush:
+            providers = {obj.id: _old_provider(obj) for obj in deleted}
+            session.info['removed_update_tags'] = _remove_tags(session.connection(), providers)
+
+@event.listens_for(Session, 'after_flush')
+def _sync_tags_after_flush(session, flush_context):
+    new = [obj for obj in session.new if isinstance(obj, Update)]
+    dirty = [obj for obj in session.dirty if isinstance(obj, Update) and _tags_changed(obj)]
+    removed = session.info.pop('removed_update_tags', None) or []
+    if not (new or dirty or removed):
+        return
+
+    connection = session.connection()
+    if dirty:
+        removed = removed + _remove_tags(connection, {obj.id: _old_provider(obj) for obj in dirty})
+    added = _insert_tags(connection, new + dirty)
+    apply_facet_delta(connection, added, removed)
+
+@event.listens_for(Session, 'after_bulk_delete')
+def _sync_tags_after_bulk_delete(delete_context):
+    """``Query.delete()`` bypasses the flush, so drop orphaned tags and recount facets."""
+    if delete_context.mapper.class_ is not Update:
+        return
+    connection = delete_context.session.connection()
+    for table in TAG_TABLES.values():
+        connection.execute(table.delete().where(table.c.update_id.not_in(select(Update.id))))
+    rebuild_facet_counts(connection)
+
+def delete_updates(connection, providers, keep_rollups=False):
+    """Delete the updates ``{id: provider}`` with a plain DELETE, dropping their tags
+    and adjusting facet counts and (unless ``keep_rollups``, as when archiving)
+    the insight rollups. Returns the number of updates deleted.
+
+    For set-based jobs that must not load rows; Core statements bypass the ORM
+    listeners above.
+    """
+    if not providers:
+        return 0
+    removed = _remove_tags(connection, providers)
+    rollups = [] if keep_rollups else removed_rollup_keys(connection, providers)
+    result = connection.execute(Update.__table__.delete().where(Update.id.in_(list(providers))))
+    apply_facet_delta(connection, [], removed)
+    apply_rollup_delta(connection, [], rollups)
+    mark_data_changed()
+    return result.rowcount
+
+def tagged_update_ids(kind, names):
+    """Subquery of ids of updates carrying any of ``names`` as a ``kind`` tag."""
+    table = TAG_TABLES[kind]
+    return select(table.c.update_id).where(table.c.name.in_(list(names)))
+
+def backfill_update_tags(chunk_size=1000):
+    """Rebuild all tag tables (and facet counts) from the JSON columns. Returns the number of updates indexed."""
+    for table in TAG_TABLES.values():
+        db.session.execute(table.delete())
+
+    count = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Update.id, Update.product_name, Update._product_names, Update._update_types, Update._status)
+            .where(Update.id > last_id)
+            .order_by(Update.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+
+        batches = {kind: [] for kind in TAG_TABLES}
+        for update_id, product_name, product_names, update_types, status in rows:
+            for kind, names in tags_from_columns(product_name, product_names, update_types, status).items():
+                batches[kind].extend({'update_id': update_id, 'name': name} for name in sorted(names))
+        for kind, batch in batches.items():
+            if batch:
+                db.session.execute(TAG_TABLES[kind].insert(), batch)
+
+        count += len(rows)
+        last_id = rows[-1][0]
+
+    rebuild_facet_counts()
+    mark_data_changed()
+    db.session.commit()
+    logger.info("Backfilled tags for %d updates", count)
+    return count
+
+def ensure_update_tags():
+    """Backfill the tag tables if they are empty but updates exist (e.g. right after upgrading)."""
+    has_updates = db.session.execute(select(Update.id).limit(1)).first() is not None
+    has_tags = any(db.session.execute(select(table.c.update_id).limit(1)).first() is not None
+                   for table in TAG_TABLES.values())
+    if has_updates and not has_tags:
+        backfill_update_tags()
+        return True
+    return False
@@ -0,0 +1,104 @@
+"""
+Benchmark for weekly insight generation.
+
+Compares, on a SQLite file holding several years of updates:
+
+* the previous week-by-week regeneration (two queries per week, counting in
+  Python) with ``rebuild_rollups`` (two grouped queries and one bulk insert),
+  which is now only needed for repairs, and
+* reading the insights page data from the maintained rollups.
+
+Usage:
+    python -m benchmarks.bench_insights [--years 3] [--per-week 60]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from flask import Flask
+from sqlalchemy import func, insert
+from app import db
+from app.models import Update, WeeklyInsight
+from app.utils.insights import IGNORED_CATEGORIES, all_time_insight, insight_for_week, rebuild_rollups, weekly_insights, week_start
+
+def seed(years, per_week, now):
+    rows = []
+    start = now - timedelta(days=365 * years)
+    for i in range(years * 52 * per_week):
+        published = start + timedelta(minutes=i * 7 * 24 * 60 // per_week)
+        provider = 'aws' if i % 2 else 'azure'
+        rows.append({'provider': provider, 'title': f'Update {i}', 'url': 'https://example.test',
+                     'published_date': published, 'created_at': now,
+                     'product_name': f'AWS Service {i % 80}' if provider == 'aws' else None,
+                     'categories': json.dumps([f'Category {i % 30}', 'Launched'] if provider == 'azure' else []),
+                     'update_types': '[]', 'status': '[]', 'product_names': '[]'})
+    db.session.execute(insert(Update.__table__), rows)
+    db.session.commit()
+    return len(rows)
+
+def legacy_rebuild(now):
+    """The previous implementation: one pass per week over hydrated columns."""
+    WeeklyInsight.query.delete()
+    earliest = db.session.query(func.min(Update.published_date)).scalar()
+    current, end = week_start(earliest), week_start(now) + timedelta(days=7)
+    while current < end:
+        week_end = current + timedelta(days=7)
+        in_week = (Update.published_date >= current, Update.published_date < week_end)
+        products = [name for (name,) in db.session.query(Update.product_name).filter(Update.provider == 'aws', *in_week)]
+        category_lists = [json.loads(raw or '[]') for (raw,) in
+                          db.session.query(Update._categories).filter(Update.provider == 'azure', *in_week)]
+        if products or category_lists:
+            categories = Counter(c for names in category_lists for c in names if c not in IGNORED_CATEGORIES)
+            db.session.add(WeeklyInsight(week_start=current, week_end=week_end, aws_updates=len(products),
+                                         azure_updates=len(category_lists),
+                                         aws_top_products=Counter(filter(None, products)).most_common(5),
+                                         azure_top_categories=categories.most_common(5)))
+        current = week_end
+    db.session.commit()
+
+def timed(function, *args):
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--per-week', type=int, default=60)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask('app')
+        app.config.update({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(tmp, "bench.db")}'})
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            now = datetime.utcnow()
+            rows = seed(args.years, args.per_week, now)
+
+            def grouped():
+                rebuild_rollups()
+                db.session.commit()
+
+            def read():
+                weekly = weekly_insights(now=now)
+                all_time_insight(now=now)
+                insight_for_week(weekly[0].week_start)
+
+            legacy, single_pass = timed(legacy_rebuild, now), timed(grouped)
+            reads = timed(read)
+            weeks = WeeklyInsight.query.filter_by(is_cumulative=False).count()
+            db.session.remove()
+            db.drop_all()
+
+    print(f"{'operation':<16} {'seconds':>9}")
+    print(f"{'week-by-week':<16} {legacy:>9.3f}")
+    print(f"{'grouped':<16} {single_pass:>9.3f}")
+    print(f"{'rollup read':<16} {reads:>9.3f}")
+    print(f"({rows} updates over {weeks} weeks; {legacy / single_pass:.1f}x faster)")
+
+if __name__ == '__main__':
+    main()
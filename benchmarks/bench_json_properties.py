@@ -0,0 +1,131 @@
+"""
+Benchmark for the cached JSON list properties on ``Update``.
+
+Compares the previous properties (``json.loads`` on every access) with the
+cached ones on:
+
+* a 20-row ``/azure_updates`` page render (in-memory database), and
+* a full-table aggregation loop over ``categories``/``product_names``/``status``
+  like the insight and facet builders run, for a first and a repeated pass.
+
+Usage:
+    python -m benchmarks.bench_json_properties [--rows 20000] [--renders 200]
+"""
+import argparse
+import gc
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from flask import Flask
+from app import db
+from app.models import Update
+
+JSON_PROPERTIES = {'categories': '_categories', 'update_types': '_update_types',
+                   'status': '_status', 'product_names': '_product_names'}
+
+def legacy_property(attr):
+    return property(lambda self: json.loads(getattr(self, attr)))
+
+@contextmanager
+def legacy_properties():
+    """Temporarily swap in the decode-on-every-access properties."""
+    cached = {name: Update.__dict__[name] for name in JSON_PROPERTIES}
+    for name, attr in JSON_PROPERTIES.items():
+        setattr(Update, name, legacy_property(attr))
+    try:
+        yield
+    finally:
+        for name, prop in cached.items():
+            setattr(Update, name, prop)
+
+def make_update(i):
+    return Update(provider='azure', title=f'Azure update {i}', description='Description ' * 20,
+                  url='https://example.test', published_date=datetime(2025, 1, 1) + timedelta(hours=i),
+                  product_names=['Azure SQL Database', 'Azure Arc', f'Service {i % 40}'],
+                  update_types=['Features', 'Security'], status=['Launched'],
+                  categories=['Databases', 'Hybrid + multicloud', 'Launched', f'Category {i % 25}'])
+
+def bench_page(renders):
+    app = Flask('app')
+    app.config.update({'TESTING': True, 'SECRET_KEY': 'bench', 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    db.init_app(app)
+    from app.routes import init_routes
+    init_routes(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(make_update(i) for i in range(60))
+        db.session.commit()
+        client = app.test_client()
+
+        def run():
+            client.get('/azure_updates')
+            started = time.perf_counter()
+            for _ in range(renders):
+                assert client.get('/azure_updates').status_code == 200
+            return (time.perf_counter() - started) / renders
+
+        with legacy_properties():
+            legacy = run()
+        cached = run()
+        db.drop_all()
+    return legacy, cached
+
+def aggregate(updates):
+    counts = {}
+    for update in updates:
+        if update.categories:
+            for category in update.categories:
+                if category not in update.status:
+                    counts[category] = counts.get(category, 0) + 1
+        for product in update.product_names:
+            counts[product] = counts.get(product, 0) + 1
+    return counts
+
+def loaded_rows(rows):
+    """Updates holding only the raw column text, as when freshly loaded from the database."""
+    updates = []
+    for i in range(rows):
+        source = make_update(i)
+        update = Update(provider='azure', title=source.title, url=source.url, published_date=source.published_date)
+        for attr in JSON_PROPERTIES.values():
+            setattr(update, attr, getattr(source, attr))
+        updates.append(update)
+    return updates
+
+def bench_loop(rows):
+    """Time a first and a second aggregation pass over the same rows."""
+    # Build every row up front and collect before each pass so only the loop is timed
+    row_sets = {True: loaded_rows(rows), False: loaded_rows(rows)}
+    results = []
+    for legacy, updates in row_sets.items():
+        with legacy_properties() if legacy else nullcontext():
+            passes = []
+            for _ in range(2):
+                gc.collect()
+                started = time.perf_counter()
+                counts = aggregate(updates)
+                passes.append(time.perf_counter() - started)
+        results.append((passes, counts))
+    (legacy, expected), (cached, counts) = results
+    assert counts == expected
+    return legacy, cached
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--renders', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<28} {'legacy ms':>10} {'cached ms':>10} {'speedup':>8}")
+    legacy, cached = bench_page(args.renders)
+    print(f"{'20-row /azure_updates page':<28} {legacy * 1000:>10.2f} {cached * 1000:>10.2f} {legacy / cached:>7.2f}x")
+    legacy, cached = bench_loop(args.rows)
+    for number, label in enumerate(('first', 'second')):
+        name = f'insight loop, {label} pass'
+        print(f"{name:<28} {legacy[number] * 1000:>10.2f} {cached[number] * 1000:>10.2f} "
+              f"{legacy[number] / cached[number]:>7.2f}x")
+    print(f"({args.rows} rows; the first pass decodes every list once, later passes reuse them)")
+
+if __name__ == '__main__':
+    main()
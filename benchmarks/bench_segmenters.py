@@ -0,0 +1,113 @@
+"""
+Benchmark for the sentence segmentation backends of explanation formatting.
+
+Formats a corpus of explanation-like texts with each backend of
+``app.utils.update_analyzer`` (``SENTENCE_SEGMENTER``) and reports:
+
+* agreement: the share of texts whose paragraph HTML matches the reference
+  backend's (``parser`` when en_core_web_sm is installed, else ``sentencizer``),
+* latency per text, formatting one text per call and a batch through ``pipe``,
+* memory: the resident set a fresh worker process grows by to load the backend
+  and format one text.
+
+The parser is skipped rather than downloaded when en_core_web_sm is missing.
+
+Usage:
+    python -m benchmarks.bench_segmenters [--texts 500] [--batch-size 64]
+"""
+import argparse
+import importlib.util
+import multiprocessing
+import random
+import resource
+import sys
+import time
+from app.utils import update_analyzer
+from app.utils.update_analyzer import SEGMENTERS, format_explanation_text, format_explanations
+
+OPENERS = ['Amazon S3 now supports conditional writes for objects.',
+           'Azure Functions adds a Flex Consumption plan with faster scaling.',
+           'AWS Lambda increases the maximum memory of functions to 10 GB.',
+           'Azure SQL Database (preview) lets you run serverless v1.2 workloads.']
+SENTENCES = ['This helps teams avoid overwriting data written by other clients.',
+             'Additionally, pricing is unchanged and billed per request.',
+             'It works with existing SDKs, e.g. the AWS CLI and Boto3.',
+             'However, the feature is limited to a few regions for now.',
+             'Customers asked for it often; "finally," as one put it.',
+             'Is it generally available? Not yet!',
+             'Overall, it simplifies event-driven architectures.',
+             'You can enable it from the console, the API or infrastructure as code.']
+
+def corpus(count, seed=7):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        paragraphs = [' '.join([rng.choice(OPENERS)] + rng.sample(SENTENCES, rng.randint(1, 3)))]
+        for _ in range(rng.randint(0, 3)):
+            paragraphs.append(' '.join(rng.sample(SENTENCES, rng.randint(1, 3))))
+        if rng.random() < 0.3:
+            paragraphs.insert(0, 'Overview')
+        texts.append(rng.choice(['\n\n', '\r\n\r\n', ' ']).join(paragraphs))
+    return texts
+
+def available(segmenter):
+    return segmenter != 'parser' or importlib.util.find_spec('en_core_web_sm') is not None
+
+def _rss_kb():
+    try:
+        with open('/proc/self/status') as status:
+            return next(int(line.split()[1]) for line in status if line.startswith('VmRSS:'))
+    except OSError:
+        # Peak rather than current size (and inherited across exec on some systems)
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss // 1024 if sys.platform == 'darwin' else rss  # bytes on macOS, KB elsewhere
+
+def _load_in_worker(segmenter, text, results):
+    before = _rss_kb()
+    format_explanation_text(text, segmenter)
+    results.put((before, _rss_kb()))
+
+def worker_memory(segmenter, text):
+    """``(baseline, growth)`` in MB of a fresh process loading ``segmenter``."""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_load_in_worker, args=(segmenter, text, results))
+    process.start()
+    before, after = results.get()
+    process.join()
+    return before / 1024, (after - before) / 1024
+
+def timed(function):
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--texts', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=64)
+    args = parser.parse_args()
+
+    texts = corpus(args.texts)
+    segmenters = [name for name in SEGMENTERS if available(name)]
+    reference = 'parser' if 'parser' in segmenters else 'sentencizer'
+
+    outputs, results = {}, {}
+    for segmenter in segmenters:
+        update_analyzer.load_nlp_model(segmenter)  # load outside the timings
+        single = timed(lambda: [format_explanation_text(text, segmenter) for text in texts])
+        batched = timed(lambda: outputs.__setitem__(
+            segmenter, format_explanations(texts, batch_size=args.batch_size, segmenter=segmenter)))
+        results[segmenter] = (single / len(texts), batched / len(texts), *worker_memory(segmenter, texts[0]))
+
+    print(f"{'segmenter':<12} {'agree':>7} {'ms/call':>8} {'ms/text (pipe)':>15} {'worker MB':>10} {'+load MB':>9}")
+    for segmenter, (single, batched, baseline, growth) in results.items():
+        agree = sum(a == b for a, b in zip(outputs[segmenter], outputs[reference])) / len(texts)
+        print(f"{segmenter:<12} {agree:>7.1%} {single * 1000:>8.3f} {batched * 1000:>15.3f} "
+              f"{baseline + growth:>10.1f} {growth:>9.1f}")
+    skipped = [name for name in SEGMENTERS if name not in segmenters]
+    print(f"({len(texts)} texts; agreement with {reference}"
+          + (f"; skipped {', '.join(skipped)}: en_core_web_sm is not installed)" if skipped else ")"))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Reader latency during a bulk ingest, with and without the SQLite tuning.
+
+The writer inserts updates in committed batches (as a scrape or replay
+does) while reader processes run the listing query. The ``default`` run uses
+plain connections (rollback journal, ``synchronous=FULL``); the ``tuned``
+run applies ``DEFAULT_SQLITE_PRAGMAS`` and reads through ``query_only``
+connections, as the app's read-only engine does.
+
+Usage:
+    python -m benchmarks.bench_sqlite_concurrency [--rows 50000] [--batch 500] [--readers 4]
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, insert, select
+from app.models import Update
+from app.utils.db_engine import DEFAULT_SQLITE_PRAGMAS, sqlite_pragma_listener
+
+UPDATES = Update.__table__
+
+def make_engine(path, pragmas=None, read_only=False):
+    engine = create_engine(f'sqlite:///{path}')
+    if pragmas is not None:
+        event.listen(engine, 'connect', sqlite_pragma_listener(pragmas, read_only=read_only))
+    return engine
+
+def batches(rows, batch):
+    start = datetime(2024, 1, 1)
+    for offset in range(0, rows, batch):
+        yield [{'provider': 'aws' if i % 2 else 'azure', 'title': f'Update {i}', 'url': f'https://example.test/{i}',
+                'description': 'x' * 400, 'published_date': start + timedelta(minutes=i)}
+               for i in range(offset, min(offset + batch, rows))]
+
+def listing_query():
+    return select(UPDATES.c.id, UPDATES.c.title, UPDATES.c.published_date) \
+        .where(UPDATES.c.provider == 'aws') \
+        .order_by(UPDATES.c.published_date.desc(), UPDATES.c.id.desc()).limit(20)
+
+def read_loop(path, pragmas, ingesting, done, results):
+    """Reader process: run the listing query while the ingest runs, then report latencies."""
+    reader = make_engine(path, pragmas, read_only=True)
+    query = listing_query()
+    latencies, errors = [], 0
+    ingesting.wait()
+    with reader.connect() as conn:
+        while not done.is_set():
+            started = time.perf_counter()
+            try:
+                conn.execute(query).all()
+                conn.rollback()
+            except Exception:
+                errors += 1
+                conn.rollback()
+                continue
+            latencies.append(time.perf_counter() - started)
+    results.put((latencies, errors))
+
+def run(name, rows, batch, readers, pragmas):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        writer = make_engine(path, pragmas)
+        UPDATES.metadata.create_all(writer, tables=[UPDATES])
+
+        # Separate processes, like gunicorn workers, so readers do not share the writer's GIL
+        ingesting, done = multiprocessing.Event(), multiprocessing.Event()
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=read_loop, args=(path, pragmas, ingesting, done, results))
+                     for _ in range(readers)]
+        for process in processes:
+            process.start()
+
+        ingesting.set()
+        started = time.perf_counter()
+        with writer.connect() as conn:
+            for chunk in batches(rows, batch):
+                conn.execute(insert(UPDATES), chunk)
+                conn.commit()
+        elapsed = time.perf_counter() - started
+
+        done.set()
+        latencies, errors = [], 0
+        for _ in processes:
+            process_latencies, process_errors = results.get()
+            latencies.extend(process_latencies)
+            errors += process_errors
+        for process in processes:
+            process.join()
+        writer.dispose()
+
+    ms = sorted(value * 1000 for value in latencies) or [0.0]
+    pct = lambda p: ms[min(len(ms) - 1, int(len(ms) * p))]
+    print(f"{name:<8} {rows / elapsed:>10.0f} {len(ms):>8} {statistics.median(ms):>8.2f} {pct(0.95):>8.2f} "
+          f"{pct(0.99):>8.2f} {ms[-1]:>8.2f} {errors:>7}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--batch', type=int, default=500)
+    parser.add_argument('--readers', type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'config':<8} {'rows/s':>10} {'reads':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    run('default', args.rows, args.batch, args.readers, None)
+    run('tuned', args.rows, args.batch, args.readers, DEFAULT_SQLITE_PRAGMAS)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark for the /api/timeseries counts.
+
+Compares, on a SQLite file holding several years of tagged updates, answering
+one product's weekly counts over a year:
+
+* with a grouped SQL query over the tag table (per request), and
+* from the NumPy store of daily counts, after its one-off build.
+
+Usage:
+    python -m benchmarks.bench_timeseries [--years 3] [--per-day 40] [--requests 200]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from flask import Flask
+from sqlalchemy import func, insert, select
+from app import db
+from app.models import Update, update_product_tags
+from app.utils.insights import week_bucket
+from app.utils.timeseries import TimeSeriesStore
+
+def seed(years, per_day, now):
+    rows, tags = [], []
+    start = now - timedelta(days=365 * years)
+    for i in range(years * 365 * per_day):
+        rows.append({'id': i + 1, 'provider': 'aws', 'title': f'Update {i}', 'url': 'https://example.test',
+                     'published_date': start + timedelta(minutes=i * 24 * 60 // per_day), 'created_at': now,
+                     'product_name': f'AWS Service {i % 80}', 'categories': '[]', 'update_types': '[]',
+                     'status': '[]', 'product_names': '[]'})
+        tags.append({'update_id': i + 1, 'name': f'AWS Service {i % 80}'})
+    db.session.execute(insert(Update.__table__), rows)
+    db.session.execute(insert(update_product_tags), tags)
+    db.session.commit()
+    return len(rows)
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--per-day', type=int, default=40)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask('app')
+        app.config.update({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(tmp, "bench.db")}'})
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            now = datetime.utcnow()
+            rows = seed(args.years, args.per_day, now)
+            end = now.date()
+            start = end - timedelta(days=364)
+            product = 'AWS Service 7'
+
+            def sql():
+                week = week_bucket(Update.published_date, 'sqlite')
+                db.session.execute(
+                    select(week, func.count()).select_from(update_product_tags)
+                    .join(Update, Update.id == update_product_tags.c.update_id)
+                    .where(update_product_tags.c.name == product, Update.provider == 'aws',
+                           Update.published_date >= start, Update.published_date < end + timedelta(days=1))
+                    .group_by(week)).all()
+
+            build_started = time.perf_counter()
+            store = TimeSeriesStore.build()
+            store.save(os.path.join(tmp, 'timeseries.npz'))
+            build = time.perf_counter() - build_started
+
+            per_sql = timed(sql, args.requests)
+            per_store = timed(lambda: store.query([('aws', 'product', product)], start, end, 'week'), args.requests)
+            db.session.remove()
+            db.drop_all()
+
+    print(f"{'operation':<16} {'ms':>9}")
+    print(f"{'grouped SQL':<16} {per_sql * 1000:>9.3f}")
+    print(f"{'store query':<16} {per_store * 1000:>9.3f}")
+    print(f"{'store build':<16} {build * 1000:>9.1f}")
+    print(f"({rows} updates; {per_sql / per_store:.0f}x faster per request)")
+
+if __name__ == '__main__':
+    main()
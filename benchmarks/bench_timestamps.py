@@ -0,0 +1,68 @@
+"""
+Micro-benchmark for feed timestamp parsing.
+
+Compares the strptime loop the scrapers used to run per item against
+``app.utils.timestamps.TimestampParser`` on typical AWS and Azure feed values.
+
+Usage:
+    python -m benchmarks.bench_timestamps [--items 20000]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from app.utils.timestamps import TimestampParser
+
+LEGACY_FORMATS = [
+    '%a, %d %b %Y %H:%M:%S %z',
+    '%a, %d %b %Y %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%SZ'
+]
+
+def legacy_parse(date_str):
+    """The pre-existing scraper logic, minus its print() calls."""
+    date_str = date_str.replace(' GMT', '').replace(' UTC', '')
+    for fmt in LEGACY_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    return None
+
+def sample_values(count):
+    start = datetime(2024, 1, 1)
+    aws, azure_published, azure_updated = [], [], []
+    for i in range(count):
+        dt = start + timedelta(minutes=37 * i)
+        aws.append(dt.strftime('%a, %d %b %Y %H:%M:%S GMT'))
+        azure_published.append(dt.strftime('%a, %d %b %Y %H:%M:%S Z'))
+        azure_updated.append(dt.strftime('%Y-%m-%dT%H:%M:%SZ'))
+    return {'aws pubDate': aws, 'azure published': azure_published, 'azure updated': azure_updated}
+
+def run(values, parse):
+    started = time.perf_counter()
+    for value in values:
+        parse(value)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--items', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'feed values':<18} {'legacy us/item':>15} {'fast us/item':>13} {'speedup':>8}")
+    for name, values in sample_values(args.items).items():
+        fast = TimestampParser(feed=name)
+        # Results must agree (legacy may return aware datetimes for +zone formats)
+        for value in values[:100]:
+            legacy = legacy_parse(value)
+            if legacy is not None and legacy.tzinfo is not None:
+                legacy = (legacy - legacy.utcoffset()).replace(tzinfo=None)
+            assert legacy == fast.parse(value), value
+
+        legacy_time = run(values, legacy_parse)
+        fast_time = run(values, fast.parse)
+        print(f"{name:<18} {legacy_time / len(values) * 1e6:>15.2f} {fast_time / len(values) * 1e6:>13.2f} "
+              f"{legacy_time / fast_time:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -12,6 +12,21 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(BASE_DIR, 'instance', 'cloud_updates.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    READ_ONLY_DATABASE_URI = os.environ.get('READ_ONLY_DATABASE_URL')  # Defaults to the SQLite file itself
+    # Connection pool for server databases (PostgreSQL); ignored for SQLite
+    DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 90))  # Shared by all gunicorn workers (WEB_CONCURRENCY)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))  # Persistent connections per worker, capped by the share above
+    DB_POOL_TIMEOUT = 30  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = 1800  # Seconds before a connection is replaced
+    # Applied to every new SQLite connection (see app/utils/db_engine.py)
+    SQLITE_PRAGMAS = {
+        'busy_timeout': 5000,  # ms to wait for a lock before "database is locked"
+        'journal_mode': 'WAL',  # readers and the writer no longer block each other
+        'synchronous': 'NORMAL',  # fsync at checkpoints only; safe with WAL
+        'cache_size': -64000,  # 64 MB page cache per connection
+        'mmap_size': 268435456,  # memory-map up to 256 MB of the file
+        'temp_store': 'MEMORY'
+    }
     
     # Security
     SECRET_KEY = os.environ.get('SECRET_KEY')
@@ -23,10 +38,49 @@ class Config:
     
    # Application settings
     UPDATES_PER_PAGE = 20  # Number of updates to show per page
+    LISTING_COUNT_TTL = 60  # Seconds a listing's total count is cached for page links
     MAX_SEARCH_RESULTS = 100  # Maximum number of search results to return
     UPDATE_RETENTION_DAYS = 90  # Number of days to keep updates before cleaning
+    CLEANUP_CHUNK_SIZE = 500  # Rows deleted per committed chunk when cleaning updates
+    # Cold storage for updates past the retention window (`flask clean archive`)
+    UPDATE_ARCHIVE_URI = os.environ.get('UPDATE_ARCHIVE_URL') or \
+        'sqlite:///' + os.path.join(BASE_DIR, 'instance', 'update_archive.db')
+    # Daily update counts behind /api/timeseries, shared by all workers
+    TIMESERIES_PATH = os.environ.get('TIMESERIES_PATH') or os.path.join(BASE_DIR, 'instance', 'timeseries.npz')
+    TIMESERIES_MAX_AGE = 300  # Seconds before the counts are rebuilt even if no update was added or removed
+    TIMESERIES_MAX_BUCKETS = 1000  # Most buckets one /api/timeseries request may return
+    HTTP_CACHE_MAX_AGE = 60  # Seconds browsers and nginx may reuse a page before revalidating it
+    DATA_VERSION_TTL = 5  # Seconds each worker trusts its copy of the data version
+    # Rendered update lists and theme cards, shared by all workers
+    FRAGMENT_CACHE_URI = os.environ.get('FRAGMENT_CACHE_URL') or \
+        'sqlite:///' + os.path.join(BASE_DIR, 'instance', 'fragment_cache.db')
+    FRAGMENT_CACHE_MAX_BYTES = 32 * 1024 * 1024  # Least recently used fragments are evicted beyond this
+    FRAGMENT_CACHE_FLUSH_INTERVAL = 10  # Seconds each worker keeps hit/miss counts before writing them
+    FRAGMENT_CACHE_TOUCH_INTERVAL = 60  # Seconds before a hit moves a fragment's last_used again
+    # Sentence splitting for explanation paragraphs: 'sentencizer' or 'regex' ('parser' loads
+    # en_core_web_sm and is only used when passed to `flask render_explanations --segmenter`)
+    SENTENCE_SEGMENTER = os.environ.get('SENTENCE_SEGMENTER', 'sentencizer')
+    # Explanation backfills (`flask generate_explanations`, /admin/generate_explanations)
+    EXPLANATION_CONCURRENCY = int(os.environ.get('EXPLANATION_CONCURRENCY', 4))  # Requests in flight at once
+    EXPLANATION_REQUESTS_PER_MINUTE = int(os.environ.get('EXPLANATION_REQUESTS_PER_MINUTE', 50))  # 0 disables the limit
+    EXPLANATION_TOKENS_PER_MINUTE = int(os.environ.get('EXPLANATION_TOKENS_PER_MINUTE', 80000))  # Prompt + max_tokens
+    EXPLANATION_MAX_RETRIES = 6  # Retries of an update after overload, rate limit or connection errors
+    EXPLANATION_BACKOFF_BASE = 1.0  # Seconds of the first pause after such an error; doubles while they continue
+    # Message Batches mode (`flask generate_explanations --batch`)
+    EXPLANATION_BATCH_SIZE = 10000  # Requests per submitted batch (the API accepts up to 100,000)
+    EXPLANATION_BATCH_WRITE_SIZE = 500  # Results written per committed bulk update
+    EXPLANATION_BATCH_POLL_INTERVAL = 60  # Seconds between status checks of submitted batches
+    EXPLANATION_BATCH_SUBMIT_TIMEOUT = 3600  # Seconds before a batch still not submitted releases its updates
+    EXPLANATION_BATCH_LEASE = 600  # Seconds one process keeps polling a batch before another may take over
+    REPROCESS_CHUNK_SIZE = 200  # Rows per committed chunk in reprocessing jobs
+    FEED_ARCHIVE_ENABLED = True  # Keep every fetched feed payload for `flask scrape replay`
+    FEED_ARCHIVE_DIR = os.environ.get('FEED_ARCHIVE_DIR') or os.path.join(BASE_DIR, 'instance', 'feed_archive')
 
     
+    # Logging
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')  # DEBUG enables per-item scraper/processor output
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')  # 'text' (key=value fields) or 'json'
+
     # Production settings
     DEBUG = False
     TESTING = False
@@ -2,13 +2,16 @@
 Gunicorn configuration for the cloud_updates application.
 """
 import multiprocessing
+import os
 
 # Server socket
 bind = "0.0.0.0:8000"
 backlog = 2048
 
 # Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# The app splits its database connection budget (DB_MAX_CONNECTIONS) between the workers
+os.environ['WEB_CONCURRENCY'] = str(workers)
 worker_class = 'sync'
 worker_connections = 1000
 timeout = 30
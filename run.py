@@ -29,43 +29,11 @@ import schedule
 import os
 from app.scraper.aws_scraper import AWSScraper
 from app.scraper.azure_scraper import AzureScraper
-from app.models import Update, WeeklyInsight
-from datetime import datetime, timedelta
+from app.models import Update
 
 # Create the Flask app instance
 app = create_app()
 
-def generate_weekly_insights():
-    """Generate weekly insights from updates."""
-    with app.app_context():
-        # Get updates from the last 7 days
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        
-        # Count updates by provider
-        aws_count = Update.query.filter(
-            Update.provider == 'aws',
-            Update.published_date >= week_ago
-        ).count()
-        
-        azure_count = Update.query.filter(
-            Update.provider == 'azure',
-            Update.published_date >= week_ago
-        ).count()
-        
-        # Create weekly insight
-        insight = WeeklyInsight(
-            week_start=week_ago,
-            week_end=datetime.utcnow(),
-            aws_updates=aws_count,
-            azure_updates=azure_count,
-            summary=f"This week, AWS had {aws_count} updates and Azure had {azure_count} updates. " + \
-                   f"{'AWS' if aws_count > azure_count else 'Azure'} was more active with " + \
-                   f"{'more' if abs(aws_count - azure_count) > 0 else 'the same number of'} updates."
-        )
-        
-        db.session.add(insight)
-        db.session.commit()
-
 def scrape_updates():
     with app.app_context():
         print("Fetching updates from AWS and Azure...")
@@ -95,9 +63,7 @@ def scrape_updates():
                     print(f"Error saving update: {e}")
         
         print(f"Added {new_updates} new updates to database")
-        
-        # Generate weekly insights after scraping
-        generate_weekly_insights()
+        # Insights need no regeneration: their rollups are updated with each saved update
 
 def run_scheduler():
     # Schedule the scraping job to run daily at 9 AM
@@ -0,0 +1,84 @@
+"""Shared fixtures for unit tests.
+
+Set ``TEST_DATABASE_URL`` to run the ``app`` fixture's tests against another
+database, e.g. PostgreSQL. ``postgres_url`` provides a PostgreSQL database
+from ``TEST_POSTGRES_URL`` or a throwaway local server (``pgserver``).
+``add_update`` adds updates and ``capture_statements`` records the SQL run
+while it is active.
+"""
+import os
+from contextlib import contextmanager
+from datetime import datetime
+import pytest
+from flask import Flask
+from sqlalchemy import event
+from app import db
+from app.models import Update
+from app.utils.title_search import ensure_title_index
+
+@pytest.fixture
+def app():
+    """Application bound to a throwaway in-memory database (or ``TEST_DATABASE_URL``)."""
+    app = Flask('app')
+    app.config.update({
+        'TESTING': True,
+        'SECRET_KEY': 'test',
+        'SQLALCHEMY_DATABASE_URI': os.environ.get('TEST_DATABASE_URL', 'sqlite://')
+    })
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        ensure_title_index()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def add_update():
+    """Factory adding an update with placeholder values for the columns not given; returns the update.
+
+    Commits unless ``commit=False``, for tests that add several updates in one transaction.
+    """
+    def add_update(title='Update', provider='aws', published_date=datetime(2025, 5, 12), commit=True, **fields):
+        update = Update(provider=provider, title=title, url='https://example.test', published_date=published_date,
+                        **fields)
+        db.session.add(update)
+        if commit:
+            db.session.commit()
+        return update
+    return add_update
+
+@pytest.fixture
+def capture_statements():
+    """Context manager factory: ``with capture_statements(engine) as statements`` collects the SQL
+    statements run on ``engine`` (default ``db.engine``), as ``(statement, parameters)`` pairs
+    with ``parameters=True``.
+    """
+    @contextmanager
+    def capture(engine=None, parameters=False):
+        engine = engine or db.engine
+        statements = []
+
+        def record(conn, cursor, statement, params, context, executemany):
+            statements.append((statement, params) if parameters else statement)
+
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+    return capture
+
+@pytest.fixture(scope='session')
+def postgres_url(tmp_path_factory):
+    """URL of a PostgreSQL database to test against; skips if none is available."""
+    pytest.importorskip('psycopg')
+    url = os.environ.get('TEST_POSTGRES_URL')
+    if url:
+        yield url
+        return
+    pgserver = pytest.importorskip('pgserver')
+    server = pgserver.get_server(tmp_path_factory.mktemp('postgres'), cleanup_mode='stop')
+    yield server.get_uri()
+    server.cleanup()
@@ -0,0 +1,169 @@
+"""A local stand-in for the Anthropic Messages and Message Batches APIs, and helpers for tests of explanation
+generation."""
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import anthropic
+from app import db
+from app.models import Update
+
+def add_updates(count, prefix='Feature', **fields):
+    """Store ``count`` AWS updates titled ``'<prefix> <i>'``, an hour apart."""
+    for i in range(count):
+        db.session.add(Update(provider='aws', title=f'{prefix} {i}', url='https://example.test',
+                              published_date=datetime(2025, 5, 12) + timedelta(hours=i), **fields))
+    db.session.commit()
+
+def client_for(server):
+    """Anthropic client sending its requests to ``server``, without retries of its own."""
+    return anthropic.Anthropic(api_key='test', base_url=server.url, max_retries=0)
+
+class FakeLLMServer:
+    """Answers ``POST /v1/messages`` after ``latency`` seconds with an explanation of the prompt's title.
+
+    ``errors`` lists responses to send instead of the next messages, as ``(status, error_type)``
+    or ``(status, error_type, retry_after)``. The server records when each request arrived and
+    the most requests it had in flight at once.
+
+    Message batches are answered in their lifecycle: ``in_progress`` for the first
+    ``polls_to_end`` retrievals, then ``ended`` with a results URL. Requests whose title is in
+    ``failing_titles`` get an ``errored`` result.
+    """
+
+    def __init__(self, latency=0.0, errors=(), polls_to_end=1, failing_titles=()):
+        self.latency = latency
+        self.errors = list(errors)
+        self.polls_to_end = polls_to_end
+        self.failing_titles = set(failing_titles)
+        self.batches = {}  # batch id -> {'requests', 'polls', 'created_at'}
+        self.requests = []  # (arrival time, title) of every request, errors included
+        self.in_flight = self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @staticmethod
+    def _title(body):
+        prompt = body['messages'][0]['content']
+        match = re.search(r"'(.*?)'", prompt)
+        return match.group(1) if match else prompt
+
+    @staticmethod
+    def _message(message_id, body, title):
+        text = f'{title} explained.\n\nThis helps customers.'
+        return {
+            'id': message_id, 'type': 'message', 'role': 'assistant', 'model': body['model'],
+            'content': [{'type': 'text', 'text': text}], 'stop_reason': 'end_turn', 'stop_sequence': None,
+            'usage': {'input_tokens': len(body['messages'][0]['content']) // 4, 'output_tokens': len(text) // 4}
+        }
+
+    def respond(self, body):
+        """``(status, headers, payload)`` for a Messages API request ``body``."""
+        title = self._title(body)
+        with self._lock:
+            self.requests.append((time.monotonic(), title))
+            error = self.errors.pop(0) if self.errors else None
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        if error:
+            status, error_type, *retry_after = error
+            headers = {'retry-after': str(retry_after[0])} if retry_after else {}
+            return status, headers, {'type': 'error', 'error': {'type': error_type, 'message': error_type}}
+        return 200, {}, self._message(f'msg_{len(self.requests)}', body, title)
+
+    def _batch(self, batch_id):
+        batch = self.batches[batch_id]
+        ended = batch['polls'] > self.polls_to_end
+        succeeded = sum(self._title(r['params']) not in self.failing_titles for r in batch['requests'])
+        created = batch['created_at']
+        return {
+            'id': batch_id, 'type': 'message_batch', 'processing_status': 'ended' if ended else 'in_progress',
+            'request_counts': {'processing': 0 if ended else len(batch['requests']),
+                               'succeeded': succeeded if ended else 0,
+                               'errored': len(batch['requests']) - succeeded if ended else 0,
+                               'canceled': 0, 'expired': 0},
+            'created_at': created.isoformat(), 'expires_at': (created + timedelta(days=1)).isoformat(),
+            'ended_at': created.isoformat() if ended else None, 'archived_at': None, 'cancel_initiated_at': None,
+            'results_url': f'{self.url}/v1/messages/batches/{batch_id}/results' if ended else None
+        }
+
+    def _results(self, batch_id):
+        lines = []
+        for index, request in enumerate(self.batches[batch_id]['requests']):
+            title = self._title(request['params'])
+            if title in self.failing_titles:
+                result = {'type': 'errored', 'error': {'type': 'error', 'error': {
+                    'type': 'invalid_request_error', 'message': 'Invalid request'}}}
+            else:
+                result = {'type': 'succeeded', 'message': self._message(f'msg_{batch_id}_{index}',
+                                                                        request['params'], title)}
+            lines.append(json.dumps({'custom_id': request['custom_id'], 'result': result}))
+        return '\n'.join(lines).encode()
+
+    def route(self, method, path, body):
+        path = path.split('?')[0]
+        if method == 'POST' and path == '/v1/messages':
+            return self.respond(body)
+        if method == 'POST' and path == '/v1/messages/batches':
+            with self._lock:
+                batch_id = f'msgbatch_{len(self.batches) + 1}'
+                self.batches[batch_id] = {'requests': body['requests'], 'polls': 0,
+                                          'created_at': datetime.now(timezone.utc)}
+            return 200, {}, self._batch(batch_id)
+        match = re.fullmatch(r'/v1/messages/batches/(\w+)(/results)?', path)
+        if method == 'GET' and match and match.group(1) in self.batches:
+            batch_id = match.group(1)
+            if match.group(2):
+                return 200, {'content-type': 'application/binary'}, self._results(batch_id)
+            with self._lock:
+                self.batches[batch_id]['polls'] += 1
+            return 200, {}, self._batch(batch_id)
+        return 404, {}, {'type': 'error', 'error': {'type': 'not_found_error', 'message': path}}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self._reply(fake.route('GET', self.path, None))
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                self._reply(fake.route('POST', self.path, body))
+
+            def _reply(self, response):
+                status, headers, payload = response
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in {'content-type': 'application/json', **headers}.items():
+                    self.send_header(name, value)
+                self.send_header('content-length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,64 @@
+"""Tests for set-based deduplication and retention cleaning."""
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import MetaData, UniqueConstraint, text
+from app import db
+from app.models import Update, FacetCount, update_product_tags
+from app.utils.clean_updates import clean_provider_updates, clean_azure_updates
+from app.utils.facets import rebuild_facet_counts
+
+@pytest.fixture
+def duplicates_allowed(app):
+    """Drop the unique constraint on ``update``, like databases created before it existed."""
+    if db.engine.dialect.name != 'sqlite':
+        db.session.execute(text('ALTER TABLE "update" DROP CONSTRAINT unique_update'))
+        db.session.commit()
+        return app
+    # SQLite cannot drop constraints, so recreate the table without it
+    Update.__table__.drop(db.engine)
+    table = Update.__table__.to_metadata(MetaData())
+    table.constraints = {c for c in table.constraints if not isinstance(c, UniqueConstraint)}
+    table.create(db.engine)
+    return app
+
+def facet_counts():
+    return {(f.provider, f.kind, f.name): f.count for f in FacetCount.query}
+
+def test_duplicates_keep_the_lowest_id(duplicates_allowed, add_update):
+    published = datetime(2025, 5, 1)
+    keep = add_update('Azure Arc update', 'azure', published, product_names=['Azure Arc']).id
+    duplicates = [add_update('Azure Arc update', 'azure', published, product_names=['Azure Arc']).id
+                  for _ in range(2)]
+    other = add_update('Azure Arc update', 'azure', published + timedelta(days=1), product_names=['Azure Arc']).id
+    aws = add_update('Azure Arc update', 'aws', published, product_name='AWS Lambda').id
+
+    counts = clean_provider_updates('azure', chunk_size=1)
+    assert counts == {'total': 4, 'duplicates': 2, 'expired': 0, 'remaining': 2}
+    assert sorted(db.session.scalars(db.select(Update.id))) == [keep, other, aws]
+
+    tagged = {row.update_id for row in db.session.execute(db.select(update_product_tags.c.update_id))}
+    assert not tagged & set(duplicates)
+    assert facet_counts()[('azure', 'product', 'Azure Arc')] == 2
+    counts = facet_counts()
+    rebuild_facet_counts()
+    assert facet_counts() == counts
+
+def test_retention_deletes_in_chunks_without_loading_rows(app, add_update, capture_statements):
+    app.config.update(UPDATE_RETENTION_DAYS=30, CLEANUP_CHUNK_SIZE=2)
+    now = datetime.utcnow()
+    for i in range(5):
+        add_update(f'Old update {i}', 'azure', now - timedelta(days=40 + i), product_names=['Azure SQL Database'])
+    add_update('Recent update', 'azure', now - timedelta(days=5), product_names=['Azure SQL Database'])
+    add_update('Old AWS update', 'aws', now - timedelta(days=60), product_name='AWS Lambda')
+    db.session.expunge_all()
+
+    assert clean_azure_updates(delete_old=False) == 0
+    with capture_statements() as statements:
+        assert clean_azure_updates(delete_old=True) == 5
+
+    # Only ids are selected from the update table
+    assert not any('description' in statement for statement in statements)
+    deletes = [statement for statement in statements if statement.replace('"', '').startswith('DELETE FROM update ')]
+    assert len(deletes) == 3
+    assert sorted(db.session.scalars(db.select(Update.title))) == ['Old AWS update', 'Recent update']
+    assert facet_counts()[('azure', 'product', 'Azure SQL Database')] == 1
@@ -0,0 +1,82 @@
+"""Tests for the data version and the HTTP validators derived from it."""
+from datetime import datetime
+import pytest
+from sqlalchemy import update as update_statement
+from app import db, routes
+from app.models import Update, ReprocessJob
+from app.utils.data_version import current_data_version
+from app.utils.explanation_backfill import store_explanation
+from app.utils.update_tags import delete_updates
+
+def test_version_is_bumped_after_committed_writes(app, add_update):
+    assert current_data_version()[0] == 0
+    update = add_update('Lambda')
+    assert current_data_version()[0] == 1
+
+    # Core deletes, as used by cleaning and archiving
+    delete_updates(db.session.connection(), {update.id: 'aws'})
+    db.session.commit()
+    db.session.expunge(update)
+    assert current_data_version()[0] == 2
+
+    # Rolled back writes and job bookkeeping leave it alone
+    db.session.add(Update(provider='aws', title='Draft', url='https://example.test', published_date=datetime.utcnow()))
+    db.session.flush()
+    db.session.rollback()
+    db.session.add(ReprocessJob(provider='aws'))
+    db.session.commit()
+    assert current_data_version()[0] == 2
+
+    Update.query.filter_by(provider='aws').delete()
+    db.session.commit()
+    assert current_data_version()[0] == 3
+
+def test_explanation_changes_leave_the_version_alone(app, add_update):
+    update_id = add_update('Lambda').id
+    assert current_data_version()[0] == 1
+
+    # Pages fetch explanations from the API, so storing or re-rendering them changes no page
+    store_explanation(update_id, 'Lambda explained.')
+    db.session.execute(update_statement(Update), [{'id': update_id, 'explanation_html': '<p>Lambda</p>'}])
+    db.session.commit()
+    assert current_data_version()[0] == 1
+
+    update = db.session.get(Update, update_id)
+    update.explanation = 'Lambda explained again.'
+    update.title = 'Lambda renamed'
+    db.session.commit()
+    assert current_data_version()[0] == 2
+
+@pytest.fixture
+def client(app, add_update):
+    routes.init_routes(app)
+    add_update('Lambda', description='Lambda description')
+    return app.test_client()
+
+def test_pages_answer_conditional_requests_without_queries(client, add_update, capture_statements):
+    response = client.get('/aws_updates')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.headers['Last-Modified']
+    assert response.cache_control.public and response.cache_control.max_age == 60
+
+    with capture_statements() as statements:
+        assert client.get('/aws_updates', headers={'If-None-Match': etag}).status_code == 304
+        assert client.get('/aws_updates', headers={
+            'If-Modified-Since': response.headers['Last-Modified']}).status_code == 304
+    assert statements == []
+
+    add_update('S3', description='S3 description')
+    response = client.get('/aws_updates', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+def test_pages_with_flashed_messages_are_not_shared(client):
+    with client.session_transaction() as session:
+        session['_flashes'] = [('success', 'Themes generated')]
+    response = client.get('/')
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    assert response.cache_control.private and response.cache_control.no_store
+    # The message was shown once; the next visit is cacheable again
+    assert 'ETag' in client.get('/').headers
@@ -0,0 +1,86 @@
+"""Tests for SQLite connection tuning and the read-only engine."""
+from datetime import datetime
+import pytest
+from flask import Flask
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models import Update
+from app.utils.db_engine import READ_ONLY_ENGINE, configure_engines, database_uri, pool_options, read_only
+from app.utils.title_search import ensure_title_index
+
+@pytest.fixture
+def file_app(tmp_path):
+    """Application on a SQLite file, configured like ``create_app``."""
+    app = Flask('app')
+    app.config.update({
+        'TESTING': True,
+        'SECRET_KEY': 'test',
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "updates.db"}'
+    })
+    db.init_app(app)
+    configure_engines(app, db)
+
+    with app.app_context():
+        db.create_all()
+        ensure_title_index()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        app.extensions[READ_ONLY_ENGINE].dispose()
+
+def pragma(engine, name):
+    with engine.connect() as conn:
+        return conn.execute(text(f'PRAGMA {name}')).scalar()
+
+def test_connections_are_tuned(file_app):
+    primary, reader = db.engine, file_app.extensions[READ_ONLY_ENGINE]
+    assert pragma(primary, 'journal_mode') == 'wal'
+    assert pragma(primary, 'synchronous') == 1
+    assert pragma(primary, 'busy_timeout') == 5000
+    assert pragma(primary, 'query_only') == 0
+
+    assert pragma(reader, 'journal_mode') == 'wal'
+    assert pragma(reader, 'query_only') == 1
+    with reader.connect() as conn, pytest.raises(OperationalError):
+        conn.execute(text("DELETE FROM \"update\""))
+
+def test_read_only_views_use_the_read_only_engine(file_app, capture_statements):
+    from app.routes import init_routes
+    init_routes(file_app)
+
+    @file_app.route('/touch')
+    @read_only
+    def touch():
+        # Flushes stay on the primary engine even inside a read-only view
+        db.session.add(Update(provider='aws', title='Written', url='https://example.test',
+                              published_date=datetime(2025, 5, 2)))
+        db.session.commit()
+        return str(Update.query.count())
+
+    db.session.add(Update(provider='aws', title='Lambda update', url='https://example.test',
+                          published_date=datetime(2025, 5, 1), product_name='AWS Lambda'))
+    db.session.commit()
+
+    with capture_statements() as primary, \
+            capture_statements(file_app.extensions[READ_ONLY_ENGINE]) as read_only_statements:
+        client = file_app.test_client()
+        response = client.get('/aws_updates')
+        assert response.status_code == 200 and b'Lambda update' in response.data
+        assert read_only_statements and not primary
+
+        assert client.get('/touch').data == b'2'
+        assert primary
+
+def test_pool_is_split_between_workers():
+    config = {'DB_MAX_CONNECTIONS': 90, 'DB_POOL_SIZE': 5}
+    assert pool_options(config, workers=9)['pool_size'] == 5
+    assert pool_options(config, workers=9)['max_overflow'] == 5
+    crowded = pool_options(config, workers=30)
+    assert (crowded['pool_size'], crowded['max_overflow']) == (3, 0)
+
+def test_database_url_takes_precedence(monkeypatch):
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    assert database_uri('sqlite:///local.db') == 'sqlite:///local.db'
+    monkeypatch.setenv('DATABASE_URL', 'postgres://app:secret@db/updates')
+    assert database_uri('sqlite:///local.db') == 'postgresql://app:secret@db/updates'
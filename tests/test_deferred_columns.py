@@ -0,0 +1,58 @@
+"""Tests for deferred loading of the large Update text columns."""
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models import Update
+from app.utils.insights import all_time_insight, insight_for_week
+
+@pytest.fixture
+def client(app):
+    from app.routes import init_routes
+    init_routes(app)
+
+    for i in range(3):
+        published = datetime(2025, 5, 5) + timedelta(hours=i)
+        db.session.add(Update(provider='aws', title=f'AWS Lambda update {i}', description=f'Lambda description {i}',
+                              url='https://example.test', published_date=published, product_name='AWS Lambda',
+                              explanation='<p>Stored explanation</p>'))
+        db.session.add(Update(provider='azure', title=f'Azure SQL update {i}', description='', url='https://example.test',
+                              published_date=published, categories=['Azure SQL', 'Launched']))
+    db.session.commit()
+    db.session.expunge_all()
+    return app.test_client()
+
+def update_selects(client, capture_statements, method, route):
+    with capture_statements() as executed:
+        response = getattr(client, method)(route)
+    assert response.status_code in (200, 302), route
+    # Only SQLite quotes the table name
+    executed = [statement.replace('"update"', 'update') for statement in executed]
+    return response, [statement for statement in executed
+                      if statement.lstrip().upper().startswith('SELECT') and 'FROM update' in statement]
+
+def test_listings_never_load_explanations(client, capture_statements):
+    response, statements = update_selects(client, capture_statements, 'get', '/aws_updates')
+    assert b'Lambda description 2' in response.data
+    assert statements and not any('explanation' in s for s in statements)
+    # Descriptions are rendered, so they come with the page query instead of one query per row
+    assert any('update.description' in s for s in statements)
+
+    response, statements = update_selects(client, capture_statements, 'get', '/')
+    assert not any('explanation' in s for s in statements)
+
+def test_explain_endpoint_loads_the_explanation(client, capture_statements):
+    update_id = Update.query.filter_by(title='AWS Lambda update 0').one().id
+    response, statements = update_selects(client, capture_statements, 'get', f'/api/update/{update_id}/explain')
+    assert 'Stored explanation' in response.get_json()['explanation']
+    assert len(statements) == 1 and 'update.explanation' in statements[0]
+
+def test_insight_generation_reads_only_the_counted_columns(client, capture_statements):
+    _, statements = update_selects(client, capture_statements, 'post', '/admin/generate_insights')
+    assert statements
+    assert not any('description' in s or 'explanation' in s for s in statements)
+
+    cumulative = all_time_insight()
+    assert cumulative.aws_top_products == [{'name': 'AWS Lambda', 'count': 3}]
+    assert cumulative.azure_top_categories == [{'name': 'Azure SQL', 'count': 3}]
+    weekly = insight_for_week(datetime(2025, 5, 5))
+    assert (weekly.aws_updates, weekly.azure_updates) == (3, 3)
@@ -0,0 +1,101 @@
+"""Tests for concurrent explanation backfills against a local fake of the Messages API."""
+import pytest
+from app import db
+from app.cli.explanations import generate_explanations
+from app.models import Update
+from app.utils import explanation_backfill
+from app.utils.explanation_backfill import ExplanationBackfill, TokenBucket, backfill_explanations
+from app.utils.update_analyzer import FORMATTER_VERSION
+from tests.fake_llm import FakeLLMServer, add_updates, client_for
+
+@pytest.fixture
+def backfill_app(app):
+    app.config.update(EXPLANATION_CONCURRENCY=4, EXPLANATION_REQUESTS_PER_MINUTE=0,
+                      EXPLANATION_TOKENS_PER_MINUTE=0, EXPLANATION_BACKOFF_BASE=0.05)
+    return app
+
+def test_token_bucket_paces_requests():
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    bucket = TokenBucket(60, capacity=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(5):
+        bucket.acquire()
+    # Two from the full bucket, then one a second
+    assert now[0] == pytest.approx(3.0)
+    bucket.refund(10)
+    assert bucket.tokens == 2
+
+def test_backfill_runs_requests_concurrently_and_commits_each(backfill_app):
+    add_updates(8)
+    add_updates(1, prefix='Explained', explanation='Already explained')
+    with FakeLLMServer(latency=0.2) as server:
+        result = backfill_explanations(client=client_for(server))
+
+    assert result == {'total': 8, 'generated': 8, 'failed': 0, 'retries': 0}
+    assert server.max_in_flight == 4
+    # Stored from the calling thread with the rendered HTML
+    db.session.expire_all()
+    update = Update.query.filter_by(title='Feature 3').one()
+    assert update.explanation == 'Feature 3 explained.\n\nThis helps customers.'
+    assert update.explanation_html.count('<p>') == 2
+    assert update.explanation_format_version == FORMATTER_VERSION
+
+def test_overload_and_rate_limit_errors_pause_and_retry(backfill_app):
+    add_updates(4)
+    errors = [(529, 'overloaded_error'), (529, 'overloaded_error'), (429, 'rate_limit_error', 0.3)]
+    with FakeLLMServer(latency=0.01, errors=errors) as server:
+        result = backfill_explanations(client=client_for(server))
+
+    assert result['generated'] == 4 and result['retries'] == 3
+    assert Update.query.filter(Update.explanation.is_(None)).count() == 0
+    # The server's retry-after paused every worker
+    arrivals = sorted(arrived for arrived, _ in server.requests)
+    assert max(later - earlier for earlier, later in zip(arrivals, arrivals[1:])) >= 0.3
+
+def test_failed_updates_do_not_stop_the_backfill(backfill_app):
+    add_updates(3)
+    errors = [(400, 'invalid_request_error')] + [(529, 'overloaded_error')] * 3
+    backfill_app.config.update(EXPLANATION_CONCURRENCY=1, EXPLANATION_MAX_RETRIES=2)
+    with FakeLLMServer(errors=errors) as server:
+        result = backfill_explanations(client=client_for(server))
+
+    # One bad request, one update out of retries, one explained
+    assert (result['generated'], result['failed']) == (1, 2)
+    assert Update.query.filter(Update.explanation.is_not(None)).count() == 1
+
+def test_interrupted_backfill_cancels_queued_requests(backfill_app):
+    add_updates(20)
+    backfill_app.config['EXPLANATION_CONCURRENCY'] = 2
+
+    def interrupt(update_id, error):
+        raise KeyboardInterrupt
+
+    with FakeLLMServer(latency=0.05) as server:
+        with pytest.raises(KeyboardInterrupt):
+            backfill_explanations(client=client_for(server), progress=interrupt)
+    # At most the requests already in flight were made
+    assert len(server.requests) <= 4
+    assert Update.query.filter(Update.explanation.is_not(None)).count() == 1
+
+def test_requests_per_minute_limit(backfill_app):
+    add_updates(3)
+    with FakeLLMServer() as server:
+        backfill = ExplanationBackfill(client_for(server), concurrency=3, requests_per_minute=600,
+                                       tokens_per_minute=0)
+        backfill.requests = TokenBucket(600, capacity=1)
+        backfill.run(explanation_backfill.updates_to_explain(), lambda update_id, text: None)
+
+    arrivals = sorted(arrived for arrived, _ in server.requests)
+    assert arrivals[-1] - arrivals[0] >= 0.2 * 0.9
+
+def test_generate_explanations_command(backfill_app, monkeypatch):
+    add_updates(2)
+    with FakeLLMServer() as server:
+        monkeypatch.setenv('ANTHROPIC_API_KEY', 'test')
+        monkeypatch.setenv('ANTHROPIC_BASE_URL', server.url)
+        result = backfill_app.test_cli_runner().invoke(generate_explanations, ['--concurrency', '2'])
+    assert 'Successfully generated 2 explanations (0 failed, 0 retries)' in result.output
+    assert len(server.requests) == 2
@@ -0,0 +1,187 @@
+"""Tests for explanation generation through a local stand-in of the Message Batches API."""
+from datetime import datetime, timedelta
+import pytest
+from app import db, routes
+from app.cli.explanations import generate_explanations
+from app.models import ExplanationBatch, Update
+from app.utils import explanation_batches
+from app.utils.explanation_batches import poll_batch, poll_batches, submit_batches, wait_for_batches
+from app.utils.update_analyzer import FORMATTER_VERSION
+from tests.fake_llm import FakeLLMServer, add_updates, client_for
+
+def explained():
+    db.session.expire_all()
+    return sorted(update.title for update in Update.query.filter(Update.explanation.is_not(None)))
+
+@pytest.fixture
+def server():
+    with FakeLLMServer(polls_to_end=1, failing_titles={'Feature 1'}) as server:
+        yield server
+
+@pytest.fixture
+def client(server):
+    return client_for(server)
+
+def test_batch_lifecycle(app, server, client):
+    add_updates(3)
+    app.config['EXPLANATION_BATCH_SIZE'] = 2
+    batches = submit_batches(client)
+    assert [(batch.status, batch.request_count) for batch in batches] == [('in_progress', 2), ('in_progress', 1)]
+    assert set(server.batches) == {batch.batch_id for batch in batches}
+    # Claimed updates are not submitted again
+    assert submit_batches(client) == []
+
+    assert len(poll_batches(client)) == 2 and explained() == []
+    assert poll_batches(client) == []
+    assert explained() == ['Feature 0', 'Feature 2']
+    update = Update.query.filter_by(title='Feature 0').one()
+    assert update.explanation == 'Feature 0 explained.\n\nThis helps customers.'
+    assert update.explanation_html.count('<p>') == 2
+    assert update.explanation_format_version == FORMATTER_VERSION
+    counts = sorted((batch.succeeded, batch.failed) for batch in ExplanationBatch.query)
+    assert counts == [(1, 0), (1, 1)]
+
+    # The errored request is requested again by the next submission
+    (retry,) = submit_batches(client)
+    assert retry.update_ids == [Update.query.filter_by(title='Feature 1').one().id]
+
+def test_results_are_written_in_chunks(app, server, client):
+    add_updates(5, prefix='Chunked')
+    app.config['EXPLANATION_BATCH_WRITE_SIZE'] = 2
+    submit_batches(client)
+    # Updates removed while the batch ran are skipped
+    Update.query.filter_by(title='Chunked 4').delete()
+    db.session.commit()
+    wait_for_batches(client, poll_interval=0)
+    assert explained() == [f'Chunked {i}' for i in range(4)]
+    assert ExplanationBatch.query.one().succeeded == 4
+
+def test_command_resumes_recorded_batches(app, server, monkeypatch):
+    add_updates(3)
+    monkeypatch.setenv('ANTHROPIC_API_KEY', 'test')
+    monkeypatch.setenv('ANTHROPIC_BASE_URL', server.url)
+    app.config['EXPLANATION_BATCH_POLL_INTERVAL'] = 0
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(generate_explanations, ['--batch', '--no-wait'])
+    assert 'Submitted batch msgbatch_1 with 3 requests' in result.output
+    db.session.remove()
+
+    # A later run (e.g. after a restart) polls the recorded batch instead of submitting again
+    result = runner.invoke(generate_explanations, ['--batch'])
+    assert 'Resuming 1 submitted batches' in result.output
+    assert 'Successfully generated 2 explanations (1 failed requests)' in result.output
+    assert list(server.batches) == ['msgbatch_1']
+    assert explained() == ['Feature 0', 'Feature 2']
+
+def test_batches_never_submitted_release_their_updates(app, client):
+    add_updates(2)
+    db.session.add(ExplanationBatch(update_ids=[update.id for update in Update.query], request_count=2))
+    db.session.commit()
+    # Possibly still being submitted by another process
+    assert len(poll_batches(client)) == 1
+    assert submit_batches(client) == []
+
+    ExplanationBatch.query.one().updated_at = datetime.utcnow() - timedelta(hours=2)
+    db.session.commit()
+    assert poll_batches(client) == []
+    assert ExplanationBatch.query.filter_by(status='failed').one().error == 'Never submitted'
+    assert submit_batches(client)[0].request_count == 2
+
+def test_pending_batches_and_polls_do_not_overwrite_each_other(app, server, client, monkeypatch):
+    add_updates(2)
+    app.config['EXPLANATION_BATCH_SUBMIT_TIMEOUT'] = 0
+    create = client.messages.batches.create
+
+    def create_while_polled(**kwargs):
+        # Another process polls while the submission is in flight and gives up on it
+        assert poll_batches(client) == []
+        assert ExplanationBatch.query.one().status == 'failed'
+        return create(**kwargs)
+
+    monkeypatch.setattr(client.messages.batches, 'create', create_while_polled)
+    (batch,) = submit_batches(client)
+    # The submitted batch is revived without the poller's error
+    assert (batch.status, batch.batch_id, batch.error, batch.finished_at) == ('in_progress', 'msgbatch_1', None, None)
+
+    # A poller still holding the pending row cannot fail it once submitted
+    stale = ExplanationBatch(id=batch.id, status='pending', updated_at=datetime.utcnow() - timedelta(hours=2))
+    poll_batch(client, stale)
+    db.session.expire_all()
+    assert ExplanationBatch.query.one().status == 'in_progress'
+
+def test_admin_route_submits_in_the_background(app, server, monkeypatch):
+    add_updates(3)
+    monkeypatch.setenv('ANTHROPIC_API_KEY', 'test')
+    monkeypatch.setenv('ANTHROPIC_BASE_URL', server.url)
+    app.config.update(EXPLANATION_BATCH_SIZE=2, EXPLANATION_BATCH_POLL_INTERVAL=0)
+    routes.init_routes(app)
+    started = []
+    monkeypatch.setattr(routes, 'start_batch_submission', lambda *args: started.append(args))
+
+    response = app.test_client().post('/admin/generate_explanations', data={'batch': '1'})
+    assert response.status_code == 302
+    # The request only recorded the batches
+    assert server.batches == {}
+    assert [batch.status for batch in ExplanationBatch.query] == ['pending', 'pending']
+    (client, batch_ids), = started
+
+    explanation_batches.start_batch_submission(client, batch_ids, app).join(5)
+    explanation_batches._poller.join(5)
+    db.session.expire_all()
+    assert sorted(server.batches) == ['msgbatch_1', 'msgbatch_2']
+    assert [batch.status for batch in ExplanationBatch.query] == ['completed', 'completed']
+    assert explained() == ['Feature 0', 'Feature 2']
+
+def test_unknown_batches_fail_instead_of_being_polled_forever(app, server, client):
+    add_updates(1)
+    db.session.add(ExplanationBatch(batch_id='msgbatch_deleted', status='in_progress', request_count=1,
+                                    update_ids=[Update.query.one().id]))
+    db.session.commit()
+    assert poll_batches(client) == []
+    assert ExplanationBatch.query.one().error == 'Batch not found'
+    assert submit_batches(client)[0].request_count == 1
+
+def test_polling_resumes_on_the_first_request(app, server, client, monkeypatch):
+    add_updates(2)
+    submit_batches(client)
+    monkeypatch.setenv('ANTHROPIC_API_KEY', 'test')
+    monkeypatch.setenv('ANTHROPIC_BASE_URL', server.url)
+    monkeypatch.setattr(explanation_batches, '_resumed_pid', None)
+    app.config['EXPLANATION_BATCH_POLL_INTERVAL'] = 0
+    explanation_batches.init_app(app)
+    app.add_url_rule('/ping', 'ping', lambda: 'pong')
+
+    assert app.test_client().get('/ping').data == b'pong'
+    explanation_batches._poller.join(5)
+    db.session.expire_all()
+    assert ExplanationBatch.query.one().status == 'completed'
+    assert explained() == ['Feature 0']
+
+def test_one_process_polls_each_batch(app, server, client, monkeypatch):
+    add_updates(2)
+    (batch,) = submit_batches(client)
+    assert len(poll_batches(client)) == 1
+    assert ExplanationBatch.query.one().poller == explanation_batches._poller_id()
+
+    # Another worker leaves the batch to the process holding its lease
+    monkeypatch.setattr(explanation_batches, '_poller_id', lambda: 'other-host:1')
+    assert len(poll_batches(client)) == 1
+    assert server.batches[batch.batch_id]['polls'] == 1
+
+    # ...until the lease runs out
+    ExplanationBatch.query.one().lease_until = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    assert poll_batches(client) == []
+    assert ExplanationBatch.query.one().poller == 'other-host:1'
+    assert explained() == ['Feature 0']
+
+def test_request_count_excludes_cleaned_up_updates(app, server, client):
+    add_updates(3)
+    (batch,) = explanation_batches.record_batches(force=False, batch_size=None)
+    Update.query.filter_by(title='Feature 2').delete()
+    db.session.commit()
+    explanation_batches.submit_batch(client, batch)
+    db.session.expire_all()
+    assert ExplanationBatch.query.one().request_count == 2
+    assert len(server.batches[batch.batch_id]['requests']) == 2
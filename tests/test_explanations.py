@@ -0,0 +1,113 @@
+"""Tests for explanation HTML rendered at write time."""
+import pytest
+from app import db, routes
+from app.cli.explanations import render_explanations
+from app.models import Update
+from app.utils import update_analyzer
+from app.utils.update_analyzer import FORMATTER_VERSION, configured_segmenter, format_explanation_text, set_explanation
+
+TEXT = 'Lambda now supports longer runs.\n\nThis helps batch jobs. It costs nothing extra.'
+
+@pytest.fixture
+def formatter(app, monkeypatch):
+    """Counts the texts the configured segmenter formats through ``pipe``."""
+    model = update_analyzer.load_nlp_model()
+    calls = []
+    original = model.pipe
+
+    def pipe(texts, **kwargs):
+        texts = list(texts)
+        calls.append(len(texts))
+        return original(texts, **kwargs)
+
+    monkeypatch.setattr(model, 'pipe', pipe)
+    return calls
+
+def test_set_explanation_stores_the_rendered_html(app, formatter, add_update):
+    update = add_update('Lambda')
+    set_explanation(update, TEXT)
+    db.session.commit()
+    assert update.explanation_format_version == FORMATTER_VERSION
+    assert update.explanation_html.count('<p>') == 2
+    assert 'This helps batch jobs.' in update.explanation_html
+
+    # Explanations that already carry HTML keep the basic formatting
+    set_explanation(update, '<p>Stored explanation</p>')
+    assert 'Stored explanation' in update.explanation_html
+    assert formatter == []
+
+def test_explain_endpoint_reads_the_stored_html(app, formatter, monkeypatch, add_update):
+    routes.init_routes(app)
+    rendered = add_update('Rendered', explanation=TEXT, explanation_html='<p>Stored HTML</p>',
+                          explanation_format_version=FORMATTER_VERSION)
+    unrendered = add_update('Unrendered', explanation='First line\r\nSecond line')
+
+    def fail(text):
+        raise AssertionError('explanations are not formatted per request')
+
+    monkeypatch.setattr(update_analyzer, 'format_explanation_text', fail)
+    client = app.test_client()
+    assert client.get(f'/api/update/{rendered.id}/explain').get_json()['explanation'] == '<p>Stored HTML</p>'
+    # Rows not rendered yet fall back to the line-break formatting
+    assert client.get(f'/api/update/{unrendered.id}/explain').get_json()['explanation'] == \
+        '<p>First line<br>Second line</p>'
+
+def test_render_command_renders_outdated_explanations(app, formatter, add_update):
+    current = add_update('Current', explanation=TEXT, explanation_html='<p>Current</p>',
+                         explanation_format_version=FORMATTER_VERSION, explanation_segmenter='sentencizer')
+    stale = [add_update(f'Stale {i}', explanation=TEXT, explanation_format_version=FORMATTER_VERSION - 1)
+             for i in range(3)]
+    missing = add_update('Missing', explanation=TEXT)
+    add_update('No explanation')
+
+    result = app.test_cli_runner().invoke(render_explanations, ['--batch-size', '2'])
+    assert result.exit_code == 0, result.output
+    assert 'Rendered 4 explanations' in result.output
+    # Two batches of two, each formatted with one pipe pass
+    assert formatter == [2, 2]
+
+    db.session.expire_all()
+    for update in stale + [missing]:
+        assert update.explanation_format_version == FORMATTER_VERSION
+        assert update.explanation_html.count('<p>') == 2
+    assert current.explanation_html == '<p>Current</p>'
+    assert Update.query.filter_by(title='No explanation').one().explanation_html is None
+
+    result = app.test_cli_runner().invoke(render_explanations, ['--all'])
+    assert 'Rendered 5 explanations' in result.output
+    db.session.expire_all()
+    assert current.explanation_html.count('<p>') == 2
+
+@pytest.mark.parametrize('segmenter', ['sentencizer', 'regex'])
+def test_lightweight_segmenters_find_paragraphs(segmenter):
+    assert format_explanation_text(TEXT, segmenter) == \
+        '<p>Lambda now supports longer runs.</p><p>This helps batch jobs. It costs nothing extra.</p>'
+    # Headings without punctuation and abbreviations
+    assert format_explanation_text('Overview\r\n\r\nS3 adds e.g. tags. Is it GA? Yes!', segmenter) == \
+        '<p>Overview</p><p>S3 adds e.g. tags. Is it GA? Yes!</p>'
+
+def test_the_parser_is_never_taken_from_config(app):
+    app.config['SENTENCE_SEGMENTER'] = 'parser'
+    # Background threads of web workers have an app context but no request
+    with app.app_context():
+        assert configured_segmenter() == 'sentencizer'
+    app.config['SENTENCE_SEGMENTER'] = 'regex'
+    with app.app_context():
+        assert configured_segmenter() == 'regex'
+    app.config['SENTENCE_SEGMENTER'] = 'nltk'
+    with app.app_context(), pytest.raises(ValueError):
+        configured_segmenter()
+
+def test_render_command_renders_rows_of_another_segmenter(app, add_update):
+    update = add_update('Regex', explanation=TEXT)
+    set_explanation(update, TEXT)
+    db.session.commit()
+    assert update.explanation_segmenter == 'sentencizer'
+
+    runner = app.test_cli_runner()
+    assert 'Rendered 0 explanations' in runner.invoke(render_explanations).output
+    result = runner.invoke(render_explanations, ['--segmenter', 'regex'])
+    assert 'Rendered 1 explanations with formatter version' in result.output and '(regex)' in result.output
+    db.session.expire_all()
+    assert update.explanation_segmenter == 'regex'
+    assert 'Rendered 0 explanations' in runner.invoke(render_explanations, ['--segmenter', 'regex']).output
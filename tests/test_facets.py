@@ -0,0 +1,60 @@
+"""Tests for precomputed facet counts."""
+from app import db
+from app.models import Update, FacetCount
+from app.utils.facets import get_facet_counts, rebuild_facet_counts
+
+def stored_counts():
+    return {(f.provider, f.kind, f.name): f.count for f in FacetCount.query}
+
+def recomputed_counts():
+    rebuild_facet_counts()
+    counts = stored_counts()
+    db.session.rollback()
+    return counts
+
+def seed(add_update):
+    first = add_update('Update 1', provider='azure', commit=False, product_names=['Azure SQL Database'],
+                       update_types=['Features'], status=['Launched'])
+    second = add_update('Update 2', provider='azure', commit=False, product_names=['Azure SQL Database', 'Azure Arc'],
+                        update_types=['Security'], status=['In preview'])
+    third = add_update('Update 3', provider='azure', commit=False, product_names=['Azure Arc'],
+                       update_types=['Features'], status=['Launched'])
+    add_update('Update 4', commit=False, product_name='AWS Lambda')
+    db.session.commit()
+    return first, second, third
+
+def test_counts_track_inserts_changes_and_deletes(app, add_update):
+    first, second, third = seed(add_update)
+    counts = stored_counts()
+    assert counts[('azure', 'product', 'Azure SQL Database')] == 2
+    assert counts[('azure', 'status', 'Launched')] == 2
+    assert counts[('aws', 'product', 'AWS Lambda')] == 1
+
+    second.status = ['Launched']
+    db.session.commit()
+    assert stored_counts()[('azure', 'status', 'Launched')] == 3
+    assert ('azure', 'status', 'In preview') not in stored_counts()
+
+    db.session.delete(third)
+    db.session.commit()
+    assert stored_counts()[('azure', 'product', 'Azure Arc')] == 1
+    assert stored_counts() == recomputed_counts()
+
+    # A bulk delete invalidates the counts and rebuilds them from the tag tables
+    Update.query.filter_by(provider='aws').delete()
+    db.session.commit()
+    assert ('aws', 'product', 'AWS Lambda') not in stored_counts()
+    assert stored_counts() == recomputed_counts()
+
+def test_counts_are_conditioned_on_other_filters(app, add_update):
+    seed(add_update)
+    unfiltered = get_facet_counts('azure')
+    assert unfiltered['type'] == {'Features': 2, 'Security': 1}
+
+    filtered = get_facet_counts('azure', {'status': ['Launched']})
+    assert filtered['type'] == {'Features': 2}
+    assert filtered['product'] == {'Azure SQL Database': 1, 'Azure Arc': 1}
+    # A kind's own selection does not narrow its own counts
+    assert filtered['status'] == {'Launched': 2, 'In preview': 1}
+
+    assert get_facet_counts('aws', kinds=('product',)) == {'product': {'AWS Lambda': 1}}
@@ -0,0 +1,80 @@
+"""Tests for the raw feed archive and offline replay."""
+from datetime import datetime
+from app.models import Update
+from app.utils.feed_archive import FeedArchive
+from app.utils.feed_replay import replay_archives
+
+AZURE_FEED = b"""<?xml version="1.0" encoding="utf-8"?>
+<rss xmlns:a10="http://www.w3.org/2005/Atom" version="2.0"><channel>
+<title>Azure updates</title>
+<item>
+  <title>[Launched] Generally Available: Azure Container Apps feature</title>
+  <link>https://azure.microsoft.com/updates?id=1</link>
+  <description>Container Apps now supports a new feature.</description>
+  <pubDate>Wed, 30 Apr 2025 16:00:32 Z</pubDate>
+  <a10:updated>2025-04-30T16:00:32Z</a10:updated>
+  <category>Launched</category><category>Azure Container Apps</category><category>Features</category>
+</item>
+<item>
+  <title>[In preview] Public Preview: Azure SQL updates</title>
+  <link>https://azure.microsoft.com/updates?id=2</link>
+  <description>Azure SQL preview.</description>
+  <pubDate>Thu, 01 May 2025 10:00:00 Z</pubDate>
+  <category>In preview</category><category>Azure SQL Database</category>
+</item>
+</channel></rss>"""
+
+AWS_FEED = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel>
+<title>Recent Announcements</title>
+<item>
+  <title>AWS Lambda now supports up to 10 GB of ephemeral storage</title>
+  <link>https://aws.amazon.com/about-aws/whats-new/2025/05/lambda-storage/</link>
+  <description>&lt;p&gt;AWS Lambda functions can now use more storage.&lt;/p&gt;</description>
+  <pubDate>Fri, 02 May 2025 18:00:00 GMT</pubDate>
+</item>
+</channel></rss>"""
+
+def test_store_is_content_addressed(tmp_path):
+    archive = FeedArchive(str(tmp_path))
+    first = archive.store('azure', 'https://example.test/rss', AZURE_FEED, status_code=200,
+                          headers={'Content-Type': 'application/rss+xml', 'Server': 'x'})
+    second = archive.store('azure', 'https://example.test/rss', AZURE_FEED, status_code=200)
+
+    assert first['sha256'] == second['sha256']
+    assert first['new'] and not second['new']
+    assert first['headers'] == {'Content-Type': 'application/rss+xml'}
+    assert first['stored_bytes'] < first['bytes']
+    assert archive.load(first['sha256']) == AZURE_FEED
+    assert len(archive.records(unique=False)) == 2
+    assert len(archive.records()) == 1
+    assert archive.records(provider='aws') == []
+    assert archive.records(since=datetime(2100, 1, 1)) == []
+
+def test_replay_ingests_archives_once(app, tmp_path):
+    archive = FeedArchive(str(tmp_path))
+    archive.store('azure', 'https://example.test/azure', AZURE_FEED)
+    archive.store('aws', 'https://example.test/aws', AWS_FEED)
+
+    summary = replay_archives(archive, archive.records(), workers=1)
+    assert (summary['archives'], summary['parsed'], summary['added']) == (2, 3, 3)
+
+    azure = Update.query.filter_by(provider='azure').order_by(Update.published_date).first()
+    assert azure.product_names == ['Azure Container Apps']
+    assert azure.status == ['Launched']
+    assert Update.query.filter_by(provider='aws').one().product_name == 'AWS Lambda'
+
+    # Replaying the same archives again finds nothing new
+    assert replay_archives(archive, archive.records(), workers=1)['added'] == 0
+
+def test_parallel_dry_run_matches_serial(app, tmp_path):
+    archive = FeedArchive(str(tmp_path))
+    archive.store('azure', 'https://example.test/azure', AZURE_FEED)
+    archive.store('aws', 'https://example.test/aws', AWS_FEED)
+
+    serial = replay_archives(archive, archive.records(), workers=1, store=False)
+    parallel = replay_archives(archive, archive.records(), workers=2, store=False)
+
+    assert serial['parsed'] == parallel['parsed'] == 3
+    assert parallel['added'] == 0
+    assert Update.query.count() == 0
@@ -0,0 +1,85 @@
+"""Tests for the rendered-fragment cache of update lists and theme cards."""
+from datetime import datetime
+import pytest
+from sqlalchemy import select
+from app import db, routes
+from app.models import WeeklyTheme
+from app.utils.fragment_cache import FRAGMENT_ENGINE, cached_fragment, fragment_counters, fragment_stats, fragments
+
+@pytest.fixture
+def cache_app(app, tmp_path):
+    app.config['FRAGMENT_CACHE_URI'] = f'sqlite:///{tmp_path / "fragments.db"}'
+    yield app
+    if FRAGMENT_ENGINE in app.extensions:
+        app.extensions.pop(FRAGMENT_ENGINE).dispose()
+
+@pytest.fixture
+def client(cache_app, add_update):
+    routes.init_routes(cache_app)
+    add_update('Lambda feature', description='Lambda feature description', product_name='AWS Lambda')
+    db.session.add(WeeklyTheme(week_start=datetime(2025, 5, 12), provider='aws', theme_name='Serverless week',
+                               description='Lambda everywhere', relevance_score=0.9, update_count=1))
+    db.session.commit()
+    return cache_app.test_client()
+
+def test_update_list_hits_skip_the_database(client, add_update, capture_statements):
+    first = client.get('/aws_updates').get_data(as_text=True)
+    assert 'Lambda feature' in first
+
+    with capture_statements() as statements:
+        response = client.get('/aws_updates')
+    assert statements == []
+    assert response.get_data(as_text=True) == first
+    # Other filters and pages are separate fragments
+    client.get('/aws_updates?category=AWS+Lambda')
+    stats = fragment_stats()['update_listing.html']
+    assert (stats['hits'], stats['misses'], stats['fragments']) == (1, 2, 2)
+
+    # A write bumps the data version, so the list is rendered again
+    add_update('S3 feature', product_name='AWS Lambda')
+    assert 'S3 feature' in client.get('/aws_updates').get_data(as_text=True)
+    assert fragment_stats()['update_listing.html']['misses'] == 3
+
+def test_theme_cards_are_cached(client):
+    for _ in range(2):
+        assert 'Serverless week' in client.get('/').get_data(as_text=True)
+        assert 'Serverless week' in client.get('/themes?week=2025-05-12').get_data(as_text=True)
+    stats = fragment_stats()
+    assert (stats['theme_cards.html']['hits'], stats['theme_cards.html']['misses']) == (1, 1)
+    assert (stats['theme_week.html']['hits'], stats['theme_week.html']['misses']) == (1, 1)
+
+def test_least_recently_used_fragments_are_evicted(cache_app):
+    cache_app.config.update(FRAGMENT_CACHE_MAX_BYTES=250, FRAGMENT_CACHE_TOUCH_INTERVAL=0)
+    with cache_app.test_request_context('/'):
+        for name in ('a', 'b'):
+            cached_fragment('test.html', {'name': name}, lambda: name * 100)
+        # Reading 'a' makes 'b' the least recently used
+        assert cached_fragment('test.html', {'name': 'a'}, lambda: 'stale') == 'a' * 100
+        cached_fragment('test.html', {'name': 'c'}, lambda: 'c' * 100)
+
+        with cache_app.extensions[FRAGMENT_ENGINE].connect() as connection:
+            stored = sorted(html[0] for html in connection.execute(select(fragments.c.html)))
+        assert stored == ['a' * 100, 'c' * 100]
+        assert fragment_stats()['test.html']['hits'] == 1
+
+def test_hits_only_read_and_counts_are_written_in_batches(cache_app, capture_statements):
+    with cache_app.test_request_context('/'):
+        cached_fragment('test.html', {'name': 'a'}, lambda: 'a')
+        engine = cache_app.extensions[FRAGMENT_ENGINE]
+
+        # Fresh fragments keep their last_used and the counts stay in memory
+        with capture_statements(engine) as statements:
+            for _ in range(5):
+                cached_fragment('test.html', {'name': 'a'}, lambda: 'stale')
+        assert statements and all(s.lstrip().startswith('SELECT') for s in statements)
+        # Under budget, storing another fragment does not sum the stored sizes
+        with capture_statements(engine) as statements:
+            cached_fragment('test.html', {'name': 'b'}, lambda: 'b')
+        assert not any('sum(' in s.lower() for s in statements)
+        with engine.connect() as connection:
+            assert connection.scalar(select(fragment_counters.c.hits)) is None
+
+        cache_app.config['FRAGMENT_CACHE_FLUSH_INTERVAL'] = 0
+        cached_fragment('test.html', {'name': 'a'}, lambda: 'stale')
+        with engine.connect() as connection:
+            assert connection.execute(select(fragment_counters.c.hits, fragment_counters.c.misses)).one() == (6, 2)
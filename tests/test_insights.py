@@ -0,0 +1,119 @@
+"""Tests for the weekly insight rollups."""
+from collections import Counter
+from datetime import datetime
+from app import db
+from app.models import Update, InsightRollup, InsightTotal
+from app.utils.insights import (apply_rollup_delta, rebuild_rollups, weekly_insights, insight_for_week,
+                                all_time_insight)
+from app.utils.update_tags import delete_updates
+
+NOW = datetime(2025, 5, 20)
+
+def stored_rollups():
+    return {(r.week_start, r.provider, r.kind, r.name): r.count for r in InsightRollup.query}
+
+def totals_match_rollups():
+    summed = Counter()
+    for (week, provider, kind, name), count in stored_rollups().items():
+        summed[provider, kind, name] += count
+    return {(t.provider, t.kind, t.name): t.count for t in InsightTotal.query} == summed
+
+def recomputed_rollups():
+    rebuild_rollups()
+    rollups = stored_rollups()
+    db.session.rollback()
+    return rollups
+
+def seed(add_update):
+    # Sunday night and Monday morning fall into different weeks
+    add_update('Lambda 1', published_date=datetime(2025, 5, 11, 23, 59), commit=False, product_name='AWS Lambda')
+    add_update('Lambda 2', published_date=datetime(2025, 5, 12, 0, 0), commit=False, product_name='AWS Lambda')
+    add_update('S3', published_date=datetime(2025, 5, 14, 9, 30), commit=False, product_name='Amazon S3')
+    add_update('Unknown', published_date=datetime(2025, 5, 14, 10, 0), commit=False)
+    add_update('SQL 1', provider='azure', published_date=datetime(2025, 5, 13), commit=False,
+               categories=['Databases', 'Launched'])
+    add_update('SQL 2', provider='azure', published_date=datetime(2025, 5, 15), commit=False,
+               categories=['Databases', 'Launched'])
+    arc = add_update('Arc', provider='azure', published_date=datetime(2025, 5, 6), commit=False,
+                     categories=['Hybrid', 'In preview', 'Databases'])
+    db.session.commit()
+    return arc
+
+def test_rollups_follow_inserts_changes_and_deletes(app, add_update):
+    arc = seed(add_update)
+    rollups = stored_rollups()
+    assert rollups[datetime(2025, 5, 5), 'aws', 'update', ''] == 1
+    assert rollups[datetime(2025, 5, 12), 'aws', 'update', ''] == 3
+    assert rollups[datetime(2025, 5, 12), 'azure', 'category', 'Databases'] == 2
+    assert (datetime(2025, 5, 12), 'azure', 'category', 'Launched') not in rollups
+    assert rollups == recomputed_rollups()
+    assert totals_match_rollups()
+
+    # Moving an update to another week moves its counts in the same flush
+    arc.published_date = datetime(2025, 5, 16)
+    arc.categories = ['Hybrid']
+    db.session.commit()
+    rollups = stored_rollups()
+    assert (datetime(2025, 5, 5), 'azure', 'update', '') not in rollups
+    assert rollups[datetime(2025, 5, 12), 'azure', 'category', 'Hybrid'] == 1
+    assert rollups == recomputed_rollups()
+    assert totals_match_rollups()
+
+    db.session.delete(arc)
+    lambda_2 = Update.query.filter_by(title='Lambda 2').one()
+    delete_updates(db.session.connection(), {lambda_2.id: 'aws'})
+    db.session.commit()
+    assert (datetime(2025, 5, 12), 'aws', 'product', 'AWS Lambda') not in stored_rollups()
+    assert stored_rollups()[datetime(2025, 5, 12), 'aws', 'update', ''] == 2
+    assert stored_rollups() == recomputed_rollups()
+    assert totals_match_rollups()
+
+    # Bulk query deletes recount everything
+    Update.query.filter_by(provider='azure').delete()
+    db.session.commit()
+    assert not any(key[1] == 'azure' for key in stored_rollups())
+    assert totals_match_rollups()
+
+def test_insights_are_read_from_the_rollups(app, add_update, capture_statements):
+    seed(add_update)
+    with capture_statements() as statements:
+        weekly = weekly_insights(now=NOW)
+        cumulative = all_time_insight(now=NOW)
+        week = insight_for_week(datetime(2025, 5, 14))
+    assert not any('FROM "update"' in s for s in statements)
+
+    assert [(i.week_start, i.aws_updates, i.azure_updates) for i in weekly] == [
+        (datetime(2025, 5, 12), 3, 2), (datetime(2025, 5, 5), 1, 1)]
+    assert week.week_start == datetime(2025, 5, 12) and week.week_end == datetime(2025, 5, 19)
+    assert week.aws_top_products == [{'name': 'AWS Lambda', 'count': 1}, {'name': 'Amazon S3', 'count': 1}]
+    assert week.azure_top_categories == [{'name': 'Databases', 'count': 2}]
+    assert insight_for_week(datetime(2025, 1, 1)) is None
+
+    assert (cumulative.week_start, cumulative.week_end) == (datetime(2025, 5, 5), datetime(2025, 5, 26))
+    assert (cumulative.aws_updates, cumulative.azure_updates) == (4, 3)
+    assert cumulative.aws_top_products[0] == {'name': 'AWS Lambda', 'count': 2}
+    assert cumulative.azure_top_categories[0] == {'name': 'Databases', 'count': 3}
+
+def test_all_time_tops_leave_out_future_weeks(app, add_update):
+    seed(add_update)
+    add_update('S3 2', published_date=datetime(2025, 6, 2), commit=False, product_name='Amazon S3')
+    add_update('S3 3', published_date=datetime(2025, 6, 3), commit=False, product_name='Amazon S3')
+    db.session.commit()
+    assert InsightTotal.query.filter_by(provider='aws', kind='product', name='Amazon S3').one().count == 3
+
+    cumulative = all_time_insight(now=NOW)
+    assert cumulative.aws_updates == 6
+    assert cumulative.aws_top_products == [{'name': 'AWS Lambda', 'count': 2}, {'name': 'Amazon S3', 'count': 1}]
+    assert all_time_insight(now=datetime(2025, 6, 4)).aws_top_products[0] == {'name': 'Amazon S3', 'count': 3}
+
+def test_deltas_are_applied_with_one_upsert_per_table(app, add_update, capture_statements):
+    seed(add_update)
+    week = datetime(2025, 5, 12)
+    with capture_statements() as statements:
+        apply_rollup_delta(db.session.connection(), [(week, 'aws', 'product', 'AWS Lambda'),
+                                                     (week, 'aws', 'product', 'Amazon EC2')], [])
+    assert len(statements) == 2 and all('ON CONFLICT' in s for s in statements)
+    rollups = stored_rollups()
+    assert rollups[week, 'aws', 'product', 'AWS Lambda'] == 2
+    assert rollups[week, 'aws', 'product', 'Amazon EC2'] == 1
+    assert totals_match_rollups()
@@ -0,0 +1,63 @@
+"""Tests for the cached JSON list properties on the models."""
+import json
+from datetime import datetime
+from app import db
+from app import models
+from app.models import Update, WeeklyTheme
+
+def count_decodes(monkeypatch):
+    calls = []
+    real_loads = json.loads
+
+    def loads(raw, *args, **kwargs):
+        calls.append(raw)
+        return real_loads(raw, *args, **kwargs)
+
+    monkeypatch.setattr(models.json, 'loads', loads)
+    return calls
+
+def test_repeated_reads_decode_once(app, monkeypatch):
+    update = Update(provider='azure', title='Update', url='https://example.test', published_date=datetime(2025, 5, 1))
+    update._status = '["Launched", "In preview"]'
+    calls = count_decodes(monkeypatch)
+
+    for _ in range(5):
+        assert update.status == ['Launched', 'In preview']
+    assert len(calls) == 1
+
+    # The setter stores the new text and its decoded value together
+    update.status = 'Retired'
+    assert update.status == ['Retired'] and update._status == '["Retired"]'
+    assert len(calls) == 1
+
+    theme = WeeklyTheme(week_start=datetime(2025, 5, 5), provider='aws', theme_name='Serverless')
+    theme.services = ('AWS Lambda', 'Amazon SQS')
+    assert theme.services == ['AWS Lambda', 'Amazon SQS'] and theme._services == '["AWS Lambda", "Amazon SQS"]'
+
+def test_cache_follows_raw_column_changes(app):
+    update = Update(provider='azure', title='Update', url='https://example.test', published_date=datetime(2025, 5, 1),
+                    product_names=['Azure SQL'])
+    db.session.add(update)
+    db.session.commit()
+    assert update.product_names == ['Azure SQL']
+
+    # Direct writes to the column and reloads from the database are both picked up
+    update._product_names = '["Azure Arc"]'
+    assert update.product_names == ['Azure Arc']
+    db.session.commit()
+
+    db.session.execute(Update.__table__.update().values(product_names='["Azure Functions"]'))
+    db.session.commit()
+    assert update.product_names == ['Azure Functions']
+
+def test_mutating_a_read_list_leaves_the_cache_alone(app):
+    update = Update(provider='azure', title='Update', url='https://example.test', published_date=datetime(2025, 5, 1),
+                    status=['Launched'])
+    update.status.append('Retired')
+    assert update.status == ['Launched']
+
+    # Neither does mutating the list that was assigned
+    statuses = ['In preview']
+    update.status = statuses
+    statuses.append('Retired')
+    assert update.status == ['In preview'] and update._status == '["In preview"]'
@@ -0,0 +1,65 @@
+"""Tests for structured logging helpers."""
+import json
+import logging
+import os
+import pytest
+from app.utils import logging_setup
+from app.utils.logging_setup import StructuredFormatter, log_timing
+
+def make_record(fields=None):
+    record = logging.LogRecord('app.scraper', logging.INFO, __file__, 1, 'scrape.fetch', None, None)
+    if fields is not None:
+        record.fields = fields
+    return record
+
+def test_text_formatter_appends_fields():
+    output = StructuredFormatter().format(make_record({'provider': 'aws', 'items': 3}))
+    assert output.endswith('app.scraper: scrape.fetch provider=aws items=3')
+
+def test_json_formatter_merges_fields():
+    payload = json.loads(StructuredFormatter(json_output=True).format(make_record({'items': 3})))
+    assert payload['message'] == 'scrape.fetch'
+    assert payload['level'] == 'INFO'
+    assert payload['items'] == 3
+
+def test_log_timing_skips_work_below_level(caplog):
+    logger = logging.getLogger('tests.timing')
+    logger.propagate = True
+    with caplog.at_level(logging.WARNING, logger='tests.timing'):
+        with log_timing(logger, 'quiet') as fields:
+            fields['items'] = 1
+    assert not caplog.records
+    assert 'duration_ms' not in fields
+
+    with caplog.at_level(logging.INFO, logger='tests.timing'):
+        with log_timing(logger, 'loud', provider='aws') as fields:
+            fields['items'] = 2
+    assert caplog.records[0].fields['items'] == 2
+    assert caplog.records[0].fields['provider'] == 'aws'
+    assert 'duration_ms' in caplog.records[0].fields
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_forked_workers_write_their_records(tmp_path, monkeypatch):
+    # A listener of our own, writing to a file, as configure_logging starts in the uWSGI master
+    monkeypatch.setattr(logging_setup, '_listener', None)
+    monkeypatch.setattr(logging_setup, '_queue_handler', None)
+    handler = logging_setup._start_listener(json_output=False)
+    path = tmp_path / 'worker.log'
+    logging_setup._listener.handlers = (logging.FileHandler(path),)
+    logger = logging.getLogger('tests.fork')
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        pid = os.fork()
+        if pid == 0:
+            # The listener thread did not survive the fork; the worker must start its own
+            try:
+                logger.warning('from the worker')
+                logging_setup._stop_listener()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+    finally:
+        logger.removeHandler(handler)
+        logging_setup._stop_listener()
+    assert 'from the worker' in path.read_text()
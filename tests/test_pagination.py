@@ -0,0 +1,57 @@
+"""Tests for keyset pagination of update listings."""
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models import Update
+from app.utils.pagination import paginate_updates, decode_cursor, encode_cursor, cached_count, clear_count_cache
+
+def seed(count=25):
+    # Three updates per timestamp so ties on published_date are exercised
+    for i in range(count):
+        db.session.add(Update(provider='aws', title=f'Update {i}', url='https://example.test',
+                              published_date=datetime(2025, 5, 1) + timedelta(hours=i // 3)))
+    db.session.commit()
+    return [u.id for u in Update.query.order_by(Update.published_date.desc(), Update.id.desc())]
+
+def ids(page):
+    return [u.id for u in page.items]
+
+def test_cursors_walk_the_same_order_as_offset(app):
+    expected = seed()
+    query = Update.query.filter_by(provider='aws')
+
+    page = paginate_updates(query, per_page=10, count_key='aws')
+    walked = ids(page)
+    assert not page.has_prev and page.total == 25 and page.pages == 3
+    while page.next_cursor:
+        page = paginate_updates(query, per_page=10, after=page.next_cursor)
+        walked.extend(ids(page))
+    assert walked == expected
+
+    # Walking back from the last page returns the previous pages unchanged
+    back = paginate_updates(query, per_page=10, before=page.prev_cursor)
+    assert ids(back) == expected[10:20]
+    assert back.has_prev and back.has_next
+
+def test_page_numbers_remain_supported(app):
+    expected = seed()
+    query = Update.query.filter_by(provider='aws')
+    assert ids(paginate_updates(query, per_page=10, page=2)) == expected[10:20]
+    assert ids(paginate_updates(query, per_page=10, page=3)) == expected[20:]
+    past_end = paginate_updates(query, per_page=10, page=9)
+    assert past_end.items == [] and past_end.next_cursor is None
+
+def test_cursor_round_trip_and_validation():
+    published = datetime(2025, 5, 1, 12, 30)
+    assert decode_cursor(encode_cursor(published, 42)) == (published, 42)
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
+
+def test_cached_count_is_invalidated_by_writes(app):
+    clear_count_cache()
+    seed(3)
+    query = Update.query.filter_by(provider='aws')
+    assert cached_count(query, 'aws-count') == 3
+    db.session.add(Update(provider='aws', title='New', url='https://example.test', published_date=datetime(2025, 6, 1)))
+    db.session.commit()
+    assert cached_count(query, 'aws-count') == 4
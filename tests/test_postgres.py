@@ -0,0 +1,88 @@
+"""Tests for the PostgreSQL backend (JSONB tag columns, portable routes)."""
+from datetime import datetime, timedelta
+import pytest
+from flask import Flask
+from sqlalchemy import inspect, select
+from sqlalchemy.dialects.postgresql import JSONB
+from app import db
+from app.models import Update, WeeklyTheme, WeeklyInsight
+from app.utils.db_engine import configure_engine_options, configure_engines
+from app.utils.db_indexes import ensure_indexes
+from app.utils.facets import get_facet_counts
+
+@pytest.fixture
+def pg_app(postgres_url):
+    app = Flask('app')
+    app.config.update({
+        'TESTING': True,
+        'SECRET_KEY': 'test',
+        'SQLALCHEMY_DATABASE_URI': postgres_url
+    })
+    configure_engine_options(app)
+    db.init_app(app)
+    configure_engines(app, db)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+def add_azure(add_update, i, products, status=('Launched',)):
+    return add_update(f'Azure update {i}', 'azure', datetime(2025, 5, 5) + timedelta(hours=i), commit=False,
+                      description='', product_names=products, update_types=['Features'], status=status)
+
+def test_tag_columns_are_jsonb(pg_app):
+    inspector = inspect(db.engine)
+    columns = {column['name']: column['type'] for column in inspector.get_columns('update')}
+    for name in ('product_names', 'update_types', 'status', 'categories'):
+        assert isinstance(columns[name], JSONB), name
+
+    indexes = {index['name'] for index in inspector.get_indexes('update')}
+    assert not any(name.endswith('_gin') for name in indexes)
+    assert ensure_indexes() == []
+    assert pg_app.config['SQLALCHEMY_ENGINE_OPTIONS']['pool_pre_ping']
+
+def test_json_columns_round_trip_and_support_containment(pg_app, add_update):
+    add_azure(add_update, 1, ['Azure SQL Database', 'Azure Arc'])
+    add_azure(add_update, 2, ['Azure Arc'], status=['In preview'])
+    db.session.commit()
+    db.session.expire_all()
+
+    update = Update.query.filter_by(title='Azure update 1').one()
+    assert update.product_names == ['Azure SQL Database', 'Azure Arc']
+    assert isinstance(update._product_names, str)
+
+    column = Update.__table__.c.product_names
+    titles = db.session.scalars(select(Update.title).where(column.op('@>')('["Azure Arc"]'))).all()
+    assert sorted(titles) == ['Azure update 1', 'Azure update 2']
+
+    # Deletes are cascaded by the foreign keys; the facet counts must still follow
+    db.session.delete(update)
+    db.session.commit()
+    assert get_facet_counts('azure')['product'] == {'Azure Arc': 1}
+
+def test_routes_render_on_postgres(pg_app, add_update):
+    from app.routes import init_routes
+    init_routes(pg_app)
+
+    for i in range(25):
+        add_azure(add_update, i, ['Azure SQL'])
+        db.session.add(Update(provider='aws', title=f'AWS Lambda update {i}', description='', url='https://example.test',
+                              published_date=datetime(2025, 5, 5) + timedelta(hours=i), product_name='AWS Lambda'))
+    db.session.add(WeeklyTheme(week_start=datetime(2025, 5, 5), provider='aws', theme_name='Serverless',
+                               description='', relevance_score=0.9, update_count=3))
+    db.session.add(WeeklyInsight(week_start=datetime(2025, 5, 5), week_end=datetime(2025, 5, 12),
+                                 aws_updates=25, azure_updates=25))
+    db.session.commit()
+
+    client = pg_app.test_client()
+    for route in ['/', '/aws_updates', '/aws_updates/page/2', '/aws_updates?category=AWS+Lambda',
+                  '/azure_updates?category=Azure+SQL&type=Features&status=Launched',
+                  '/themes?week=2025-05-05', '/insights', '/insights?week=2025-05-05']:
+        assert client.get(route).status_code == 200, route
+
+    page = client.get('/azure_updates?category=Azure+SQL').get_data(as_text=True)
+    assert 'Azure update 24' in page
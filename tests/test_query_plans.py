@@ -0,0 +1,72 @@
+"""Query-plan regression test for the hot read routes.
+
+Every SELECT issued while rendering the listing, theme and insight pages is
+run through ``EXPLAIN QUERY PLAN``. A plain ``SCAN <table>`` on a watched
+table, any walk of the whole ``update`` table (even through an index) or a
+temp B-tree sort of updates means an index stopped being used.
+"""
+import re
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models import Update, WeeklyTheme, WeeklyInsight
+
+WATCHED_TABLES = {'update', 'weekly_theme', 'weekly_insights', 'update_product_tags',
+                  'update_type_tags', 'update_status_tags', 'facet_counts'}
+
+ROUTES = [
+    '/',
+    '/aws_updates',
+    '/aws_updates/page/2',
+    '/aws_updates?category=AWS+Lambda',
+    '/azure_updates',
+    '/azure_updates?category=Azure+SQL&type=Features&status=Launched',
+    '/themes',
+    '/themes?week=2025-05-05',
+    '/insights',
+    '/insights?week=2025-05-05',
+]
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+UPDATE_WALK = re.compile(r'^SCAN update\b')
+
+@pytest.fixture
+def client(app):
+    if db.engine.dialect.name != 'sqlite':
+        pytest.skip('EXPLAIN QUERY PLAN output is SQLite-specific')
+    from app.routes import init_routes
+    init_routes(app)
+
+    for i in range(30):
+        published = datetime(2025, 5, 5) + timedelta(hours=i)
+        db.session.add(Update(provider='aws', title=f'AWS Lambda update {i}', description='', url='https://example.test',
+                              published_date=published, product_name='AWS Lambda'))
+        db.session.add(Update(provider='azure', title=f'Azure SQL update {i}', description='', url='https://example.test',
+                              published_date=published, product_names=['Azure SQL'],
+                              update_types=['Features'], status=['Launched']))
+    db.session.add(WeeklyTheme(week_start=datetime(2025, 5, 5), provider='aws', theme_name='Serverless',
+                               description='', relevance_score=0.9, update_count=3))
+    db.session.add(WeeklyInsight(week_start=datetime(2025, 5, 5), week_end=datetime(2025, 5, 12),
+                                 aws_updates=30, azure_updates=30))
+    db.session.commit()
+    return app.test_client()
+
+@pytest.mark.parametrize('route', ROUTES)
+def test_route_queries_use_indexes(client, capture_statements, route):
+    with capture_statements(parameters=True) as executed:
+        response = client.get(route)
+    assert response.status_code == 200, route
+    statements = [(statement, parameters) for statement, parameters in executed
+                  if statement.lstrip().upper().startswith('SELECT')]
+    assert statements, f'{route} issued no queries'
+
+    with db.engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = [row[3] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+            scans = [m.group(1) for m in map(FULL_SCAN.match, plan) if m and m.group(1) in WATCHED_TABLES]
+            assert not scans, f'{route}: full scan of {scans} in\n{statement}\nplan: {plan}'
+            assert not any(UPDATE_WALK.match(step) for step in plan), \
+                f'{route}: update table walked instead of searched in\n{statement}\nplan: {plan}'
+            if 'FROM "update"' in statement:
+                assert 'USE TEMP B-TREE FOR ORDER BY' not in plan, \
+                    f'{route}: updates sorted without an index in\n{statement}\nplan: {plan}'
@@ -0,0 +1,76 @@
+"""Tests for chunked, resumable reprocessing jobs."""
+from datetime import datetime, timedelta
+from app import db
+from app.models import Update, ReprocessJob
+from app.utils import reprocess_jobs
+from app.utils.reprocess_jobs import create_job, run_job, claim_job, resumable_jobs
+
+def add_azure_updates(add_update, count):
+    for i in range(count):
+        add_update(f'[Launched] Generally Available: Azure feature {i}', 'azure',
+                   datetime(2025, 5, 1) + timedelta(hours=i), commit=False, description='',
+                   categories=['Launched', 'Compute', 'Features'])
+    db.session.commit()
+
+def test_job_processes_all_rows_in_chunks(app, add_update):
+    add_azure_updates(add_update, 5)
+    job = create_job('azure', chunk_size=2)
+
+    job = run_job(job.id)
+
+    assert job.status == 'completed'
+    assert (job.total, job.processed) == (5, 5)
+    assert job.last_id == db.session.query(db.func.max(Update.id)).scalar()
+    update = Update.query.first()
+    assert update.product_names == ['Compute']
+    assert update.status == ['Launched']
+
+def test_failed_job_resumes_from_checkpoint(app, monkeypatch, add_update):
+    add_azure_updates(add_update, 5)
+    job = create_job('azure', chunk_size=2)
+    failing_id = Update.query.order_by(Update.id).all()[3].id
+    original = reprocess_jobs._reprocess_azure
+    seen = []
+
+    def flaky(update, processor):
+        seen.append(update.id)
+        if update.id == failing_id:
+            raise RuntimeError('worker died')
+        return original(update, processor)
+
+    monkeypatch.setattr(reprocess_jobs, '_reprocess_azure', flaky)
+    job = run_job(job.id)
+    assert job.status == 'failed'
+    assert job.processed == 2  # Only the first chunk was committed
+    assert [j.id for j in resumable_jobs()] == [job.id]
+
+    monkeypatch.setattr(reprocess_jobs, '_reprocess_azure', original)
+    job = run_job(job.id)
+    assert job.status == 'completed'
+    assert job.processed == 5
+    assert job.error is None
+
+def test_targeted_job_skips_chunks_whose_rows_were_deleted(app, monkeypatch, add_update):
+    add_azure_updates(add_update, 6)
+    ids = [update.id for update in Update.query.order_by(Update.id)]
+    monkeypatch.setattr(reprocess_jobs, '_target_ids', lambda job: ids)
+    job = create_job('azure', chunk_size=2)
+    # The whole second chunk is gone by the time the job runs
+    Update.query.filter(Update.id.in_(ids[2:4])).delete()
+    db.session.commit()
+
+    job = run_job(job.id)
+    assert job.status == 'completed'
+    assert (job.total, job.processed, job.last_id) == (6, 4, ids[-1])
+    assert db.session.get(Update, ids[-1]).product_names == ['Compute']
+
+def test_running_job_cannot_be_claimed_twice(app):
+    job = create_job('aws')
+    assert claim_job(job.id)
+    assert not claim_job(job.id)
+
+    # A stale heartbeat lets another worker take over
+    job.updated_at = datetime.utcnow() - timedelta(hours=1)
+    db.session.commit()
+    assert claim_job(job.id)
+    assert db.session.get(ReprocessJob, job.id).status == 'running'
@@ -0,0 +1,58 @@
+"""Tests for the versioned AWS service catalog and targeted reprocessing."""
+from app import db
+from app.models import Update, ServiceCatalogVersion
+from app.utils.service_catalog import (
+    record_catalog_version, find_affected_update_ids, reprocess_catalog_change
+)
+from app.utils.title_search import find_update_ids_by_title
+
+def test_record_catalog_version_diffs(app):
+    first = record_catalog_version(['Amazon S3', 'AWS Lambda'])
+    assert first.version == 1
+    assert first.is_baseline
+    assert first.added == ['AWS Lambda', 'Amazon S3']
+
+    # Unchanged catalog does not create a new version
+    assert record_catalog_version(['AWS Lambda', 'Amazon S3']) is None
+
+    second = record_catalog_version(['Amazon S3', 'Amazon Bedrock'])
+    assert second.version == 2
+    assert second.added == ['Amazon Bedrock']
+    assert second.removed == ['AWS Lambda']
+    assert ServiceCatalogVersion.query.count() == 2
+
+def test_title_index_tracks_inserts_and_updates(app, add_update):
+    update = add_update('Amazon Bedrock now supports new models')
+    add_update('AWS Lambda adds Python 3.13 runtime')
+
+    assert find_update_ids_by_title(['Amazon Bedrock']) == [update.id]
+
+    update.title = 'Amazon Nova models are now available'
+    db.session.commit()
+    assert find_update_ids_by_title(['Amazon Bedrock']) == []
+    assert find_update_ids_by_title(['Amazon Nova']) == [update.id]
+
+def test_reprocess_only_touches_affected_updates(app, add_update):
+    bedrock = add_update('Amazon Bedrock Agents now support memory', product_name='Amazon Bedrock')
+    lambda_update = add_update('AWS Lambda adds Python 3.13 runtime', product_name='AWS Lambda')
+    s3 = add_update('Amazon S3 Express One Zone adds new Regions', product_name='Amazon S3')
+
+    record_catalog_version(['Amazon S3', 'AWS Lambda', 'Amazon Bedrock'])
+    version = record_catalog_version(['Amazon S3', 'AWS Lambda', 'Amazon Bedrock', 'Amazon Bedrock Agents'])
+
+    assert find_affected_update_ids(version) == [bedrock.id]
+
+    affected, changed = reprocess_catalog_change(version)
+    assert (affected, changed) == (1, 1)
+    assert db.session.get(Update, bedrock.id).product_name == 'Amazon Bedrock Agents'
+    assert db.session.get(Update, lambda_update.id).product_name == 'AWS Lambda'
+    assert db.session.get(Update, s3.id).product_name == 'Amazon S3'
+    assert version.reprocessed_at is not None
+
+def test_reprocess_clears_products_removed_from_the_catalog(app, add_update):
+    retired = add_update('New console for the retired service', product_name='Amazon Retired')
+    record_catalog_version(['Amazon S3', 'Amazon Retired'])
+    version = record_catalog_version(['Amazon S3'])
+
+    assert reprocess_catalog_change(version) == (1, 1)
+    assert db.session.get(Update, retired.id).product_name is None
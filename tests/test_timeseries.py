@@ -0,0 +1,123 @@
+"""Tests for the daily update counts behind /api/timeseries."""
+import os
+from datetime import date, datetime
+import numpy as np
+import pytest
+from app import db, routes
+from app.utils import timeseries
+from app.utils.timeseries import TimeSeriesStore, bucket_count, bucket_starts, get_store
+
+def seed(add_update):
+    add_update('Lambda 1', published_date=datetime(2025, 1, 30, 23, 59), commit=False, product_name='AWS Lambda')
+    add_update('Lambda 2', published_date=datetime(2025, 2, 3, 8), commit=False, product_name='AWS Lambda')
+    add_update('Lambda 3', published_date=datetime(2025, 2, 3, 17), commit=False, product_name='AWS Lambda')
+    add_update('S3', published_date=datetime(2025, 2, 10), commit=False, product_name='Amazon S3')
+    add_update('SQL', provider='azure', published_date=datetime(2025, 2, 4), commit=False,
+               product_names=['Azure SQL'], status=['In preview'])
+    db.session.commit()
+
+@pytest.fixture
+def store_app(app, tmp_path):
+    app.config['TIMESERIES_PATH'] = str(tmp_path / 'timeseries.npz')
+    yield app
+    timeseries._cached.clear()
+
+def test_bucket_starts():
+    assert bucket_starts(date(2025, 1, 30), date(2025, 2, 1), 'day') == \
+        [date(2025, 1, 30), date(2025, 1, 31), date(2025, 2, 1)]
+    assert bucket_starts(date(2025, 1, 30), date(2025, 2, 10), 'week') == \
+        [date(2025, 1, 27), date(2025, 2, 3), date(2025, 2, 10)]
+    assert bucket_starts(date(2024, 12, 31), date(2025, 2, 1), 'month') == \
+        [date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1)]
+    for start, end in [(date(2025, 1, 30), date(2025, 2, 1)), (date(2025, 1, 30), date(2025, 2, 10)),
+                       (date(2024, 12, 31), date(2026, 3, 1))]:
+        for granularity in ('day', 'week', 'month'):
+            assert bucket_count(start, end, granularity) == len(bucket_starts(start, end, granularity))
+
+def test_store_counts_series_per_day(store_app, add_update):
+    seed(add_update)
+    store = TimeSeriesStore.build()
+    assert store.first_day == date(2025, 1, 30) and store.last_day == date(2025, 2, 10)
+    assert ('azure', 'status', 'In preview') in store.keys
+
+    lambda_ = ('aws', 'product', 'AWS Lambda')
+    starts, (daily,) = store.query([lambda_], date(2025, 1, 29), date(2025, 2, 4))
+    assert starts[0] == date(2025, 1, 29)
+    assert daily.tolist() == [0, 1, 0, 0, 0, 2, 0]
+
+    # Buckets extend past the stored days; unknown series count as zero
+    starts, (weekly, unknown) = store.query([('aws', 'total', ''), ('aws', 'product', 'EC2')],
+                                           date(2025, 1, 1), date(2025, 3, 31), 'week')
+    assert weekly.sum() == 4 and unknown.sum() == 0
+    assert dict(zip(starts, weekly.tolist()))[date(2025, 2, 3)] == 2
+    starts, (monthly,) = store.query([('aws', 'total', '')], date(2025, 1, 15), date(2025, 2, 5), 'month')
+    assert starts == [date(2025, 1, 1), date(2025, 2, 1)]
+    assert monthly.tolist() == [1, 3]
+
+def test_store_is_shared_through_the_file_and_rebuilt_on_change(store_app, add_update):
+    seed(add_update)
+    store = get_store()
+    path = store_app.config['TIMESERIES_PATH']
+    assert os.path.exists(path)
+
+    # Another worker loads the same counts from the file
+    loaded = TimeSeriesStore.load(path)
+    assert loaded.keys == store.keys
+    assert np.array_equal(loaded.counts, store.counts)
+    timeseries._cached.clear()
+    assert get_store().built_at == store.built_at
+
+    add_update('S3 2', published_date=datetime(2025, 2, 11), commit=False, product_name='Amazon S3')
+    db.session.commit()
+    rebuilt = get_store()
+    assert rebuilt.last_day == date(2025, 2, 11)
+
+    # Past the maximum age the store is rebuilt even without new rows
+    store_app.config['TIMESERIES_MAX_AGE'] = 0
+    assert get_store().built_at > rebuilt.built_at
+
+def test_timeseries_endpoint(store_app, add_update):
+    routes.init_routes(store_app)
+    seed(add_update)
+    client = store_app.test_client()
+
+    data = client.get('/api/timeseries?provider=aws&kind=product&granularity=week'
+                      '&start=2025-01-27&end=2025-02-16').get_json()
+    assert data['buckets'] == ['2025-01-27', '2025-02-03', '2025-02-10']
+    assert {s['name']: s['counts'] for s in data['series']} == {'AWS Lambda': [1, 2, 0], 'Amazon S3': [0, 0, 1]}
+
+    # By default the last 90 days, clamped to the stored ones
+    data = client.get('/api/timeseries?provider=azure&granularity=month').get_json()
+    assert (data['start'], data['end']) == ('2025-01-30', '2025-02-10')
+    assert data['series'] == [{'name': 'azure', 'counts': [0, 1], 'total': 1}]
+
+    data = client.get('/api/timeseries?provider=aws&kind=product&name=Amazon+S3'
+                      '&start=2025-02-09&end=2025-02-10').get_json()
+    assert data['series'] == [{'name': 'Amazon S3', 'counts': [0, 1], 'total': 1}]
+
+    assert client.get('/api/timeseries?provider=gcp').status_code == 400
+    assert client.get('/api/timeseries?provider=aws&granularity=year').status_code == 400
+    assert client.get('/api/timeseries?provider=aws&start=2025-03-01&end=2025-02-01').status_code == 400
+    assert client.get('/api/timeseries?provider=aws&start=yesterday').status_code == 400
+
+def test_timeseries_endpoint_bounds_the_range(store_app, add_update):
+    routes.init_routes(store_app)
+    seed(add_update)
+    client = store_app.test_client()
+
+    # Clamped to the stored days, however far the dates reach
+    data = client.get('/api/timeseries?provider=aws&granularity=month&start=0001-01-01&end=9999-12-31').get_json()
+    assert (data['start'], data['end']) == ('2025-01-30', '2025-02-10')
+    assert data['buckets'] == ['2025-01-01', '2025-02-01']
+    assert client.get('/api/timeseries?provider=aws&end=0001-01-01').status_code == 400
+
+    # Entirely outside the stored days
+    response = client.get('/api/timeseries?provider=aws&start=2030-01-01&end=9999-12-31')
+    assert response.status_code == 400 and '2025-01-30 to 2025-02-10' in response.get_json()['error']
+    assert client.get('/api/timeseries?provider=aws&start=2000-01-01&end=2000-12-31').status_code == 400
+
+    # Too many buckets
+    store_app.config['TIMESERIES_MAX_BUCKETS'] = 10
+    response = client.get('/api/timeseries?provider=aws&start=2025-01-01&end=2025-12-31')
+    assert response.status_code == 400 and 'at most 10 day buckets' in response.get_json()['error']
+    assert client.get('/api/timeseries?provider=aws&granularity=week&start=2025-01-01').status_code == 200
@@ -0,0 +1,39 @@
+"""Tests for feed timestamp parsing."""
+from datetime import datetime, timezone, timedelta
+from app.utils.timestamps import TimestampParser, parse_timestamp, parse_legacy, parse_rfc822
+
+def test_rfc822_variants_normalize_to_naive_utc():
+    expected = datetime(2025, 4, 30, 16, 0, 32)
+    assert parse_timestamp('Wed, 30 Apr 2025 16:00:32 GMT') == expected
+    assert parse_timestamp('Wed, 30 Apr 2025 16:00:32 Z') == expected
+    assert parse_timestamp('Wed, 30 Apr 2025 16:00:32 +0000') == expected
+    assert parse_timestamp('Wed, 30 Apr 2025 18:00:32 +0200') == expected
+    assert parse_timestamp('Wed, 30 Apr 2025 09:00:32 PDT') == expected
+    assert parse_timestamp('30 Apr 2025 16:00:32') == expected
+
+def test_iso8601_variants_normalize_to_naive_utc():
+    assert parse_timestamp('2025-04-30T16:00:32Z') == datetime(2025, 4, 30, 16, 0, 32)
+    assert parse_timestamp('2025-04-30T18:00:32+02:00') == datetime(2025, 4, 30, 16, 0, 32)
+    assert parse_timestamp('2025-04-30T16:00:32.125Z') == datetime(2025, 4, 30, 16, 0, 32, 125000)
+    assert parse_timestamp('2025-04-30') == datetime(2025, 4, 30)
+
+def test_aware_datetime_input_is_normalized():
+    aware = datetime(2025, 4, 30, 18, 0, 32, tzinfo=timezone(timedelta(hours=2)))
+    assert parse_timestamp(aware) == datetime(2025, 4, 30, 16, 0, 32)
+
+def test_invalid_values_return_none():
+    assert parse_timestamp(None) is None
+    assert parse_timestamp('') is None
+    assert parse_timestamp('not a date') is None
+    assert parse_rfc822('Wed, 31 Feb 2025 16:00:32 GMT') is None
+
+def test_parser_memoizes_last_successful_format():
+    parser = TimestampParser(feed='azure')
+    parser.parse('2025-04-30T16:00:32Z')
+    assert parser._last.__name__ == 'parse_iso8601'
+    parser.parse('Wed, 30 Apr 2025 16:00:32 GMT')
+    assert parser._last.__name__ == 'parse_rfc822'
+
+def test_fast_path_agrees_with_legacy_formats():
+    for value in ('Wed, 30 Apr 2025 16:00:32 +0000', 'Wed, 30 Apr 2025 16:00:32', '2025-04-30T16:00:32Z'):
+        assert parse_timestamp(value) == parse_legacy(value)
@@ -0,0 +1,109 @@
+"""Tests for the cold-storage archive of updates past the retention window."""
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import select
+from app import db, routes
+from app.models import Update, FacetCount
+from app.utils.insights import all_time_insight
+from app.utils.theme_analyzer import get_week_start
+from app.utils.update_archive import ARCHIVE_ENGINE, archive_expired_updates, archive_session, archived_updates
+
+NOW = datetime.utcnow()
+
+@pytest.fixture
+def archive_app(app, tmp_path):
+    app.config['UPDATE_ARCHIVE_URI'] = f'sqlite:///{tmp_path / "archive.db"}'
+    yield app
+    if ARCHIVE_ENGINE in app.extensions:
+        app.extensions.pop(ARCHIVE_ENGINE).dispose()
+
+def aged(title, age_days):
+    """``add_update`` fields of an update published ``age_days`` ago, with text to archive and search."""
+    return {'title': title, 'published_date': NOW - timedelta(days=age_days),
+            'description': f'{title} description', 'explanation': f'{title} explained'}
+
+def seed(add_update):
+    for i in range(3):
+        add_update(**aged(f'Old Lambda feature {i}', 200 + i), product_name='AWS Lambda')
+    add_update(**aged('Old Azure SQL feature', 200), provider='azure', categories=['Databases'],
+               product_names=['Azure SQL'])
+    add_update(**aged('Recent Lambda feature', 5), product_name='AWS Lambda')
+
+def test_expired_updates_move_to_the_archive(archive_app, add_update):
+    seed(add_update)
+    assert archive_expired_updates(chunk_size=2) == 4
+    assert db.session.scalars(select(Update.title)).all() == ['Recent Lambda feature']
+    assert {(f.provider, f.name): f.count for f in FacetCount.query} == {('aws', 'AWS Lambda'): 1}
+
+    archived = archived_updates(Update.provider == 'aws')
+    assert [u.title for u in archived] == ['Old Lambda feature 2', 'Old Lambda feature 1', 'Old Lambda feature 0']
+    assert archived[0].description == 'Old Lambda feature 2 description'
+    assert archived[0].explanation == 'Old Lambda feature 2 explained'
+    assert archived_updates(Update.provider == 'azure')[0].categories == ['Databases']
+
+    # Archiving the same update again (e.g. re-scraped after an interrupted run) replaces its archived copy
+    add_update(**aged('Old Lambda feature 0', 200), product_name='AWS Lambda v2')
+    assert archive_expired_updates() == 1
+    with archive_session() as archive:
+        copies = archive.scalars(select(Update.product_name).where(Update.title == 'Old Lambda feature 0')).all()
+    assert copies == ['AWS Lambda v2']
+
+def test_reused_hot_ids_do_not_replace_other_archived_updates(archive_app, add_update):
+    add_update(**aged('First old feature', 200))
+    first_id = Update.query.one().id
+    archive_expired_updates()
+    # SQLite hands the freed id to the next row; other databases may not, so reuse it explicitly
+    add_update(**aged('Second old feature', 200), id=first_id)
+    archive_expired_updates()
+    assert sorted(u.title for u in archived_updates()) == ['First old feature', 'Second old feature']
+
+@pytest.fixture
+def client(archive_app, add_update):
+    routes.init_routes(archive_app)
+    seed(add_update)
+    archive_expired_updates()
+    return archive_app.test_client()
+
+def test_archived_updates_stay_in_the_insights(client):
+    cumulative = all_time_insight()
+    assert (cumulative.aws_updates, cumulative.azure_updates) == (4, 1)
+    assert cumulative.aws_top_products == [{'name': 'AWS Lambda', 'count': 4}]
+
+    # Rebuilding the rollups counts the archive too
+    client.post('/admin/generate_insights')
+    cumulative = all_time_insight()
+    assert (cumulative.aws_updates, cumulative.azure_updates) == (4, 1)
+    assert cumulative.week_start.date() == get_week_start(NOW - timedelta(days=202)).date()
+
+def test_rescraped_archived_updates_are_counted_once(client, add_update):
+    add_update(**aged('Old Lambda feature 1', 201), product_name='AWS Lambda')
+    cumulative = all_time_insight()
+    assert cumulative.aws_updates == 4
+    assert cumulative.aws_top_products == [{'name': 'AWS Lambda', 'count': 4}]
+    # The archived copy is gone, so a rebuild agrees
+    assert 'Old Lambda feature 1' not in {u.title for u in archived_updates()}
+    client.post('/admin/generate_insights')
+    assert all_time_insight().aws_updates == 4
+
+    # Archived again, it is still counted once
+    assert archive_expired_updates() == 1
+    assert all_time_insight().aws_updates == 4
+
+def test_search_and_themes_read_the_archive(client, monkeypatch, add_update):
+    # Each search index needs a few documents to fit its vocabulary
+    for i in range(3):
+        add_update(**aged(f'Recent S3 bucket change {i}', 3))
+        add_update(**aged(f'Old EC2 instance change {i}', 300))
+    archive_expired_updates()
+
+    response = client.get('/search?q=lambda feature&archive=1')
+    assert b'Old Lambda feature 1' in response.data and b'Archived' in response.data
+    assert b'Old Lambda feature 1' not in client.get('/search?q=lambda feature').data
+
+    seen = []
+    monkeypatch.setattr(routes.LLMThemeAnalyzer, '__init__', lambda self: None)
+    monkeypatch.setattr(routes.LLMThemeAnalyzer, 'generate_themes', lambda self, updates: seen.extend(updates) or [])
+    week = get_week_start(NOW - timedelta(days=200))
+    client.post('/admin/generate_themes', data={'week': week.isoformat()})
+    assert 'Old Lambda feature 0' in {u.title for u in seen}
+    assert all(u.description for u in seen)
@@ -0,0 +1,51 @@
+"""Tests for the normalized update tag tables."""
+from app import db
+from app.models import Update, update_product_tags
+from app.utils.update_tags import TAG_TABLES, tagged_update_ids, backfill_update_tags, ensure_update_tags
+
+def tag_rows(table):
+    return sorted(tuple(row) for row in db.session.execute(db.select(table.c.update_id, table.c.name)))
+
+def filtered_titles(kind, names):
+    query = Update.query.filter(Update.id.in_(tagged_update_ids(kind, names)))
+    return sorted(update.title for update in query)
+
+def test_tags_follow_inserts_changes_and_deletes(app, add_update):
+    sql = add_update('SQL', provider='azure', product_names=['Azure SQL Database', 'Databases'], status=['In preview'])
+    aks = add_update('AKS', provider='azure', product_names=['Azure Kubernetes Service'], status=['Launched'])
+    add_update('Lambda', product_name='AWS Lambda')
+
+    assert filtered_titles('product', ['Databases']) == ['SQL']
+    assert filtered_titles('product', ['AWS Lambda', 'Azure Kubernetes Service']) == ['AKS', 'Lambda']
+    assert filtered_titles('status', ['In preview']) == ['SQL']
+
+    sql.status = ['Launched']
+    db.session.commit()
+    assert filtered_titles('status', ['Launched']) == ['AKS', 'SQL']
+    assert filtered_titles('status', ['In preview']) == []
+
+    aks_id, sql_id = aks.id, sql.id
+    db.session.delete(aks)
+    db.session.commit()
+    assert (aks_id, 'Azure Kubernetes Service') not in tag_rows(update_product_tags)
+
+    # Bulk query deletes skip the flush but must not leave orphaned tags
+    Update.query.filter_by(provider='aws').delete()
+    db.session.commit()
+    assert {update_id for update_id, _ in tag_rows(update_product_tags)} == {sql_id}
+
+def test_backfill_rebuilds_from_json_columns(app, add_update):
+    add_update('SQL', provider='azure', product_names=['Azure SQL Database'], update_types=['Features'],
+               status=['Launched'])
+    expected = tag_rows(update_product_tags)
+
+    # Simulate a database created before the tag tables existed
+    for table in TAG_TABLES.values():
+        db.session.execute(table.delete())
+    db.session.commit()
+    assert ensure_update_tags()
+    assert tag_rows(update_product_tags) == expected
+    assert not ensure_update_tags()
+
+    assert backfill_update_tags(chunk_size=1) == 1
+    assert tag_rows(update_product_tags) == expected
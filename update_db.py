@@ -4,6 +4,10 @@ Script to update the database schema with new columns for Azure updates.
 from app import create_app, db
 from sqlalchemy import Column, Text
 from sqlalchemy.sql import text
+from app.utils.update_tags import backfill_update_tags
+from app.utils.insights import rebuild_rollups
+from app.utils.update_archive import archive_exists, get_archive_engine, update_sources
+from app.utils.db_indexes import ensure_indexes
 
 def update_database_schema():
     """Add new columns to the Update table if they don't exist."""
@@ -14,12 +18,14 @@ def update_database_schema():
         # Check if the columns already exist
         inspector = db.inspect(db.engine)
         columns = [col['name'] for col in inspector.get_columns('update')]
+        # Tag columns are JSONB on PostgreSQL (see models.JSONText)
+        json_type = 'JSONB' if db.engine.dialect.name == 'postgresql' else 'TEXT'
         
         # Add status column if it doesn't exist
         if 'status' not in columns:
             print("Adding 'status' column to Update table...")
             # Add the column - quote the table name since 'update' is a SQL keyword
-            db.session.execute(text('ALTER TABLE "update" ADD COLUMN status TEXT DEFAULT \'[]\''))
+            db.session.execute(text(f'ALTER TABLE "update" ADD COLUMN status {json_type} DEFAULT \'[]\''))
             db.session.commit()
             print("Status column added successfully!")
         else:
@@ -29,12 +35,54 @@ def update_database_schema():
         if 'product_names' not in columns:
             print("Adding 'product_names' column to Update table...")
             # Add the column - quote the table name since 'update' is a SQL keyword
-            db.session.execute(text('ALTER TABLE "update" ADD COLUMN product_names TEXT DEFAULT \'[]\''))
+            db.session.execute(text(f'ALTER TABLE "update" ADD COLUMN product_names {json_type} DEFAULT \'[]\''))
             db.session.commit()
             print("Product_names column added successfully!")
         else:
             print("'product_names' column already exists in Update table.")
 
+        # Tag filters use the update_*_tags tables, so the JSONB GIN indexes were never used
+        if db.engine.dialect.name == 'postgresql':
+            with db.engine.begin() as connection:
+                for column in ('product_names', 'update_types', 'status'):
+                    connection.execute(text(f'DROP INDEX IF EXISTS ix_update_{column}_gin'))
+
+        # Pre-rendered explanation HTML, on the archive's copy of the table too
+        explanation_columns = {'explanation_html': 'TEXT', 'explanation_format_version': 'INTEGER',
+                               'explanation_segmenter': 'VARCHAR(20)'}
+        archive_engine = get_archive_engine() if archive_exists() else None
+        for engine in filter(None, (db.engine, archive_engine)):
+            existing = [col['name'] for col in db.inspect(engine).get_columns('update')]
+            with engine.begin() as connection:
+                for name, sql_type in explanation_columns.items():
+                    if name not in existing:
+                        print(f"Adding '{name}' column to Update table ({engine.url.database})...")
+                        connection.execute(text(f'ALTER TABLE "update" ADD COLUMN {name} {sql_type}'))
+        print("Run 'flask render_explanations' to render stored explanations.")
+
+        # Poller leases of explanation batches
+        if db.inspect(db.engine).has_table('explanation_batches'):
+            existing = [col['name'] for col in db.inspect(db.engine).get_columns('explanation_batches')]
+            with db.engine.begin() as connection:
+                for name, sql_type in {'poller': 'VARCHAR(100)', 'lease_until': 'TIMESTAMP'}.items():
+                    if name not in existing:
+                        print(f"Adding '{name}' column to explanation_batches...")
+                        connection.execute(text(f'ALTER TABLE explanation_batches ADD COLUMN {name} {sql_type}'))
+
+        # Create the normalized tag tables if needed and rebuild them from the JSON columns
+        db.create_all()
+        created = ensure_indexes()
+        if created:
+            print(f"Created indexes: {', '.join(created)}")
+        print("Backfilling product/type/status tag tables...")
+        count = backfill_update_tags()
+        print(f"Tag tables rebuilt for {count} updates.")
+        print("Rebuilding insight rollups and totals...")
+        with update_sources(include_archive=True) as sources:
+            rows = rebuild_rollups(sources)
+        db.session.commit()
+        print(f"Insight rollups rebuilt ({rows} rows).")
+
 if __name__ == "__main__":
     update_database_schema()
     print("Database schema update complete!")